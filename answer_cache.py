@@ -0,0 +1,279 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+ANSWER_TTL = 7 * 24 * 3600
+MAX_ENTRIES = 5000
+# Cosine similarity (TF-IDF over stems) needed to reuse the answer to a different
+# wording; None disables similarity matching and keeps exact normalized matches only.
+# One extra term in a three-term question scores about 0.816, so it must stay above that.
+SIMILARITY_THRESHOLD = 0.85
+# Candidates scored per lookup, taken from the entries sharing the rarest terms
+MAX_CANDIDATES = 200
+# Seconds between writes of batched access times to SQLite; they only decide
+# which entries are reloaded after a restart, so hits don't write each time
+TOUCH_FLUSH_INTERVAL = 30
+
+STOP_WORDS = frozenset("""
+a an the is are was were be been being am do does did of to in on at by for from with
+about into than then as and or but if so it its it's this that these those there here
+i me my we our you your he she they them their what which how can could would should
+will shall may might must tell explain please know like really very just also away
+much many some any get got
+""".split())
+
+# Phrases rewritten before stemming so different wordings share terms
+PHRASE_SYNONYMS = (
+    (re.compile(r'\bhow far\b'), 'distance'),
+    (re.compile(r'\bhow (?:big|large)\b'), 'size'),
+    (re.compile(r'\bhow old\b'), 'age'),
+    (re.compile(r'\bhow hot\b'), 'temperature'),
+    (re.compile(r'\bhow heavy\b'), 'mass'),
+)
+
+SUFFIXES = ('ations', 'ation', 'ances', 'ance', 'ences', 'ence', 'ings', 'ing',
+            'ies', 'ied', 'ed', 'es', 'ly', 's')
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Stop words that still set the tense of a question: "Was Pluto a planet?" is
+# not "Is Pluto a planet?"
+PAST_WORDS = frozenset(('was', 'were', 'did', 'had'))
+FUTURE_WORDS = frozenset(('will', 'shall'))
+
+
+def stem(word):
+    """Light suffix-stripping stemmer; good enough to merge plurals and verb forms"""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            base = word[:-len(suffix)]
+            if suffix == 's' and word.endswith('ss'):
+                return word
+            if suffix == 'es' and not base.endswith(('s', 'x', 'z', 'ch', 'sh')):
+                # "holes" -> "hole", while "boxes" -> "box"
+                return word[:-1]
+            return base + 'y' if suffix in ('ies', 'ied') else base
+    return word
+
+
+# Bodies and named objects: a cached answer is only reused for a question about
+# exactly the same ones (and the same numbers), however alike the wording
+BODY_TERMS = frozenset(stem(word) for word in """
+sun moon earth mercury venus mars jupiter saturn uranus neptune pluto ceres eris
+io europa ganymede callisto titan enceladus triton phobos deimos charon
+milky andromeda orion sirius betelgeuse polaris vega rigel proxima centauri pleiades
+iss hubble webb jwst voyager halley kuiper oort
+""".split())
+
+
+def content_terms(terms):
+    """The terms naming a body or a number, and the markers, which must agree between similar questions"""
+    return frozenset(term for term in terms if term in BODY_TERMS or term.isdigit() or term[0] == '@')
+
+
+def question_terms(question):
+    """Normalized terms of a question: lowercased, punctuation and stop-words removed, stemmed
+
+    Two markers, starting with '@' so they can't clash with a word, keep what
+    the stop words and the unordered set would lose: '@past' or '@future' for
+    the tense, and for a comparison ("Is Jupiter bigger than Saturn?") the
+    comparative followed by the bodies in the order they are named
+    ('@bigger>jupiter>saturn').
+    """
+    text = question.lower()
+    for pattern, replacement in PHRASE_SYNONYMS:
+        text = pattern.sub(replacement, text)
+    words = WORD_RE.findall(text)
+    terms = {stem(w) for w in words if w not in STOP_WORDS}
+    if not terms:
+        return frozenset()
+    if not PAST_WORDS.isdisjoint(words):
+        terms.add('@past')
+    elif not FUTURE_WORDS.isdisjoint(words):
+        terms.add('@future')
+    if 'than' in words:
+        position = words.index('than')
+        comparative = stem(words[position - 1]) if position else ''
+        # "more moons than": the word before "than" is what is compared, not a body
+        bodies = dict.fromkeys(term for i, term in enumerate(map(stem, words))
+                               if term in BODY_TERMS and i != position - 1)
+        terms.add('@' + '>'.join([comparative, *bodies]))
+    return frozenset(terms)
+
+
+def question_key(terms):
+    return ' '.join(sorted(terms))
+
+
+class AnswerCache:
+    """Chatbot answers keyed on the normalized question, with optional similarity matching
+
+    Exact matches on the normalized form are a dict lookup. Otherwise the
+    cached questions sharing a term with the new one are scored by cosine
+    similarity of their TF-IDF vectors (document frequencies come from the
+    cached questions themselves) and the best one above the threshold is used.
+    Entries expire after ``ttl`` seconds, the least recently used are evicted
+    beyond ``max_entries``, and everything is written through to SQLite.
+
+    Lookups only touch memory: SQLite has its own lock, never held with the
+    memory lock, and the access times of hits are written in batches.
+    """
+
+    def __init__(self, path, ttl=ANSWER_TTL, max_entries=MAX_ENTRIES,
+                 similarity_threshold=SIMILARITY_THRESHOLD):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # key -> (terms, answer, created_at)
+        self._postings = {}            # term -> set of keys
+        self._touched = {}             # key -> access time not yet written to SQLite
+        self._flushed_at = time.time()
+        self._lock = threading.Lock()
+        # Serializes use of the shared SQLite connection; never held with _lock
+        self._db_lock = threading.Lock()
+        self.stats = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0, 'evictions': 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            key TEXT PRIMARY KEY,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+        ''')
+        self._conn.execute('DELETE FROM answer_cache WHERE created_at <= ?', (time.time() - ttl,))
+        rows = self._conn.execute(
+            'SELECT key, question, answer, created_at FROM answer_cache ORDER BY accessed_at DESC LIMIT ?',
+            (max_entries,)).fetchall()
+        stale = []
+        for key, question, answer, created_at in reversed(rows):
+            terms = question_terms(question)
+            if question_key(terms) != key:
+                # Stored under an older normalization, so a lookup would never find it
+                stale.append((key,))
+                continue
+            self._insert(key, terms, answer, created_at)
+        self._conn.executemany('DELETE FROM answer_cache WHERE key = ?', stale)
+        self._conn.commit()
+
+    def get(self, question):
+        terms = question_terms(question)
+        if not terms:
+            return None
+        key = question_key(terms)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] < self.ttl:
+                self.stats['exact_hits'] += 1
+            else:
+                if entry is not None:
+                    self._remove(key)
+                key = self._most_similar(terms, now) if self.similarity_threshold else None
+                if key is None:
+                    self.stats['misses'] += 1
+                    return None
+                self.stats['similar_hits'] += 1
+            self._entries.move_to_end(key)
+            answer = self._entries[key][1]
+            self._touched[key] = now
+            touched = self._take_touched(now) if now - self._flushed_at >= TOUCH_FLUSH_INTERVAL else None
+        if touched:
+            with self._db_lock:
+                self._write_touched(touched)
+                self._conn.commit()
+        return answer
+
+    def put(self, question, answer):
+        terms = question_terms(question)
+        if not terms:
+            return
+        key = question_key(terms)
+        now = time.time()
+        with self._lock:
+            self._remove(key)
+            self._insert(key, terms, answer, now)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                evicted.append((old_key,))
+                self.stats['evictions'] += 1
+            # A write is due anyway, so pending access times go with it
+            touched = self._take_touched(now)
+        with self._db_lock:
+            self._write_touched(touched)
+            self._conn.execute('INSERT OR REPLACE INTO answer_cache VALUES (?, ?, ?, ?, ?)',
+                               (key, question, answer, now, now))
+            self._conn.executemany('DELETE FROM answer_cache WHERE key = ?', evicted)
+            self._conn.commit()
+
+    def report(self):
+        with self._lock:
+            report = dict(self.stats, entries=len(self._entries))
+        hits = report['exact_hits'] + report['similar_hits']
+        lookups = hits + report['misses']
+        report['hit_ratio'] = hits / lookups if lookups else 0.0
+        return report
+
+    def _take_touched(self, now):
+        # Caller holds _lock
+        touched, self._touched, self._flushed_at = self._touched, {}, now
+        return touched
+
+    def _write_touched(self, touched):
+        # Caller holds _db_lock
+        self._conn.executemany('UPDATE answer_cache SET accessed_at = ? WHERE key = ?',
+                               [(accessed_at, key) for key, accessed_at in touched.items()])
+
+    def _insert(self, key, terms, answer, created_at):
+        self._entries[key] = (terms, answer, created_at)
+        for term in terms:
+            self._postings.setdefault(term, set()).add(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for term in entry[0]:
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[term]
+
+    def _idf(self, term):
+        return math.log((len(self._entries) + 1) / (len(self._postings.get(term, ())) + 1)) + 1
+
+    def _most_similar(self, terms, now):
+        content = content_terms(terms)
+        weights = {term: self._idf(term) for term in terms}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        # Gather candidates from the rarest terms first so common ones can't flood the scan
+        candidates = []
+        for term in sorted(terms, key=lambda t: len(self._postings.get(t, ()))):
+            candidates.extend(self._postings.get(term, ()))
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+
+        best_key, best_score = None, self.similarity_threshold
+        for key in set(candidates[:MAX_CANDIDATES]):
+            other_terms, _, created_at = self._entries[key]
+            # "How far is Mars from the Sun?" is not "How far is Mars from Earth?"
+            if now - created_at >= self.ttl or content_terms(other_terms) != content:
+                continue
+            dot = sum(weights[t] ** 2 for t in terms & other_terms)
+            other_norm = math.sqrt(sum(self._idf(t) ** 2 for t in other_terms))
+            score = dot / (norm * other_norm) if norm and other_norm else 0.0
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
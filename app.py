@@ -1,891 +1,1119 @@
-from flask import Flask, render_template, request, jsonify
-import requests
-from config import Config
-import json
-import urllib.parse
-import sqlite3
-from datetime import datetime
-import os
-import base64
-
-app = Flask(__name__)
-config = Config()
-
-# Database setup function
-def init_db():
-    db_path = os.path.join(app.root_path, 'astronomy.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Create events table if it doesn't exist
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS events (
-        id INTEGER PRIMARY KEY,
-        title TEXT NOT NULL,
-        date TEXT NOT NULL,
-        type TEXT NOT NULL,
-        description TEXT,
-        image TEXT
-    )
-    ''')
-    
-    # Check if we have any events already
-    cursor.execute('SELECT COUNT(*) FROM events')
-    if cursor.fetchone()[0] == 0:
-        # Insert sample data if the table is empty
-        sample_events = [
-            (1, "Perseid Meteor Shower", "2025-08-12", "Meteor Shower",
-             "One of the brightest meteor showers, peaking at 50-75 meteors per hour.",
-             "https://apod.nasa.gov/apod/image/2008/Perseids_ESO_1080.jpg"),
-            (2, "Total Lunar Eclipse", "2025-05-26", "Eclipse",
-             "A total lunar eclipse visible from parts of Asia, Australia, and the Americas.",
-             "https://apod.nasa.gov/apod/image/1801/TotalLunarEclipse_Fairbairn_3000.jpg"),
-            (3, "Jupiter at Opposition", "2025-07-15", "Planetary Event",
-             "Jupiter will be at its closest approach to Earth, fully illuminated by the Sun.",
-             "https://apod.nasa.gov/apod/image/2108/Jupiter_Close_Approach_Sankar_3000.jpg"),
-            (4, "Full Moon (Strawberry Moon)", "2025-06-13", "Lunar Phase",
-             "The June full moon, traditionally called the Strawberry Moon.",
-             "https://apod.nasa.gov/apod/image/2006/StrawberryMoon_Horalek_1500.jpg"),
-            (5, "Partial Solar Eclipse", "2025-09-30", "Eclipse",
-             "A partial solar eclipse visible from parts of North America and Europe.",
-             "https://apod.nasa.gov/apod/image/1708/PartialSolarEclipse_Horalek_1500.jpg"),
-            # Add 5 new events here with appropriate online images
-            (6, "Supermoon", "2025-10-15", "Lunar Phase",
-             "The Moon appears bigger and brighter than usual as it reaches perigee - its closest point to Earth.",
-             "https://images.unsplash.com/photo-1496429862132-5ab36b6ae330?q=80&w=1000&auto=format&fit=crop"),
-            (7, "Neowise Comet Approach", "2025-11-03", "Comet",
-             "Comet Neowise makes its closest approach to Earth, visible with the naked eye in the northern hemisphere.",
-             "https://images.unsplash.com/photo-1595508064774-5ff825ff0f81?q=80&w=1000&auto=format&fit=crop"),
-            (8, "Venus-Jupiter Conjunction", "2025-11-23", "Planetary Event",
-             "The two brightest planets appear to meet in the night sky, coming within 0.3 degrees of each other.",
-             "https://images.unsplash.com/photo-1543722530-d2c3201371e7?q=80&w=1000&auto=format&fit=crop"),
-            (9, "Northern Lights Outburst", "2025-12-21", "Auroral Display",
-             "A predicted geomagnetic storm will cause spectacular aurora displays visible at unusually low latitudes.",
-             "https://images.unsplash.com/photo-1483347756197-71ef80e95f73?q=80&w=1000&auto=format&fit=crop"),
-            (10, "Geminid Meteor Storm", "2025-12-14", "Meteor Storm",
-             "An unusually intense meteor shower with up to 150 meteors per hour at its peak.",
-             "https://images.unsplash.com/photo-1607437817193-3b3d1b2c7ced?q=80&w=1000&auto=format&fit=crop")
-        ]
-        cursor.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)', sample_events)
-        conn.commit()
-    else:
-        # Check if we need to add the new events
-        cursor.execute('SELECT id FROM events WHERE id = 10')
-        if not cursor.fetchone():
-            # Add the new events
-            new_events = [
-                (6, "Supermoon", "2025-10-15", "Lunar Phase",
-                 "The Moon appears bigger and brighter than usual as it reaches perigee - its closest point to Earth.",
-                 "https://images.unsplash.com/photo-1496429862132-5ab36b6ae330?q=80&w=1000&auto=format&fit=crop"),
-                (7, "Neowise Comet Approach", "2025-11-03", "Comet",
-                 "Comet Neowise makes its closest approach to Earth, visible with the naked eye in the northern hemisphere.",
-                 "https://images.unsplash.com/photo-1595508064774-5ff825ff0f81?q=80&w=1000&auto=format&fit=crop"),
-                (8, "Venus-Jupiter Conjunction", "2025-11-23", "Planetary Event",
-                 "The two brightest planets appear to meet in the night sky, coming within 0.3 degrees of each other.",
-                 "https://images.unsplash.com/photo-1543722530-d2c3201371e7?q=80&w=1000&auto=format&fit=crop"),
-                (9, "Northern Lights Outburst", "2025-12-21", "Auroral Display",
-                 "A predicted geomagnetic storm will cause spectacular aurora displays visible at unusually low latitudes.",
-                 "https://images.unsplash.com/photo-1483347756197-71ef80e95f73?q=80&w=1000&auto=format&fit=crop"),
-                (10, "Geminid Meteor Storm", "2025-12-14", "Meteor Storm",
-                 "An unusually intense meteor shower with up to 150 meteors per hour at its peak.",
-                 "https://images.unsplash.com/photo-1607437817193-3b3d1b2c7ced?q=80&w=1000&auto=format&fit=crop")
-            ]
-            cursor.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)', new_events)
-            conn.commit()
-            
-    conn.close()
-
-# Function to get events from database
-def get_db_events():
-    db_path = os.path.join(app.root_path, 'astronomy.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM events ORDER BY date')
-    events = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return events
-
-# Initialize database on startup
-with app.app_context():
-    init_db()
-
-# Routes
-@app.route('/')
-def index():
-    events = get_db_events()
-    featured_events = events[:3]
-    return render_template('index.html', featured_events=featured_events)
-
-@app.route('/calendar')
-def calendar():
-    events = get_db_events()
-    # Get unique event types with assigned colors
-    event_types = get_event_types_with_colors()
-    
-    # Add display_class to each event based on its type
-    for event in events:
-        event['tag_color'] = event_types.get(event['type'])
-        # Create a CSS class name from the type (lowercase, no spaces)
-        event['display_class'] = 'event-' + event['type'].lower().replace(' ', '-')
-    
-    return render_template('calendar.html', events=events, event_types=event_types)
-
-@app.route('/api/quiz/question', methods=['GET'])
-def get_quiz_question():
-    try:
-        # Load quiz data from JSON file
-        quiz_file_path = os.path.join(app.root_path, 'static', 'data', 'astronomy_quiz.json')
-        
-        with open(quiz_file_path, 'r') as f:
-            quiz_data = json.load(f)
-            
-        # Get a random question
-        question_id = request.args.get('id')
-        
-        if question_id:
-            # Try to get a specific question by ID
-            try:
-                question_index = int(question_id) % len(quiz_data)
-                return jsonify(quiz_data[question_index])
-            except (ValueError, IndexError):
-                # If ID is invalid, fall back to random
-                import random
-                return jsonify(random.choice(quiz_data))
-        else:
-            # Return a random question
-            import random
-            return jsonify(random.choice(quiz_data))
-    
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/astrology')
-def astrology():
-    zodiac_emojis = {
-        "Aries": "♈",
-        "Taurus": "♉",
-        "Gemini": "♊",
-        "Cancer": "♋",
-        "Leo": "♌",
-        "Virgo": "♍",
-        "Libra": "♎",
-        "Scorpio": "♏",
-        "Sagittarius": "♐",
-        "Capricorn": "♑",
-        "Aquarius": "♒",
-        "Pisces": "♓"
-    }
-    return render_template('astrology.html', zodiac_emojis=zodiac_emojis)
-
-@app.route('/chat')
-def chat():
-    # Get NASA APOD for the chat page
-    params = {'api_key': config.NASA_API_KEY}
-    response = requests.get(config.NASA_APOD_URL, params=params)
-    apod_data = response.json() if response.status_code == 200 else None
-    return render_template('chat.html', apod=apod_data)
-
-@app.route('/explore')
-def explore():
-    return render_template('explore.html')
-
-@app.route('/starmap')
-def starmap():
-    # New route for interactive star map
-    return render_template('starmap.html')
-
-# API Endpoints
-@app.route('/api/nasa/apod', methods=['GET'])
-def get_nasa_apod():
-    params = {'api_key': config.NASA_API_KEY}
-    response = requests.get(config.NASA_APOD_URL, params=params)
-    return jsonify(response.json() if response.status_code == 200 else {"error": "Failed to fetch APOD"})
-
-@app.route('/api/nasa/search', methods=['GET'])
-def search_nasa_images():
-    query = request.args.get('q', 'stars')
-    params = {'q': query}
-    response = requests.get(config.NASA_IMAGE_SEARCH_URL, params=params)
-    return jsonify(response.json() if response.status_code == 200 else {"error": "Failed to search NASA images"})
-
-@app.route('/api/pixabay/search', methods=['GET'])
-def search_pixabay_images():
-    query = request.args.get('q', 'space')
-    params = {
-        'key': config.PIXABAY_API_KEY,
-        'q': query,
-        'image_type': 'photo'
-    }
-    response = requests.get(config.PIXABAY_API_URL, params=params)
-    return jsonify(response.json() if response.status_code == 200 else {"error": "Failed to search Pixabay images"})
-
-@app.route('/api/chat', methods=['POST'])
-def chat_with_ai():
-    query = request.json.get('query', '')
-    
-    # Standard redirect message for non-astronomy queries
-    astronomy_redirect = "I can only answer questions about astronomy and space topics. Please ask me about planets, stars, galaxies, or other cosmic phenomena instead."
-    
-    # Step 1: Pre-filtering - Check if query is astronomy-related
-    if not is_astronomy_related_query(query):
-        return jsonify({"response": astronomy_redirect})
-    
-    # Step 2: Check for astronomy-adjacent terms that might be valid queries
-    if has_astronomy_context(query):
-        # Proceed with the query even if it's not strictly astronomy but has context
-        pass
-    
-    # Ensure the chat stays focused on astronomy
-    prompt = f"""
-    You are CosmicAssistant, an expert in astronomy and space science. Your purpose is to provide accurate, educational information about astronomy, space, planets, stars, galaxies, celestial events, or space exploration.
-
-    MOST CRITICAL RULE: 
-    * You MUST respond to astronomy and space-related questions with helpful, educational information.
-    * For questions about upcoming space events, NASA missions, astronomical observations, or space news, provide informative responses.
-    * For ANY query completely unrelated to astronomy or space science, respond ONLY with exactly:
-      "I can only answer questions about astronomy and space topics. Please ask me about planets, stars, galaxies, or other cosmic phenomena instead."
-    * Space exploration, astronomy history, and current space missions are all valid topics.
-    
-    User question: {query}
-    
-    Remember: If the question isn't about astronomy or space, provide ONLY the standard redirection response.
-    """
-    
-    headers = {
-        'Content-Type': 'application/json',
-        'x-goog-api-key': config.GEMINI_API_KEY
-    }
-    
-    data = {
-        "contents": [
-            {
-                "parts": [
-                    {
-                        "text": prompt
-                    }
-                ]
-            }
-        ],
-        "generationConfig": {
-            "temperature": 0.7,
-            "topK": 40,
-            "topP": 0.95,
-            "maxOutputTokens": 1024
-        }
-    }
-    
-    # Updated to use Gemini 2.0 Flash model
-    response = requests.post(
-        f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={config.GEMINI_API_KEY}",
-        headers=headers,
-        json=data
-    )
-    
-    if response.status_code == 200:
-        response_data = response.json()
-        try:
-            # Extract the AI's response from the Gemini response structure
-            ai_response = response_data['candidates'][0]['content']['parts'][0]['text']
-            
-            # Double-check if response is still astronomy focused
-            if not is_astronomy_related_response(ai_response):
-                return jsonify({"response": astronomy_redirect})
-                
-            return jsonify({"response": ai_response})
-        except (KeyError, IndexError):
-            return jsonify({"error": "Invalid AI response format"})
-    
-    return jsonify({"error": "Failed to get AI response"})
-
-def has_astronomy_context(message):
-    """Check for astronomy-adjacent terms that might not be in our main keyword list but are valid questions"""
-    astronomy_context_terms = [
-        'upcoming', 'launch', 'mission', 'event', 'news', 'discovery', 
-        'observation', 'tonight', 'visible', 'sky', 'watch',
-        'when can i see', 'next', 'future', 'planned', 'schedule',
-        'space program', 'nasa', 'esa', 'spacex', 'isro', 'jaxa'
-    ]
-    
-    message_lower = message.lower()
-    
-    # Check for combinations of context terms
-    for term in astronomy_context_terms:
-        if term in message_lower:
-            # If we find a contextual term, it's likely astronomy-related
-            return True
-            
-    return False
-
-def is_astronomy_related_query(message):
-    """Check if a query is related to astronomy"""
-    astronomy_keywords = [
-        'planet', 'moon', 'star', 'sun', 'galaxy', 'asteroid', 'comet', 'meteor', 
-        'constellation', 'nebula', 'black hole', 'supernova', 'pulsar', 'quasar',
-        'solar system', 'exoplanet', 'satellite', 'orbit', 'celestial', 
-        'nasa', 'esa', 'spacex', 'space mission', 'astronaut', 'spacecraft', 'telescope',
-        'hubble', 'james webb', 'voyager', 'rover', 'rocket', 'launch', 'station',
-        'space', 'astronomy', 'universe', 'cosmos', 'cosmic', 'astronomical',
-        'light year', 'parsec', 'gravity', 'big bang', 'eclipse', 'orbit',
-        'mercury', 'venus', 'earth', 'mars', 'jupiter', 'saturn', 'uranus', 
-        'neptune', 'pluto', 'eclipse', 'meteor shower', 'northern lights', 'aurora', 'gravity',
-        'solstice', 'equinox', 'transit', 'conjunction', 'redshift'
-    ]
-    
-    message_lower = message.lower()
-    
-    # First check for explicit non-astronomy terms
-    non_astronomy_topics = [
-        'weather', 'sports', 'politics', 'music', 'movie', 'film', 
-        'celebrity', 'actor', 'actress', 'singer', 'artist',
-        'recipe', 'food', 'cook', 'restaurant', 'diet',
-        'stock', 'market', 'finance', 'money', 'investment',
-        'dating', 'relationship', 'breakup', 'marriage',
-        'medical', 'disease', 'symptom', 'health', 'doctor',
-        'attorney', 'lawyer', 'legal', 'lawsuit',
-        'birthday', 'gift', 'present', 'shopping'
-    ]
-    
-    for topic in non_astronomy_topics:
-        if topic in message_lower:
-            return False
-    
-    # Then check for astronomy terms
-    for keyword in astronomy_keywords:
-        if keyword in message_lower:
-            return True
-            
-    # Additional space-related patterns
-    space_patterns = [
-        'why is the sky', 'what is in space', 'how far', 'light from', 
-        'how old is the', 'what causes', 'why do stars', 'when can i see', 
-        'how to observe', 'stargazing', 'night sky'
-    ]
-    
-    for pattern in space_patterns:
-        if pattern in message_lower:
-            return True
-    
-    # If no astronomy terms found, assume it's not astronomy-related
-    return False
-
-def is_astronomy_related_response(response):
-    """Check if AI response is astronomy-related"""
-    # If it's the standard redirect, it's valid
-    if "I can only answer questions about astronomy and space topics" in response:
-        return True
-    
-    # Count astronomy terms in the response
-    astronomy_keywords = [
-        'planet', 'moon', 'star', 'sun', 'galaxy', 'asteroid', 'comet', 
-        'constellation', 'nebula', 'black hole', 'supernova', 
-        'solar system', 'exoplanet', 'orbit', 'celestial', 
-        'nasa', 'telescope', 'space', 'astronomy', 'universe', 'cosmos', 
-        'astronomical', 'light year', 'gravity', 'earth', 'mars', 'jupiter'
-    ]
-    
-    response_lower = response.lower()
-    
-    astronomy_term_count = sum(1 for keyword in astronomy_keywords if keyword in response_lower)
-    
-    # If the response contains at least 2 astronomy terms, consider it valid
-    return astronomy_term_count >= 2
-
-@app.route('/api/events', methods=['GET'])
-def get_events():
-    events = get_db_events()
-    return jsonify(events)
-
-@app.route('/api/events/<int:event_id>', methods=['GET'])
-def get_event(event_id):
-    db_path = os.path.join(app.root_path, 'astronomy.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM events WHERE id = ?', (event_id,))
-    event = cursor.fetchone()
-    conn.close()
-    
-    if event:
-        return jsonify(dict(event))
-    return jsonify({"error": "Event not found"}), 404
-
-@app.route('/api/weather/observing', methods=['GET'])
-def get_observing_conditions():
-    lat = request.args.get('lat')
-    lon = request.args.get('lon')
-    
-    if not lat or not lon:
-        return jsonify({"error": "Latitude and longitude are required"}), 400
-    
-    # Weather API call (using OpenWeatherMap as an example)
-    params = {
-        'lat': lat,
-        'lon': lon,
-        'appid': config.WEATHER_API_KEY,
-        'units': 'metric'
-    }
-    
-    try:
-        response = requests.get('https://api.openweathermap.org/data/2.5/weather', params=params)
-        if response.status_code == 200:
-            weather_data = response.json()
-            # Calculate observing conditions quality
-            clouds = weather_data.get('clouds', {}).get('all', 0)
-            visibility = weather_data.get('visibility', 0)
-            wind_speed = weather_data.get('wind', {}).get('speed', 0)
-            
-            # Determine if conditions are good for stargazing
-            is_clear = clouds < 20
-            is_calm = wind_speed < 15
-            is_good_visibility = visibility > 8000
-            
-            observing_quality = "Good" if (is_clear and is_calm and is_good_visibility) else "Fair" if (clouds < 40 and is_calm) else "Poor"
-            
-            return jsonify({
-                "observing_quality": observing_quality,
-                "cloud_cover_percent": clouds,
-                "wind_speed": wind_speed,
-                "visibility": visibility,
-                "current_weather": weather_data['weather'][0]['description'],
-                "temperature": weather_data['main']['temp']
-            })
-        else:
-            return jsonify({"error": "Failed to fetch weather data"}), response.status_code
-    except Exception as e:
-        return jsonify({"error": f"Weather API error: {str(e)}"}), 500
-
-@app.route('/api/starmap/data', methods=['GET'])
-def get_starmap_data():
-    lat = request.args.get('lat', '0')
-    lon = request.args.get('lon', '0')
-    date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
-    
-    try:
-        # Using Astronomy API (example - you'll need to sign up for an appropriate service)
-        params = {
-            'latitude': lat,
-            'longitude': lon,
-            'date': date,
-            'apiKey': config.ASTRONOMY_API_KEY
-        }
-        
-        response = requests.get('https://api.astronomyapi.com/api/v2/bodies/positions', params=params)
-        if response.status_code == 200:
-            return jsonify(response.json())
-        else:
-            return jsonify({"error": "Failed to fetch star map data"}), response.status_code
-    except Exception as e:
-        return jsonify({"error": f"Star map API error: {str(e)}"}), 500
-
-@app.route('/api/zodiac', methods=['POST'])
-def calculate_zodiac():
-    birth_date = request.json.get('birth_date', '')
-    try:
-        # Parse month and day from birth_date (format: YYYY-MM-DD)
-        month, day = int(birth_date.split('-')[1]), int(birth_date.split('-')[2])
-        
-        # Dictionary of zodiac signs with their date ranges and details
-        zodiac_signs = {
-            "Aries": {"start": (3, 21), "end": (4, 19), "element": "Fire", 
-                      "traits": "Independent, assertive, energetic", 
-                      "description": "Aries is the first sign of the zodiac, symbolizing new beginnings. People born under this sign are often characterized by their boldness and pioneering spirit.",
-                      "emoji": "♈"},
-            "Taurus": {"start": (4, 20), "end": (5, 20), "element": "Earth", 
-                      "traits": "Patient, reliable, practical", 
-                      "description": "Taurus is known for stability and persistence. Those born under this sign value security and comfort, and are often very reliable.",
-                      "emoji": "♉"},
-            "Gemini": {"start": (5, 21), "end": (6, 20), "element": "Air", 
-                      "traits": "Adaptable, communicative, curious", 
-                      "description": "Gemini is represented by the twins, symbolizing duality. People with this sign are often versatile, inquisitive, and excellent communicators.",
-                      "emoji": "♊"},
-            "Cancer": {"start": (6, 21), "end": (7, 22), "element": "Water", 
-                      "traits": "Intuitive, emotional, protective", 
-                      "description": "Cancer is deeply connected to home and family. Those born under this sign are often nurturing, empathetic, and protective of loved ones.",
-                      "emoji": "♋"},
-            "Leo": {"start": (7, 23), "end": (8, 22), "element": "Fire", 
-                      "traits": "Confident, generous, loyal", 
-                      "description": "Leo is represented by the lion, symbolizing courage and leadership. People with this sign often have a natural flair for drama and creativity.",
-                      "emoji": "♌"},
-            "Virgo": {"start": (8, 23), "end": (9, 22), "element": "Earth", 
-                      "traits": "Analytical, precise, helpful", 
-                      "description": "Virgo is associated with meticulousness and service. Those born under this sign are often detail-oriented, practical, and devoted to self-improvement.",
-                      "emoji": "♍"},
-            "Libra": {"start": (9, 23), "end": (10, 22), "element": "Air", 
-                      "traits": "Balanced, diplomatic, social", 
-                      "description": "Libra is symbolized by the scales, representing balance and harmony. People with this sign often have a strong sense of justice and value relationships.",
-                      "emoji": "♎"},
-            "Scorpio": {"start": (10, 23), "end": (11, 21), "element": "Water", 
-                      "traits": "Passionate, resourceful, brave", 
-                      "description": "Scorpio is associated with intensity and transformation. Those born under this sign are often determined, passionate, and perceptive.",
-                      "emoji": "♏"},
-            "Sagittarius": {"start": (11, 22), "end": (12, 21), "element": "Fire", 
-                      "traits": "Optimistic, adventurous, independent", 
-                      "description": "Sagittarius is represented by the archer, symbolizing aspiration and exploration. People with this sign often love travel, learning, and philosophical discussions.",
-                      "emoji": "♐"},
-            "Capricorn": {"start": (12, 22), "end": (1, 19), "element": "Earth", 
-                      "traits": "Disciplined, responsible, self-controlled", 
-                      "description": "Capricorn is associated with ambition and discipline. Those born under this sign are often hardworking, patient, and practical.",
-                      "emoji": "♑"},
-            "Aquarius": {"start": (1, 20), "end": (2, 18), "element": "Air", 
-                      "traits": "Progressive, original, independent", 
-                      "description": "Aquarius is known for innovation and humanitarianism. People with this sign are often forward-thinking, unconventional, and value intellectual stimulation.",
-                      "emoji": "♒"},
-            "Pisces": {"start": (2, 19), "end": (3, 20), "element": "Water", 
-                      "traits": "Compassionate, artistic, intuitive", 
-                      "description": "Pisces is symbolized by the fish, representing connection to the spiritual realm. Those born under this sign are often creative, empathetic, and dreamy.",
-                      "emoji": "♓"}
-        }
-        
-        # Find the zodiac sign
-        for sign, info in zodiac_signs.items():
-            start_month, start_day = info["start"]
-            end_month, end_day = info["end"]
-            
-            # Handle cases that span year boundary (like Capricorn)
-            if start_month > end_month:
-                if (month == start_month and day >= start_day) or (month == end_month and day <= end_day) or (month > start_month) or (month < end_month):
-                    result = {"sign": sign, "element": info["element"], "traits": info["traits"], 
-                             "description": info["description"], "emoji": info["emoji"]}
-                    break
-            else:
-                if (month == start_month and day >= start_day) or (month == end_month and day <= end_day) or (start_month < month < end_month):
-                    result = {"sign": sign, "element": info["element"], "traits": info["traits"], 
-                             "description": info["description"], "emoji": info["emoji"]}
-                    break
-        else:
-            return jsonify({"error": "Could not determine zodiac sign"})
-        
-        return jsonify(result)
-    
-    except Exception as e:
-        return jsonify({"error": str(e)})
-
-@app.route('/api/horoscope', methods=['GET'])
-def get_horoscope():
-    sign = request.args.get('sign', '').lower()
-    day = request.args.get('day', 'today')
-    
-    # Validate sign
-    valid_signs = ['aries', 'taurus', 'gemini', 'cancer', 'leo', 'virgo', 
-                  'libra', 'scorpio', 'sagittarius', 'capricorn', 'aquarius', 'pisces']
-    
-    if (sign not in valid_signs):
-        return jsonify({"error": "Invalid zodiac sign"}), 400
-    
-    # Validate day
-    valid_days = ['yesterday', 'today', 'tomorrow']
-    if day not in valid_days:
-        return jsonify({"error": "Day must be yesterday, today, or tomorrow"}), 400
-    
-    # Log detailed diagnostic info for debugging
-    print(f"Trying to fetch horoscope for {sign} ({day})...")
-    
-    try:
-        # First, try with the Aztro API which is known to be reliable
-        aztro_url = "https://aztro.sameerkumar.website/"
-        aztro_params = {"sign": sign, "day": day}
-        print(f"Making request to Aztro API: {aztro_url}")
-        response = requests.post(aztro_url, params=aztro_params)
-        
-        if response.status_code == 200:
-            print("Aztro API request successful")
-            response_data = response.json()
-            
-            # Add Vedic astrology information
-            vedic_info = get_vedic_astrology_info(sign)
-            response_data.update({
-                "vedic_astrology": vedic_info
-            })
-            
-            return jsonify(response_data)
-        else:
-            print(f"Aztro API returned status code: {response.status_code}")
-            
-            # Try generated response as a backup
-            current_date = datetime.now().strftime("%B %d, %Y")
-            sign_data = get_sign_data(sign)
-            
-            # Generate a fallback horoscope response
-            fallback_data = {
-                "description": f"Today is a good day to embrace your {sign_data['element']} element. Focus on your {sign_data['traits'].split(', ')[0].lower()} nature.",
-                "compatibility": sign_data.get("compatibility", get_compatible_sign(sign)),
-                "mood": "Reflective",
-                "lucky_number": str(((datetime.now().day + ord(sign[0])) % 9) + 1),
-                "lucky_time": f"{(datetime.now().hour % 12) + 1}:{datetime.now().minute:02d} {('AM' if datetime.now().hour < 12 else 'PM')}",
-                "current_date": current_date,
-                "vedic_astrology": get_vedic_astrology_info(sign)
-            }
-            
-            return jsonify(fallback_data)
-            
-    except Exception as e:
-        print(f"Error fetching horoscope: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
-# Helper function for Vedic astrology information
-def get_vedic_astrology_info(western_sign):
-    # Mapping from Western to Vedic zodiac signs (approximately)
-    vedic_mapping = {
-        "aries": "Pisces",  # or early Aries
-        "taurus": "Aries",
-        "gemini": "Taurus",
-        "cancer": "Gemini",
-        "leo": "Cancer",
-        "virgo": "Leo",
-        "libra": "Virgo",
-        "scorpio": "Libra",
-        "sagittarius": "Scorpio",
-        "capricorn": "Sagittarius",
-        "aquarius": "Capricorn",
-        "pisces": "Aquarius"
-    }
-    
-    # Sanskrit names for Vedic zodiac signs:
-    sanskrit_names = {
-        "Aries": "Mesha",
-        "Taurus": "Vrishabha",
-        "Gemini": "Mithuna",
-        "Cancer": "Karka",
-        "Leo": "Simha",
-        "Virgo": "Kanya",
-        "Libra": "Tula",
-        "Scorpio": "Vrishchika",
-        "Sagittarius": "Dhanu",
-        "Capricorn": "Makara",
-        "Aquarius": "Kumbha",
-        "Pisces": "Meena"
-    }
-    
-    # Get corresponding Vedic sign
-    vedic_sign = vedic_mapping.get(western_sign.lower(), "Unknown")
-    sanskrit_name = sanskrit_names.get(vedic_sign, "Unknown")
-    
-    # Nakshatra information (simplified - in real calculations this depends on exact birth time)
-    nakshatras = {
-        "Aries": ["Ashwini", "Bharani", "Krittika"],
-        "Taurus": ["Krittika", "Rohini", "Mrigashira"],
-        "Gemini": ["Mrigashira", "Ardra", "Punarvasu"],
-        "Cancer": ["Punarvasu", "Pushya", "Ashlesha"],
-        "Leo": ["Magha", "Purva Phalguni", "Uttara Phalguni"],
-        "Virgo": ["Uttara Phalguni", "Hasta", "Chitra"],
-        "Libra": ["Chitra", "Swati", "Vishakha"],
-        "Scorpio": ["Vishakha", "Anuradha", "Jyeshtha"],
-        "Sagittarius": ["Mula", "Purva Ashadha", "Uttara Ashadha"],
-        "Capricorn": ["Uttara Ashadha", "Shravana", "Dhanishta"],
-        "Aquarius": ["Dhanishta", "Shatabhisha", "Purva Bhadrapada"],
-        "Pisces": ["Purva Bhadrapada", "Uttara Bhadrapada", "Revati"]
-    }
-    
-    # Get possible nakshatras for this sign
-    possible_nakshatras = nakshatras.get(vedic_sign, ["Unknown"])
-    
-    # Calculate today's ruling planet based on weekday
-    weekday = datetime.now().weekday()
-    ruling_planets = ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn"]
-    today_planet = ruling_planets[weekday]
-    
-    # Determine auspicious direction based on ruling planet
-    auspicious_directions = {
-        "Sun": "East",
-        "Moon": "Northwest",
-        "Mars": "South",
-        "Mercury": "North",
-        "Jupiter": "Northeast",
-        "Venus": "Southeast",
-        "Saturn": "West"
-    }
-    
-    auspicious_direction = auspicious_directions.get(today_planet, "Unknown")
-    
-    # Collect Vedic astrology information
-    vedic_info = {
-        "vedic_sign": vedic_sign,
-        "sanskrit_name": sanskrit_name,
-        "possible_nakshatras": possible_nakshatras,
-        "ruling_planet": get_vedic_ruling_planet(vedic_sign),
-        "todays_planet": today_planet,
-        "auspicious_direction": auspicious_direction,
-        "vedic_element": get_vedic_element(vedic_sign),
-        "vedic_quality": get_vedic_quality(vedic_sign)
-    }
-    
-    return vedic_info
-
-def get_vedic_ruling_planet(vedic_sign):
-    ruling_planets = {
-        "Aries": "Mars",
-        "Taurus": "Venus",
-        "Gemini": "Mercury",
-        "Cancer": "Moon",
-        "Leo": "Sun",
-        "Virgo": "Mercury",
-        "Libra": "Venus",
-        "Scorpio": "Mars (traditionally) / Pluto (modern)",
-        "Sagittarius": "Jupiter",
-        "Capricorn": "Saturn",
-        "Aquarius": "Saturn (traditionally) / Uranus (modern)",
-        "Pisces": "Jupiter (traditionally) / Neptune (modern)"
-    }
-    return ruling_planets.get(vedic_sign, "Unknown")
-
-def get_vedic_element(vedic_sign):
-    elements = {
-        "Aries": "Fire (Agni)",
-        "Taurus": "Earth (Prithvi)",
-        "Gemini": "Air (Vayu)",
-        "Cancer": "Water (Jala)",
-        "Leo": "Fire (Agni)",
-        "Virgo": "Earth (Prithvi)",
-        "Libra": "Air (Vayu)",
-        "Scorpio": "Water (Jala)",
-        "Sagittarius": "Fire (Agni)",
-        "Capricorn": "Earth (Prithvi)",
-        "Aquarius": "Air (Vayu)",
-        "Pisces": "Water (Jala)"
-    }
-    return elements.get(vedic_sign, "Unknown")
-
-def get_vedic_quality(vedic_sign):
-    qualities = {
-        "Aries": "Movable (Chara)",
-        "Taurus": "Fixed (Sthira)",
-        "Gemini": "Dual (Dvisvabhava)",
-        "Cancer": "Movable (Chara)",
-        "Leo": "Fixed (Sthira)",
-        "Virgo": "Dual (Dvisvabhava)",
-        "Libra": "Movable (Chara)",
-        "Scorpio": "Fixed (Sthira)",
-        "Sagittarius": "Dual (Dvisvabhava)",
-        "Capricorn": "Movable (Chara)",
-        "Aquarius": "Fixed (Sthira)",
-        "Pisces": "Dual (Dvisvabhava)"
-    }
-    return qualities.get(vedic_sign, "Unknown")
-
-# Helper functions for fallback horoscope generation
-def get_sign_data(sign):
-    zodiac_data = {
-        "aries": {"element": "Fire", "traits": "Independent, assertive, energetic"},
-        "taurus": {"element": "Earth", "traits": "Patient, reliable, practical"},
-        "gemini": {"element": "Air", "traits": "Adaptable, communicative, curious"},
-        "cancer": {"element": "Water", "traits": "Intuitive, emotional, protective"},
-        "leo": {"element": "Fire", "traits": "Confident, generous, loyal"},
-        "virgo": {"element": "Earth", "traits": "Analytical, precise, helpful"},
-        "libra": {"element": "Air", "traits": "Balanced, diplomatic, social"},
-        "scorpio": {"element": "Water", "traits": "Passionate, resourceful, brave"},
-        "sagittarius": {"element": "Fire", "traits": "Optimistic, adventurous, independent"},
-        "capricorn": {"element": "Earth", "traits": "Disciplined, responsible, self-controlled"},
-        "aquarius": {"element": "Air", "traits": "Progressive, original, independent"},
-        "pisces": {"element": "Water", "traits": "Compassionate, artistic, intuitive"}
-    }
-    return zodiac_data.get(sign.lower(), {"element": "Unknown", "traits": "Mysterious"})
-
-def get_compatible_sign(sign):
-    compatibility = {
-        "aries": "Libra",
-        "taurus": "Scorpio",
-        "gemini": "Sagittarius",
-        "cancer": "Capricorn",
-        "leo": "Aquarius",
-        "virgo": "Pisces",
-        "libra": "Aries",
-        "scorpio": "Taurus",
-        "sagittarius": "Gemini",
-        "capricorn": "Cancer",
-        "aquarius": "Leo",
-        "pisces": "Virgo"
-    }
-    return compatibility.get(sign.lower(), "Gemini")
-
-@app.route('/api/huggingface/generate', methods=['POST'])
-def generate_image():
-    data = request.json
-    prompt = data.get('prompt')
-    
-    if not prompt:
-        return jsonify({"error": "No prompt provided"}), 400
-        
-    try:
-        # Call Hugging Face API for image generation
-        API_URL = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
-        headers = {"Authorization": f"Bearer {config.HUGGINGFACE_API_KEY}"}
-        
-        response = requests.post(
-            API_URL,
-            headers=headers,
-            json={"inputs": prompt}
-        )
-        
-        if response.status_code != 200:
-            return jsonify({"error": "Failed to generate image"}), response.status_code
-            
-        # The response will be the binary image data
-        image_bytes = response.content
-        
-        # Convert to base64 for sending to frontend
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
-        return jsonify({
-            "image": f"data:image/jpeg;base64,{image_base64}"
-        })
-        
-    except Exception as e:
-        print(f"Error generating image: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/huggingface/test', methods=['GET'])
-def test_huggingface_api():
-    try:
-        # Simple test prompt
-        test_prompt = "a small test image of a star"
-        API_URL = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
-        headers = {"Authorization": f"Bearer {config.HUGGINGFACE_API_KEY}"}
-        
-        # Make a test request
-        response = requests.post(
-            API_URL,
-            headers=headers,
-            json={"inputs": test_prompt}
-        )
-        
-        if response.status_code == 200:
-            return jsonify({
-                "status": "success",
-                "message": "API key is valid and working"
-            })
-        elif response.status_code == 401:
-            return jsonify({
-                "status": "error",
-                "message": "Invalid API key"
-            }), 401
-        else:
-            return jsonify({
-                "status": "error",
-                "message": f"API test failed with status code: {response.status_code}",
-                "details": response.text
-            }), response.status_code
-            
-    except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": "Error testing API key",
-            "error": str(e)
-        }), 500
-
-# Helper function to get unique event types and assign colors
-def get_event_types_with_colors():
-    db_path = os.path.join(app.root_path, 'astronomy.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute('SELECT DISTINCT type FROM events')
-    types = [row['type'] for row in cursor.fetchall()]
-    conn.close()
-    
-    # Assign consistent colors to event types
-    colors = ["#FF5733", "#33A8FF", "#33FF57", "#FF33A8", "#A833FF", "#FFD700", "#4682B4", "#FF6347", "#2E8B57", "#9932CC"]
-    return {event_type: colors[i % len(colors)] for i, event_type in enumerate(types)}
-
-if __name__ == '__main__':
-    app.run(debug=True)
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, send_file, url_for, g
+from flask import before_render_template, template_rendered
+from config import Config
+from http_client import upstream
+from circuit_breaker import CircuitOpen, breakers as circuit_breakers
+import requests
+import json
+from time import perf_counter
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import os
+import base64
+from cache import TTLCache
+from search_cache import SearchCache, normalize_query
+from answer_cache import AnswerCache
+from chat_sessions import ChatSessions, format_history
+from db import Database
+from quiz_bank import QuizBank, NoRepeatSampler
+from weather_cache import WeatherCache, parse_coordinates
+import forecast
+from image_cache import ImageCache
+from image_jobs import ImageJobQueue, ImageStore, QueueFull, MIME_TYPES as IMAGE_MIME_TYPES, TERMINAL_STATES as IMAGE_JOB_DONE
+from health import HealthMonitor, CHECK_TIMEOUT as HEALTH_CHECK_TIMEOUT
+from horoscope import HoroscopeCache, SIGNS as HOROSCOPE_SIGNS, DAYS as HOROSCOPE_DAYS
+import ephemeris
+import star_catalog
+from zodiac import SIGN_PAYLOADS, MAX_BATCH as MAX_ZODIAC_BATCH, parse_month_day, sign_index, batch_signs_json
+from event_catalog import EventCatalog, EVENTS_MIGRATIONS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_date, query_events, featured_events
+from topic_filter import screen_query, is_astronomy_related_response, StreamingRelevanceCheck
+from sse import format_sse, iter_sse_data
+import metrics
+
+config = Config()
+# Caches and generated images are kept in the instance folder; benchmarks/load_test.py points it at a scratch directory
+app = Flask(__name__, instance_path=getattr(config, 'INSTANCE_PATH', None))
+
+# Upstream endpoints; config.py may override any of them, e.g. to point at fake_upstreams.py
+GEMINI_MODEL_URL = getattr(config, 'GEMINI_MODEL_URL',
+                           'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash')
+WEATHER_API_URL = getattr(config, 'WEATHER_API_URL', 'https://api.openweathermap.org/data/2.5/weather')
+ASTRONOMY_API_URL = getattr(config, 'ASTRONOMY_API_URL', 'https://api.astronomyapi.com/api/v2/bodies/positions')
+HUGGINGFACE_MODEL_URL = getattr(config, 'HUGGINGFACE_MODEL_URL',
+                                'https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0')
+AZTRO_URL = getattr(config, 'AZTRO_URL', 'https://aztro.sameerkumar.website/')
+# Token check used by the health checks instead of a full image generation
+HUGGINGFACE_WHOAMI_URL = getattr(config, 'HUGGINGFACE_WHOAMI_URL', 'https://huggingface.co/api/whoami-v2')
+# 'local' computes star map positions in-process (remote API only as fallback); 'remote' always asks the API
+STARMAP_SOURCE = getattr(config, 'STARMAP_SOURCE', 'local')
+# Observing conditions are cached per geohash cell (see weather_cache.py)
+WEATHER_CACHE_TTL = getattr(config, 'WEATHER_CACHE_TTL', 600)
+WEATHER_CELL_PRECISION = getattr(config, 'WEATHER_CELL_PRECISION', 5)
+WEATHER_STALE_SECONDS = getattr(config, 'WEATHER_STALE_SECONDS', 3 * 3600)
+# Multi-night forecasts: OpenWeatherMap refreshes them every 3 hours, and they
+# are shared over larger (geohash length 4, about 39 x 20 km) cells
+WEATHER_FORECAST_URL = getattr(config, 'WEATHER_FORECAST_URL', 'https://api.openweathermap.org/data/2.5/forecast')
+FORECAST_CACHE_TTL = getattr(config, 'FORECAST_CACHE_TTL', 3600)
+FORECAST_CELL_PRECISION = getattr(config, 'FORECAST_CELL_PRECISION', 4)
+
+# Bright-star field for the star map, indexed once at startup (see star_catalog.py)
+bright_stars = None
+if star_catalog.np is not None:
+    try:
+        bright_stars = star_catalog.load_catalog(getattr(config, 'STAR_CATALOG_PATH', star_catalog.CATALOG_PATH))
+    except (OSError, ValueError) as e:
+        app.logger.warning("Star catalog not loaded: %s", e)
+
+# Events database, shared by every request through a connection pool
+db = Database(getattr(config, 'DATABASE_PATH', os.path.join(app.root_path, 'astronomy.db')))
+
+# Database setup function
+def init_db():
+    with db.transaction() as conn:
+        cursor = conn.cursor()
+    
+        # Create events table if it doesn't exist
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            date TEXT NOT NULL,
+            type TEXT NOT NULL,
+            description TEXT,
+            image TEXT
+        )
+        ''')
+    
+        # Check if we have any events already
+        cursor.execute('SELECT COUNT(*) FROM events')
+        if cursor.fetchone()[0] == 0:
+            # Insert sample data if the table is empty
+            sample_events = [
+                (1, "Perseid Meteor Shower", "2025-08-12", "Meteor Shower",
+                 "One of the brightest meteor showers, peaking at 50-75 meteors per hour.",
+                 "https://apod.nasa.gov/apod/image/2008/Perseids_ESO_1080.jpg"),
+                (2, "Total Lunar Eclipse", "2025-05-26", "Eclipse",
+                 "A total lunar eclipse visible from parts of Asia, Australia, and the Americas.",
+                 "https://apod.nasa.gov/apod/image/1801/TotalLunarEclipse_Fairbairn_3000.jpg"),
+                (3, "Jupiter at Opposition", "2025-07-15", "Planetary Event",
+                 "Jupiter will be at its closest approach to Earth, fully illuminated by the Sun.",
+                 "https://apod.nasa.gov/apod/image/2108/Jupiter_Close_Approach_Sankar_3000.jpg"),
+                (4, "Full Moon (Strawberry Moon)", "2025-06-13", "Lunar Phase",
+                 "The June full moon, traditionally called the Strawberry Moon.",
+                 "https://apod.nasa.gov/apod/image/2006/StrawberryMoon_Horalek_1500.jpg"),
+                (5, "Partial Solar Eclipse", "2025-09-30", "Eclipse",
+                 "A partial solar eclipse visible from parts of North America and Europe.",
+                 "https://apod.nasa.gov/apod/image/1708/PartialSolarEclipse_Horalek_1500.jpg"),
+                # Add 5 new events here with appropriate online images
+                (6, "Supermoon", "2025-10-15", "Lunar Phase",
+                 "The Moon appears bigger and brighter than usual as it reaches perigee - its closest point to Earth.",
+                 "https://images.unsplash.com/photo-1496429862132-5ab36b6ae330?q=80&w=1000&auto=format&fit=crop"),
+                (7, "Neowise Comet Approach", "2025-11-03", "Comet",
+                 "Comet Neowise makes its closest approach to Earth, visible with the naked eye in the northern hemisphere.",
+                 "https://images.unsplash.com/photo-1595508064774-5ff825ff0f81?q=80&w=1000&auto=format&fit=crop"),
+                (8, "Venus-Jupiter Conjunction", "2025-11-23", "Planetary Event",
+                 "The two brightest planets appear to meet in the night sky, coming within 0.3 degrees of each other.",
+                 "https://images.unsplash.com/photo-1543722530-d2c3201371e7?q=80&w=1000&auto=format&fit=crop"),
+                (9, "Northern Lights Outburst", "2025-12-21", "Auroral Display",
+                 "A predicted geomagnetic storm will cause spectacular aurora displays visible at unusually low latitudes.",
+                 "https://images.unsplash.com/photo-1483347756197-71ef80e95f73?q=80&w=1000&auto=format&fit=crop"),
+                (10, "Geminid Meteor Storm", "2025-12-14", "Meteor Storm",
+                 "An unusually intense meteor shower with up to 150 meteors per hour at its peak.",
+                 "https://images.unsplash.com/photo-1607437817193-3b3d1b2c7ced?q=80&w=1000&auto=format&fit=crop")
+            ]
+            cursor.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)', sample_events)
+        else:
+            # Check if we need to add the new events
+            cursor.execute('SELECT id FROM events WHERE id = 10')
+            if not cursor.fetchone():
+                # Add the new events
+                new_events = [
+                    (6, "Supermoon", "2025-10-15", "Lunar Phase",
+                     "The Moon appears bigger and brighter than usual as it reaches perigee - its closest point to Earth.",
+                     "https://images.unsplash.com/photo-1496429862132-5ab36b6ae330?q=80&w=1000&auto=format&fit=crop"),
+                    (7, "Neowise Comet Approach", "2025-11-03", "Comet",
+                     "Comet Neowise makes its closest approach to Earth, visible with the naked eye in the northern hemisphere.",
+                     "https://images.unsplash.com/photo-1595508064774-5ff825ff0f81?q=80&w=1000&auto=format&fit=crop"),
+                    (8, "Venus-Jupiter Conjunction", "2025-11-23", "Planetary Event",
+                     "The two brightest planets appear to meet in the night sky, coming within 0.3 degrees of each other.",
+                     "https://images.unsplash.com/photo-1543722530-d2c3201371e7?q=80&w=1000&auto=format&fit=crop"),
+                    (9, "Northern Lights Outburst", "2025-12-21", "Auroral Display",
+                     "A predicted geomagnetic storm will cause spectacular aurora displays visible at unusually low latitudes.",
+                     "https://images.unsplash.com/photo-1483347756197-71ef80e95f73?q=80&w=1000&auto=format&fit=crop"),
+                    (10, "Geminid Meteor Storm", "2025-12-14", "Meteor Storm",
+                     "An unusually intense meteor shower with up to 150 meteors per hour at its peak.",
+                     "https://images.unsplash.com/photo-1607437817193-3b3d1b2c7ced?q=80&w=1000&auto=format&fit=crop")
+                ]
+                cursor.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)', new_events)
+
+    db.migrate(EVENTS_MIGRATIONS)
+
+# Initialize database on startup
+with app.app_context():
+    init_db()
+
+# Date-sorted events kept in memory, re-read only when the table changes
+event_catalog = EventCatalog(db)
+
+# Quiz questions parsed once; the file is re-read when its mtime changes
+quiz_bank = QuizBank(os.path.join(app.root_path, 'static', 'data', 'astronomy_quiz.json'))
+quiz_sampler = NoRepeatSampler(quiz_bank)
+try:
+    quiz_bank.current()
+except (OSError, ValueError) as e:
+    # Reported by /api/quiz/question until the file is fixed
+    app.logger.warning("Quiz bank not loaded: %s", e)
+
+# Standard redirect message for non-astronomy queries
+# Chat reply while Gemini's circuit breaker is open and no cached answer fits
+ASSISTANT_UNAVAILABLE = "The astronomy assistant is temporarily unavailable. Please try again in a minute."
+ASTRONOMY_REDIRECT = "I can only answer questions about astronomy and space topics. Please ask me about planets, stars, galaxies, or other cosmic phenomena instead."
+
+# NASA APOD cache: APOD changes once a day at midnight US Eastern time
+APOD_TIMEZONE = ZoneInfo('America/New_York')
+APOD_STALE_SECONDS = 6 * 3600
+APOD_RETRY_SECONDS = 600
+apod_cache = TTLCache(stale_ttl=APOD_STALE_SECONDS)
+
+def seconds_until_next_apod(apod_data):
+    """Seconds until the next APOD publication, or a short retry if this one is late"""
+    now = datetime.now(APOD_TIMEZONE)
+    # Right after midnight NASA may still be serving yesterday's picture
+    if apod_data.get('date') and apod_data['date'] != now.strftime('%Y-%m-%d'):
+        return APOD_RETRY_SECONDS
+    next_publication = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max((next_publication - now).total_seconds(), 1)
+
+def fetch_apod():
+    params = {'api_key': config.NASA_API_KEY}
+    response = upstream.get('nasa', config.NASA_APOD_URL, params=params)
+    return response.json() if response.status_code == 200 else None
+
+def get_cached_apod():
+    try:
+        return apod_cache.get('apod', fetch_apod, ttl=seconds_until_next_apod)
+    except requests.RequestException:
+        # NASA is down (or its circuit is open): the last picture we had, however old
+        return apod_cache.peek('apod')
+
+# Image search cache (memory LRU in front of a SQLite file in the instance folder)
+search_cache = SearchCache(os.path.join(app.instance_path, 'search_cache.db'))
+
+# Chatbot answers, matched on the normalized question so rewordings share an entry
+answer_cache = AnswerCache(os.path.join(app.instance_path, 'answer_cache.db'))
+
+# Multi-turn chat history per session, kept in memory and optionally in SQLite across restarts
+chat_sessions = ChatSessions(
+    os.path.join(app.instance_path, 'chat_sessions.db') if getattr(config, 'CHAT_SESSIONS_PERSIST', False) else None,
+    max_sessions=getattr(config, 'CHAT_SESSIONS_MAX', 5000),
+    idle_ttl=getattr(config, 'CHAT_SESSION_IDLE_SECONDS', 30 * 60))
+
+def cached_search(provider, url, params, public_params):
+    """Raw JSON body for a search, keyed on the params that don't carry credentials"""
+    def fetch():
+        response = upstream.get(provider, url, params=params)
+        return response.content if response.status_code == 200 else None
+    return search_cache.get(provider, public_params, fetch)
+
+def circuit_open_response(e):
+    """503 for a request whose upstream's circuit breaker is open, saying when to try again"""
+    return (jsonify({"error": f"{e.upstream} is temporarily unavailable", "retry_after": e.retry_after}),
+            503, {'Retry-After': str(e.retry_after)})
+
+# Request metrics for /metrics. A sampled share of responses also gets a
+# Server-Timing header splitting the time between upstream calls, SQLite and templates.
+SERVER_TIMING_SAMPLE_RATE = getattr(config, 'SERVER_TIMING_SAMPLE_RATE', 0.0)
+
+@app.before_request
+def start_request_timer():
+    g.request_timer = metrics.RequestTimer(SERVER_TIMING_SAMPLE_RATE, request.headers.get('X-Request-Start'))
+
+@app.after_request
+def add_server_timing(response):
+    timer = g.get('request_timer')
+    if timer is not None:
+        timer.status = response.status_code
+        server_timing = timer.server_timing()
+        if server_timing:
+            response.headers['Server-Timing'] = server_timing
+    return response
+
+@app.teardown_request
+def finish_request_timer(exc):
+    timer = g.pop('request_timer', None)
+    if timer is not None:
+        timer.finish(request.method, request.url_rule.rule if request.url_rule else None)
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    g.template_started = perf_counter()
+
+@template_rendered.connect_via(app)
+def finish_template_timer(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is not None:
+        metrics.observe_template(template.name or '<string>', perf_counter() - started)
+
+# Routes
+@app.route('/')
+def index():
+    today = datetime.now().date().isoformat()
+    return render_template('index.html', featured_events=featured_events(db, today))
+
+@app.route('/calendar')
+def calendar():
+    # Tag colors and display classes are computed once per snapshot
+    snapshot = event_catalog.snapshot()
+    return render_template('calendar.html', events=snapshot.events, event_types=snapshot.type_colors)
+
+@app.route('/api/quiz/question', methods=['GET'])
+def get_quiz_question():
+    """A quiz question: ?id= for a specific one (a position, or a question's
+    own id), else random, optionally by ?category= and ?difficulty=; with
+    ?session= a session sees no repeats"""
+    try:
+        question_id = request.args.get('id')
+        category = request.args.get('category')
+        difficulty = request.args.get('difficulty')
+        session_id = request.args.get('session')
+
+        body = quiz_bank.get(question_id) if question_id else None
+        if body is None:
+            # Unknown or missing id: pick one at random, as before
+            if session_id:
+                body = quiz_sampler.next(session_id[:64], category, difficulty)
+            else:
+                body = quiz_bank.sample(category, difficulty)
+        if body is None:
+            return jsonify({"error": "No quiz questions match"}), 404
+        return app.response_class(body, mimetype='application/json')
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/astrology')
+def astrology():
+    zodiac_emojis = {
+        "Aries": "♈",
+        "Taurus": "♉",
+        "Gemini": "♊",
+        "Cancer": "♋",
+        "Leo": "♌",
+        "Virgo": "♍",
+        "Libra": "♎",
+        "Scorpio": "♏",
+        "Sagittarius": "♐",
+        "Capricorn": "♑",
+        "Aquarius": "♒",
+        "Pisces": "♓"
+    }
+    return render_template('astrology.html', zodiac_emojis=zodiac_emojis)
+
+@app.route('/chat')
+def chat():
+    # Get NASA APOD for the chat page
+    apod_data = get_cached_apod()
+    return render_template('chat.html', apod=apod_data)
+
+@app.route('/explore')
+def explore():
+    return render_template('explore.html')
+
+@app.route('/starmap')
+def starmap():
+    # New route for interactive star map
+    return render_template('starmap.html')
+
+# API Endpoints
+@app.route('/api/nasa/apod', methods=['GET'])
+def get_nasa_apod():
+    apod_data = get_cached_apod()
+    return jsonify(apod_data if apod_data is not None else {"error": "Failed to fetch APOD"})
+
+@app.route('/api/nasa/search', methods=['GET'])
+def search_nasa_images():
+    query = normalize_query(request.args.get('q', 'stars'))
+    params = {'q': query}
+    try:
+        body = cached_search('nasa', config.NASA_IMAGE_SEARCH_URL, params, params)
+    except CircuitOpen as e:
+        return circuit_open_response(e)
+    if body is None:
+        return jsonify({"error": "Failed to search NASA images"})
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/api/pixabay/search', methods=['GET'])
+def search_pixabay_images():
+    query = normalize_query(request.args.get('q', 'space'))
+    public_params = {
+        'q': query,
+        'image_type': 'photo'
+    }
+    params = dict(public_params, key=config.PIXABAY_API_KEY)
+    try:
+        body = cached_search('pixabay', config.PIXABAY_API_URL, params, public_params)
+    except CircuitOpen as e:
+        return circuit_open_response(e)
+    if body is None:
+        return jsonify({"error": "Failed to search Pixabay images"})
+    return app.response_class(body, mimetype='application/json')
+
+def gemini_chat_request(query, history=''):
+    """Headers and JSON body for asking Gemini an astronomy question, after the conversation so far"""
+    # Ensure the chat stays focused on astronomy
+    prompt = f"""
+    You are CosmicAssistant, an expert in astronomy and space science. Your purpose is to provide accurate, educational information about astronomy, space, planets, stars, galaxies, celestial events, or space exploration.
+
+    MOST CRITICAL RULE: 
+    * You MUST respond to astronomy and space-related questions with helpful, educational information.
+    * For questions about upcoming space events, NASA missions, astronomical observations, or space news, provide informative responses.
+    * For ANY query completely unrelated to astronomy or space science, respond ONLY with exactly:
+      "I can only answer questions about astronomy and space topics. Please ask me about planets, stars, galaxies, or other cosmic phenomena instead."
+    * Space exploration, astronomy history, and current space missions are all valid topics.
+    
+    {history}
+
+    User question: {query}
+    
+    Remember: If the question isn't about astronomy or space, provide ONLY the standard redirection response.
+    """
+    
+    headers = {
+        'Content-Type': 'application/json',
+        'x-goog-api-key': config.GEMINI_API_KEY
+    }
+    
+    data = {
+        "contents": [
+            {
+                "parts": [
+                    {
+                        "text": prompt
+                    }
+                ]
+            }
+        ],
+        "generationConfig": {
+            "temperature": 0.7,
+            "topK": 40,
+            "topP": 0.95,
+            "maxOutputTokens": 1024
+        }
+    }
+    
+    return headers, data
+
+def gemini_reply_text(response_data):
+    # Extract the AI's response from the Gemini response structure
+    return response_data['candidates'][0]['content']['parts'][0]['text']
+
+def is_on_topic(query, previous_question=None):
+    """Screen a chat query (see topic_filter.screen_query), counting which stage decided it"""
+    on_topic, stage = screen_query(query)
+    # A follow-up ("and how big is it?") is judged together with the question before it
+    if not on_topic and stage == 'classifier' and previous_question:
+        on_topic, stage = screen_query(f"{previous_question} {query}")
+    metrics.CHAT_SCREENED.inc(stage, 'on_topic' if on_topic else 'off_topic')
+    return on_topic
+
+def remember_answer(session_id, query, answer, first_turn):
+    """Keep an answer as context for the session's next question, and cache it if it needed no context"""
+    if first_turn:
+        answer_cache.put(query, answer)
+    chat_sessions.add_turn(session_id, query, answer)
+
+def unavailable_reply(query, first_turn):
+    """Degraded chat reply while Gemini is short-circuited: a cached answer, else ASSISTANT_UNAVAILABLE
+
+    First questions already missed the answer cache before Gemini was tried;
+    a follow-up gets a cached answer to its own wording if there is one.
+    """
+    cached_answer = None if first_turn else answer_cache.get(query)
+    return cached_answer or ASSISTANT_UNAVAILABLE
+
+def unavailable_response(e, query, session_id, first_turn):
+    """200 with the degraded reply for a chat request whose Gemini circuit is open"""
+    return (jsonify({"response": unavailable_reply(query, first_turn), "session_id": session_id,
+                     "degraded": True, "retry_after": e.retry_after}),
+            200, {'Retry-After': str(e.retry_after)})
+
+@app.route('/api/chat', methods=['POST'])
+def chat_with_ai():
+    query = request.json.get('query', '')
+    # Stream the reply as Server-Sent Events when asked to
+    stream = bool(request.json.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
+    # Follow-ups send back the session_id of the previous reply
+    session_id, summary, turns = chat_sessions.open(request.json.get('session_id'))
+    done = {"session_id": session_id}
+    
+    # Step 1: Pre-filtering - keywords, then the local classifier, before any network call
+    if not is_on_topic(query, turns[-1][0] if turns else None):
+        if stream:
+            return sse_response([format_sse({"text": ASTRONOMY_REDIRECT}), format_sse(done, event='done')])
+        return jsonify({"response": ASTRONOMY_REDIRECT, "session_id": session_id})
+    
+    # Repeat questions are answered from the cache without calling Gemini, unless
+    # earlier turns may change what they mean
+    cached_answer = answer_cache.get(query) if not turns else None
+    if cached_answer is not None:
+        chat_sessions.add_turn(session_id, query, cached_answer)
+        if stream:
+            return sse_response([format_sse({"text": cached_answer}), format_sse(done, event='done')])
+        return jsonify({"response": cached_answer, "session_id": session_id})
+    
+    headers, data = gemini_chat_request(query, format_history(summary, turns))
+    
+    if stream:
+        return sse_response(stream_gemini_reply(GeminiStreamRelay(query, session_id, not turns), headers, data))
+    
+    # Updated to use Gemini 2.0 Flash model
+    try:
+        response = upstream.post(
+            'gemini',
+            f"{GEMINI_MODEL_URL}:generateContent?key={config.GEMINI_API_KEY}",
+            headers=headers,
+            json=data
+        )
+    except CircuitOpen as e:
+        return unavailable_response(e, query, session_id, not turns)
+    
+    if response.status_code == 200:
+        response_data = response.json()
+        try:
+            ai_response = gemini_reply_text(response_data)
+            
+            # Double-check if response is still astronomy focused
+            if not is_astronomy_related_response(ai_response):
+                return jsonify({"response": ASTRONOMY_REDIRECT, "session_id": session_id})
+            
+            remember_answer(session_id, query, ai_response, not turns)
+            return jsonify({"response": ai_response, "session_id": session_id})
+        except (KeyError, IndexError):
+            return jsonify({"error": "Invalid AI response format"})
+    
+    return jsonify({"error": "Failed to get AI response"})
+
+def sse_response(events):
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+class GeminiStreamRelay:
+    """Turns streamed Gemini chunks into SSE messages for the browser
+
+    Text is held back until the reply so far passes the astronomy check, so an
+    off-topic reply is replaced by the redirect before any of it is sent. A
+    reply that passes is added to the chat session once complete (and to the
+    answer cache when it was the session's first question).
+    """
+
+    def __init__(self, query, session_id, first_turn):
+        self.query = query
+        self.session_id = session_id
+        self.first_turn = first_turn
+        self.relevance = StreamingRelevanceCheck()
+        self.reply = []
+
+    def feed(self, chunk):
+        """SSE "text" message for one decoded Gemini chunk, or '' if nothing can be sent yet"""
+        parts = chunk.get('candidates', [{}])[0].get('content', {}).get('parts', [])
+        chunk_text = ''.join(part.get('text', '') for part in parts)
+        self.reply.append(chunk_text)
+        text = self.relevance.feed(chunk_text)
+        return format_sse({"text": text}) if text else ''
+
+    def finish(self):
+        done = format_sse({"session_id": self.session_id}, event='done')
+        if self.relevance.passed:
+            remember_answer(self.session_id, self.query, ''.join(self.reply), self.first_turn)
+            return done
+        return format_sse({"text": ASTRONOMY_REDIRECT}) + done
+
+    def unavailable(self):
+        """The degraded reply as SSE, for when Gemini's circuit is open"""
+        return (format_sse({"text": unavailable_reply(self.query, self.first_turn), "degraded": True})
+                + format_sse({"session_id": self.session_id}, event='done'))
+
+def stream_gemini_reply(relay, headers, data):
+    """Relay Gemini's streamed reply as SSE "text" events, then a "done" event"""
+    try:
+        response = upstream.post(
+            'gemini',
+            f"{GEMINI_MODEL_URL}:streamGenerateContent?alt=sse&key={config.GEMINI_API_KEY}",
+            headers=headers,
+            json=data,
+            stream=True
+        )
+    except CircuitOpen:
+        yield relay.unavailable()
+        return
+    except Exception as e:
+        yield format_sse({"error": f"Failed to get AI response: {str(e)}"}, event='error')
+        return
+    
+    with response:
+        if response.status_code != 200:
+            yield format_sse({"error": "Failed to get AI response"}, event='error')
+            return
+        
+        try:
+            for chunk in iter_sse_data(response):
+                message = relay.feed(chunk)
+                if message:
+                    yield message
+        except (ValueError, IndexError, AttributeError):
+            yield format_sse({"error": "Invalid AI response format"}, event='error')
+            return
+        yield relay.finish()
+
+@app.route('/api/events', methods=['GET'])
+def get_events():
+    if any(name in request.args for name in ('from', 'to', 'type', 'cursor', 'limit')):
+        return get_events_page()
+    snapshot = event_catalog.snapshot()
+    response = app.response_class(snapshot.json_body, mimetype='application/json')
+    # Clients revalidate with If-None-Match and get a 304 until the events change
+    response.set_etag(snapshot.etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def get_events_page():
+    """Filtered, keyset-paginated events: ?from=&to=&type=&limit=&cursor="""
+    try:
+        start = parse_date(request.args['from']) if request.args.get('from') else None
+        end = parse_date(request.args['to']) if request.args.get('to') else None
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "from and to must be YYYY-MM-DD dates and limit an integer"}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    # type may be repeated or comma-separated
+    types = [t.strip() for value in request.args.getlist('type') for t in value.split(',') if t.strip()]
+    try:
+        events, next_cursor = query_events(db, start, end, types, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify({"events": events, "next_cursor": next_cursor})
+
+@app.route('/api/events/<int:event_id>', methods=['GET'])
+def get_event(event_id):
+    event = event_catalog.snapshot().by_id.get(event_id)
+    
+    if event:
+        return jsonify(event)
+    return jsonify({"error": "Event not found"}), 404
+
+def weather_params(lat, lon):
+    # Weather API call (using OpenWeatherMap as an example)
+    return {
+        'lat': lat,
+        'lon': lon,
+        'appid': config.WEATHER_API_KEY,
+        'units': 'metric'
+    }
+
+def observing_conditions(weather_data):
+    """Stargazing summary for an OpenWeatherMap current-weather payload"""
+    clouds = weather_data.get('clouds', {}).get('all', 0)
+    visibility = weather_data.get('visibility', 0)
+    wind_speed = weather_data.get('wind', {}).get('speed', 0)
+    
+    # Same thresholds as the hourly forecast scores, see forecast.py
+    observing_quality = forecast.observing_quality(clouds, wind_speed, visibility)
+    
+    return {
+        "observing_quality": observing_quality,
+        "cloud_cover_percent": clouds,
+        "wind_speed": wind_speed,
+        "visibility": visibility,
+        "current_weather": weather_data['weather'][0]['description'],
+        "temperature": weather_data['main']['temp']
+    }
+
+class WeatherUnavailable(Exception):
+    """The weather upstream answered with an error status"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Weather API returned {status_code}")
+        self.status_code = status_code
+
+def fetch_weather(lat, lon):
+    response = upstream.get('weather', WEATHER_API_URL, params=weather_params(lat, lon))
+    if response.status_code != 200:
+        raise WeatherUnavailable(response.status_code)
+    return observing_conditions(response.json())
+
+weather_cache = WeatherCache(fetch_weather, ttl=WEATHER_CACHE_TTL, precision=WEATHER_CELL_PRECISION,
+                             stale_seconds=WEATHER_STALE_SECONDS)
+
+def fetch_forecast(lat, lon):
+    response = upstream.get('weather', WEATHER_FORECAST_URL, params=weather_params(lat, lon))
+    if response.status_code != 200:
+        raise WeatherUnavailable(response.status_code)
+    return forecast.stargazing_forecast(response.json(), lat, lon)
+
+forecast_cache = WeatherCache(fetch_forecast, ttl=FORECAST_CACHE_TTL, precision=FORECAST_CELL_PRECISION,
+                              stale_seconds=4 * FORECAST_CACHE_TTL)
+
+@app.route('/api/weather/observing', methods=['GET'])
+def get_observing_conditions():
+    lat = request.args.get('lat')
+    lon = request.args.get('lon')
+    
+    if not lat or not lon:
+        return jsonify({"error": "Latitude and longitude are required"}), 400
+    
+    try:
+        lat, lon = parse_coordinates(lat, lon)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Nearby requests share one cached reading per cell; see weather_cache.py
+    try:
+        return app.response_class(weather_cache.get(lat, lon), mimetype='application/json')
+    except WeatherUnavailable as e:
+        return jsonify({"error": "Failed to fetch weather data"}), e.status_code
+    except CircuitOpen as e:
+        # Only when the cell has no recent reading to fall back on
+        return circuit_open_response(e)
+    except Exception as e:
+        return jsonify({"error": f"Weather API error: {str(e)}"}), 500
+
+@app.route('/api/weather/forecast', methods=['GET'])
+def get_stargazing_forecast():
+    """Hourly stargazing scores over the forecast period and the best observing windows"""
+    try:
+        lat, lon = parse_coordinates(request.args.get('lat'), request.args.get('lon'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Valid latitude and longitude are required"}), 400
+    if forecast.np is None or ephemeris.np is None:
+        return jsonify({"error": "Forecast scoring needs NumPy"}), 503
+    
+    try:
+        return app.response_class(forecast_cache.get(lat, lon), mimetype='application/json')
+    except WeatherUnavailable as e:
+        return jsonify({"error": "Failed to fetch weather forecast"}), e.status_code
+    except CircuitOpen as e:
+        return circuit_open_response(e)
+    except Exception as e:
+        return jsonify({"error": f"Weather API error: {str(e)}"}), 500
+
+def starmap_moment(date, time=None):
+    """UTC moment for a star map: date (YYYY-MM-DD) at time (HH:MM[:SS] UTC), default the current time of day"""
+    day = datetime.strptime(date, '%Y-%m-%d').date()
+    if time:
+        clock = datetime.strptime(time, '%H:%M:%S' if time.count(':') == 2 else '%H:%M').time()
+    else:
+        clock = datetime.now(timezone.utc).time().replace(microsecond=0)
+    return datetime.combine(day, clock, tzinfo=timezone.utc)
+
+def star_filters(args):
+    """Star field options from the query string: mag, fov, view_alt, view_az; stars=0 leaves the stars out
+
+    Raises ValueError for malformed values.
+    """
+    if args.get('stars') == '0':
+        return None
+    filters = {
+        'mag_limit': float(args.get('mag', star_catalog.DEFAULT_MAG_LIMIT)),
+        'center_alt': float(args.get('view_alt', 90)),
+        'center_az': float(args.get('view_az', 0)),
+        'fov': float(args['fov']) if args.get('fov') else None,
+    }
+    if not -90 <= filters['center_alt'] <= 90:
+        raise ValueError("view_alt must be within [-90, 90]")
+    if filters['fov'] is not None and not 0 < filters['fov'] <= 360:
+        raise ValueError("fov must be within (0, 360] degrees")
+    return filters
+
+def local_starmap(lat, lon, date, time=None, stars=None):
+    """Positions from the local ephemeris, or None if it can't serve this request
+
+    stars holds star_filters() options; the matching catalog stars are added
+    as data.stars (columns of name, ra, dec, mag, bv, alt, az).
+    Raises ValueError for malformed coordinates, dates or times.
+    """
+    if STARMAP_SOURCE != 'local' or ephemeris.np is None:
+        return None
+    lat, lon = float(lat), float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+    moment = starmap_moment(date, time)
+    jd = ephemeris.julian_day(moment)
+    if not ephemeris.in_valid_range(jd):
+        return None
+    positions = ephemeris.positions_payload(moment, lat, lon)
+    if stars is not None and bright_stars is not None:
+        positions['data']['stars'] = star_catalog.star_columns(bright_stars.visible(jd, lat, lon, **stars))
+    return positions
+
+def starmap_params(lat, lon, date):
+    # Using Astronomy API (example - you'll need to sign up for an appropriate service)
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'date': date,
+        'apiKey': config.ASTRONOMY_API_KEY
+    }
+
+@app.route('/api/starmap/data', methods=['GET'])
+def get_starmap_data():
+    lat = request.args.get('lat', '0')
+    lon = request.args.get('lon', '0')
+    date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+    
+    try:
+        positions = local_starmap(lat, lon, date, request.args.get('time'), star_filters(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if positions is not None:
+        return jsonify(positions)
+    
+    # Remote API: configured as the source, or the date is outside the local ephemeris range
+    try:
+        response = upstream.get('astronomyapi', ASTRONOMY_API_URL, params=starmap_params(lat, lon, date))
+        if response.status_code == 200:
+            return jsonify(response.json())
+        else:
+            return jsonify({"error": "Failed to fetch star map data"}), response.status_code
+    except CircuitOpen as e:
+        return circuit_open_response(e)
+    except Exception as e:
+        return jsonify({"error": f"Star map API error: {str(e)}"}), 500
+
+@app.route('/api/zodiac', methods=['POST'])
+def calculate_zodiac():
+    birth_date = request.json.get('birth_date', '')
+    try:
+        # Parse month and day from birth_date (format: YYYY-MM-DD)
+        month, day = parse_month_day(birth_date)
+        
+        # Precomputed day-of-year table and response bodies, see zodiac.py
+        index = sign_index(month, day)
+        if index is None:
+            return jsonify({"error": "Could not determine zodiac sign"})
+        
+        return app.response_class(SIGN_PAYLOADS[index], mimetype='application/json')
+    
+    except Exception as e:
+        return jsonify({"error": str(e)})
+
+@app.route('/api/zodiac/batch', methods=['POST'])
+def calculate_zodiac_batch():
+    """Signs for many birth dates at once: {"birth_dates": [...]} -> {"signs": [...]}, null for invalid dates"""
+    birth_dates = (request.get_json(silent=True) or {}).get('birth_dates')
+    if not isinstance(birth_dates, list):
+        return jsonify({"error": "birth_dates must be a list of YYYY-MM-DD strings"}), 400
+    if len(birth_dates) > MAX_ZODIAC_BATCH:
+        return jsonify({"error": f"At most {MAX_ZODIAC_BATCH} birth dates per request"}), 400
+    body = b'{"signs":' + batch_signs_json(birth_dates) + b'}'
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/api/horoscope', methods=['GET'])
+def get_horoscope():
+    sign = request.args.get('sign', '').lower()
+    day = request.args.get('day', 'today')
+    
+    # Validate sign
+    if (sign not in HOROSCOPE_SIGNS):
+        return jsonify({"error": "Invalid zodiac sign"}), 400
+    
+    # Validate day
+    if day not in HOROSCOPE_DAYS:
+        return jsonify({"error": "Day must be yesterday, today, or tomorrow"}), 400
+    
+    # Cached per (sign, day, date); falls back to the last good or a generated horoscope
+    return app.response_class(horoscope_cache.get(sign, day), mimetype='application/json')
+
+def fetch_horoscope(sign, day):
+    """Horoscope from the Aztro API, or None if it answered with an error"""
+    response = upstream.post('aztro', AZTRO_URL, params={"sign": sign, "day": day})
+    if response.status_code != 200:
+        print(f"Aztro API returned status code: {response.status_code}")
+        return None
+    return response.json()
+
+# Horoscopes for all 12 signs x 3 days, fetched in the background and refreshed at local midnight
+horoscope_cache = HoroscopeCache(fetch_horoscope)
+if getattr(config, 'HOROSCOPE_WARMUP', True):
+    horoscope_cache.start()
+
+def huggingface_headers():
+    return {"Authorization": f"Bearer {config.HUGGINGFACE_API_KEY}"}
+
+def image_data_url(image_bytes):
+    # Convert to base64 for sending to frontend
+    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+    return {"image": f"data:image/jpeg;base64,{image_base64}"}
+
+class ImageGenerationError(Exception):
+    """The image model answered with an error status"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Failed to generate image (status {status_code})")
+        self.status_code = status_code
+
+def generate_image_bytes(prompt):
+    response = upstream.post('huggingface', HUGGINGFACE_MODEL_URL, headers=huggingface_headers(),
+                             json={"inputs": prompt})
+    if response.status_code != 200:
+        raise ImageGenerationError(response.status_code)
+    return response.content
+
+# Generated images, stored under content-hash names and served by get_generated_image.
+# Repeated prompts are answered from the image cache; identical prompts submitted
+# while one is being generated share that job.
+image_store = ImageStore(getattr(config, 'IMAGE_STORE_DIR', os.path.join(app.instance_path, 'generated_images')))
+image_cache = ImageCache(os.path.join(app.instance_path, 'image_cache.db'), image_store, HUGGINGFACE_MODEL_URL,
+                         disk_limit=getattr(config, 'IMAGE_CACHE_BYTES', 512 * 1024 * 1024))
+image_jobs = ImageJobQueue(generate_image_bytes, image_store,
+                           workers=getattr(config, 'IMAGE_WORKERS', 2),
+                           max_pending=getattr(config, 'IMAGE_QUEUE_LIMIT', 32),
+                           cache=image_cache)
+# Seconds between keep-alive comments on a job's event stream, and its longest life
+IMAGE_EVENTS_KEEPALIVE = 15
+IMAGE_EVENTS_TIMEOUT = 600
+
+def image_job_payload(job):
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "image_url": url_for('get_generated_image', name=job['image']) if job['image'] else None,
+        "cached": job['cached'],
+        "error": job['error'],
+        "status_url": url_for('get_image_job', job_id=job['id']),
+        "events_url": url_for('image_job_events', job_id=job['id']),
+    }
+
+@app.route('/api/huggingface/jobs', methods=['POST'])
+def create_image_job():
+    """Queue an image generation: {"prompt": ...} -> 202 with the job ID and where to follow it"""
+    prompt = (request.get_json(silent=True) or {}).get('prompt')
+    if not prompt or not isinstance(prompt, str):
+        return jsonify({"error": "No prompt provided"}), 400
+    try:
+        job = image_jobs.submit(prompt)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '30'}
+    payload = image_job_payload(job)
+    # A cached prompt comes back already done
+    return jsonify(payload), 200 if job['status'] in IMAGE_JOB_DONE else 202, {'Location': payload['status_url']}
+
+@app.route('/api/huggingface/generate', methods=['POST'])
+def generate_image():
+    """Generate an image and wait for it; the job API above avoids holding the request open"""
+    data = request.json
+    prompt = data.get('prompt')
+    
+    if not prompt:
+        return jsonify({"error": "No prompt provided"}), 400
+    
+    # Through the job queue, so this shares its cache and in-flight generations
+    try:
+        job = wait_for_image_job(image_jobs.submit(prompt))
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '30'}
+    payload, status = image_job_outcome(job)
+    return jsonify(payload), status
+
+def wait_for_image_job(job, timeout=IMAGE_EVENTS_TIMEOUT):
+    """The job once it is done or failed, the latest snapshot after timeout, or None if it expired"""
+    deadline = datetime.now().timestamp() + timeout
+    version = image_jobs.version
+    job = image_jobs.get(job['id'])
+    while job is not None and job['status'] not in IMAGE_JOB_DONE:
+        remaining = deadline - datetime.now().timestamp()
+        if remaining <= 0:
+            break
+        job, version = image_jobs.wait(job['id'], version, remaining)
+    return job
+
+def image_job_outcome(job):
+    """(payload, status) answering /api/huggingface/generate for a finished job: the image as a data URL"""
+    if job is None or job['status'] not in IMAGE_JOB_DONE:
+        return {"error": "Image generation timed out"}, 504
+    if job['status'] == 'failed':
+        if job['error_status']:
+            return {"error": "Failed to generate image"}, job['error_status']
+        return {"error": job['error']}, 500
+    path = image_store.path(job['image'])
+    if path is None:
+        return {"error": "Image not found"}, 500
+    with open(path, 'rb') as f:
+        return image_data_url(f.read()), 200
+
+@app.route('/api/huggingface/jobs/<job_id>', methods=['GET'])
+def get_image_job(job_id):
+    job = image_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(image_job_payload(job))
+
+@app.route('/api/huggingface/jobs/<job_id>/events', methods=['GET'])
+def image_job_events(job_id):
+    """SSE stream of a job: a "status" event per change, then "done" once it finished or failed"""
+    version = image_jobs.version
+    job = image_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    def events(job, version):
+        deadline = datetime.now().timestamp() + IMAGE_EVENTS_TIMEOUT
+        last_status, timed_out = None, False
+        while job is not None and datetime.now().timestamp() < deadline:
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield format_sse(image_job_payload(job), event='status')
+                if last_status in IMAGE_JOB_DONE:
+                    yield format_sse(image_job_payload(job), event='done')
+                    return
+            elif timed_out:
+                yield ": keep-alive\n\n"
+            # Wakes on any job's change, or after the keep-alive interval
+            job, new_version = image_jobs.wait(job_id, version, IMAGE_EVENTS_KEEPALIVE)
+            timed_out, version = new_version == version, new_version
+        yield format_sse({"error": "Job expired" if job is None else "Timed out"}, event='error')
+    
+    return sse_response(events(job, version))
+
+@app.route('/api/huggingface/images/<name>', methods=['GET'])
+def get_generated_image(name):
+    """A generated image as raw bytes; names are content hashes, so it can be cached forever"""
+    path = image_store.path(name)
+    if path is None:
+        return jsonify({"error": "Image not found"}), 404
+    response = send_file(path, mimetype=IMAGE_MIME_TYPES[name.rsplit('.', 1)[1]], conditional=True,
+                         etag=name.split('.')[0], max_age=365 * 24 * 3600)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+def health_probe(upstream_name, method, url, **kwargs):
+    """One cheap request for the health checks: no retries, short timeouts"""
+    return lambda: upstream.request(upstream_name, method, url, retries=0, timeout=HEALTH_CHECK_TIMEOUT, **kwargs)
+
+# With the local ephemeris, AstronomyAPI only serves dates outside its range,
+# so it is reported but doesn't degrade the overall status
+HEALTH_OPTIONAL = ('astronomyapi',) if STARMAP_SOURCE == 'local' else ()
+
+# Metadata and HEAD requests only: none of these runs a model or uses generation quota
+health_monitor = HealthMonitor({
+    'huggingface': health_probe('huggingface', 'GET', HUGGINGFACE_WHOAMI_URL, headers=huggingface_headers()),
+    'gemini': health_probe('gemini', 'GET', GEMINI_MODEL_URL, headers={'x-goog-api-key': config.GEMINI_API_KEY}),
+    'nasa': health_probe('nasa', 'HEAD', config.NASA_APOD_URL, params={'api_key': config.NASA_API_KEY}),
+    'pixabay': health_probe('pixabay', 'HEAD', config.PIXABAY_API_URL, params={'key': config.PIXABAY_API_KEY}),
+    'weather': health_probe('weather', 'HEAD', WEATHER_API_URL, params=weather_params(0, 0)),
+    # Same credentials as the star map requests, or it can only ever report unauthorized
+    'astronomyapi': health_probe('astronomyapi', 'HEAD', ASTRONOMY_API_URL,
+                                 params={'apiKey': config.ASTRONOMY_API_KEY}),
+    'aztro': health_probe('aztro', 'HEAD', AZTRO_URL),
+}, ttl=getattr(config, 'HEALTH_TTL', 30), optional=HEALTH_OPTIONAL)
+
+@app.route('/api/health', methods=['GET'])
+def get_health():
+    """Aggregated upstream health; 200 unless ?strict=1 and something is not ok"""
+    report = health_monitor.report()
+    status = 503 if request.args.get('strict') == '1' and report['status'] != 'ok' else 200
+    return jsonify(report), status
+
+@app.route('/api/huggingface/test', methods=['GET'])
+def test_huggingface_api():
+    # Answered from the cached health checks, which only ask HuggingFace who the token belongs to
+    result = health_monitor.check('huggingface')
+    if result['status'] == 'ok':
+        return jsonify({
+            "status": "success",
+            "message": "API key is valid and working"
+        })
+    elif result['status'] == 'unauthorized':
+        return jsonify({
+            "status": "error",
+            "message": "Invalid API key"
+        }), 401
+    elif 'http_status' in result:
+        return jsonify({
+            "status": "error",
+            "message": f"API test failed with status code: {result['http_status']}"
+        }), result['http_status']
+    else:
+        return jsonify({
+            "status": "error",
+            "message": "Error testing API key",
+            "error": result['error']
+        }), 500
+
+@metrics.registry.collector
+def collect_app_metrics():
+    """Scrape-time metrics from the statistics the caches, breakers and image queue already keep"""
+    search, answers, images = search_cache.report(), answer_cache.report(), image_cache.report()
+    lookups = {
+        'apod': (apod_cache.stats['hits'] + apod_cache.stats['stale_hits'], apod_cache.stats['misses']),
+        'search': (search['memory_hits'] + search['disk_hits'], search['misses']),
+        'answers': (answers['exact_hits'] + answers['similar_hits'], answers['misses']),
+        'images': (images['hits'], images['misses']),
+    }
+    for name, cache in (('horoscopes', horoscope_cache), ('weather', weather_cache), ('forecast', forecast_cache)):
+        stats = cache.report()['cache']
+        lookups[name] = (stats['hits'] + stats['stale_hits'], stats['misses'])
+    yield ('cache_lookups_total', 'counter', 'Cache lookups by result',
+           [({'cache': name, 'result': result}, count)
+            for name, counts in lookups.items() for result, count in zip(('hit', 'miss'), counts)])
+    yield ('cache_hit_ratio', 'gauge', 'Share of cache lookups answered without a load since start',
+           [({'cache': name}, hits / (hits + misses) if hits + misses else None)
+            for name, (hits, misses) in lookups.items()])
+
+    breakers = circuit_breakers.report()
+    yield ('circuit_breaker_state', 'gauge', 'Circuit state: 0 closed, 1 half-open, 2 open',
+           [({'upstream': name}, breaker['state_value']) for name, breaker in breakers.items()])
+    yield ('circuit_breaker_transitions_total', 'counter', 'Circuit state changes',
+           [({'upstream': name, 'transition': transition}, count)
+            for name, breaker in breakers.items() for transition, count in breaker['transitions'].items()])
+    yield ('circuit_breaker_rejected_total', 'counter', 'Calls refused while a circuit was open',
+           [({'upstream': name}, breaker['rejected']) for name, breaker in breakers.items()])
+
+    client = upstream.stats()
+    yield ('upstream_retries_total', 'counter', 'Upstream attempts repeated after an error', [({}, client['retries'])])
+    yield ('upstream_busy_total', 'counter', 'Upstream requests refused for want of a free slot', [({}, client['busy'])])
+
+    sessions = chat_sessions.report()
+    yield ('chat_sessions', 'gauge', 'Chat sessions held in memory', [({}, sessions['sessions'])])
+    yield ('chat_session_history_tokens', 'gauge', 'Estimated tokens of chat history held in memory',
+           [({}, sessions['tokens'])])
+    yield ('chat_sessions_removed_total', 'counter', 'Chat sessions dropped from memory by reason',
+           [({'reason': 'evicted'}, sessions['evictions']), ({'reason': 'idle'}, sessions['expired'])])
+
+    jobs = image_jobs.report()
+    yield ('image_jobs', 'gauge', 'Image jobs by state',
+           [({'state': state}, jobs[state]) for state in ('queued', 'running')])
+    yield ('image_jobs_total', 'counter', 'Image job submissions by result',
+           [({'result': result}, jobs[result])
+            for result in ('completed', 'failed', 'rejected', 'joined', 'from_cache')])
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    return app.response_class(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/upstream/stats', methods=['GET'])
+def get_upstream_stats():
+    """Outbound request counters, and the state and transitions of each upstream's circuit breaker"""
+    return jsonify({"client": upstream.stats(), "breakers": circuit_breakers.report()})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        "apod": apod_cache.stats,
+        "search": search_cache.report(),
+        "answers": answer_cache.report(),
+        "chat_sessions": chat_sessions.report(),
+        "db": db.report(),
+        "events": event_catalog.stats,
+        "horoscopes": horoscope_cache.report(),
+        "weather": weather_cache.report(),
+        "forecast": forecast_cache.report(),
+        "image_jobs": image_jobs.report(),
+        "image_cache": image_cache.report()
+    })
+
+if __name__ == '__main__':
+    app.run(debug=True)
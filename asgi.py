@@ -0,0 +1,300 @@
+"""ASGI entry point: async versions of the I/O-bound API routes, Flask for the rest
+
+Run with an ASGI server, e.g.
+
+    uvicorn asgi:application --workers 2
+
+/api/chat, /api/huggingface/generate and /api/starmap/data are served by
+Quart handlers that await upstream calls on one shared httpx client, so a slow
+Gemini or HuggingFace reply costs a coroutine rather than a worker thread.
+/api/weather/observing reads the per-cell weather cache shared with the Flask
+app, fetching misses in a worker thread, and the image job event stream
+(/api/huggingface/jobs/<id>/events) is followed from a coroutine. Every other path is passed to the
+Flask app in app.py, which keeps working on its own with ``python app.py``
+or any WSGI server.
+"""
+import asyncio
+from datetime import datetime
+
+from quart import Quart, Response, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+from app import (app as flask_app, config, answer_cache, chat_sessions, remember_answer, ASTRONOMY_REDIRECT,
+                 unavailable_reply,
+                 GEMINI_MODEL_URL, ASTRONOMY_API_URL,
+                 GeminiStreamRelay, gemini_chat_request, gemini_reply_text, is_on_topic,
+                 weather_cache, WeatherUnavailable, local_starmap, star_filters, starmap_params,
+                 image_jobs, image_job_payload, image_job_outcome, QueueFull,
+                 IMAGE_JOB_DONE, IMAGE_EVENTS_TIMEOUT, IMAGE_EVENTS_KEEPALIVE, SERVER_TIMING_SAMPLE_RATE)
+from http_client import AsyncUpstreamClient
+from chat_sessions import format_history
+from circuit_breaker import CircuitOpen
+from metrics import RequestTimer
+from weather_cache import parse_coordinates
+from sse import format_sse, aiter_sse_data
+from topic_filter import is_astronomy_related_response
+from wsgi_pool import WsgiThreadPool, WORKERS as WSGI_WORKERS
+
+async_app = Quart(__name__)
+async_upstream = AsyncUpstreamClient()
+# Seconds between job state checks while waiting on an image job
+IMAGE_EVENTS_POLL = 0.5
+
+
+@async_app.after_serving
+async def close_upstream():
+    await async_upstream.aclose()
+
+
+# The same request metrics as the Flask routes, in the shared registry behind /metrics
+@async_app.before_request
+async def start_request_timer():
+    g.request_timer = RequestTimer(SERVER_TIMING_SAMPLE_RATE, request.headers.get('X-Request-Start'))
+
+
+@async_app.after_request
+async def add_server_timing(response):
+    timer = g.get('request_timer')
+    if timer is not None:
+        timer.status = response.status_code
+        server_timing = timer.server_timing()
+        if server_timing:
+            response.headers['Server-Timing'] = server_timing
+    return response
+
+
+@async_app.teardown_request
+async def finish_request_timer(exc):
+    timer = g.pop('request_timer', None)
+    if timer is not None:
+        timer.finish(request.method, request.url_rule.rule if request.url_rule else None)
+
+
+def sse_response(events):
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def circuit_open_response(e):
+    return (jsonify({"error": f"{e.upstream} is temporarily unavailable", "retry_after": e.retry_after}),
+            503, {'Retry-After': str(e.retry_after)})
+
+
+async def sse_messages(*messages):
+    for message in messages:
+        yield message
+
+
+@async_app.route('/api/chat', methods=['POST'])
+async def chat_with_ai():
+    payload = await request.get_json()
+    query = payload.get('query', '')
+    stream = bool(payload.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
+    # Sessions may be read back from and written through to SQLite, so off the event loop
+    session_id, summary, turns = await asyncio.to_thread(chat_sessions.open, payload.get('session_id'))
+    done = {"session_id": session_id}
+
+    if not is_on_topic(query, turns[-1][0] if turns else None):
+        if stream:
+            return sse_response(sse_messages(format_sse({"text": ASTRONOMY_REDIRECT}), format_sse(done, event='done')))
+        return jsonify({"response": ASTRONOMY_REDIRECT, "session_id": session_id})
+
+    cached_answer = await asyncio.to_thread(answer_cache.get, query) if not turns else None
+    if cached_answer is not None:
+        await asyncio.to_thread(chat_sessions.add_turn, session_id, query, cached_answer)
+        if stream:
+            return sse_response(sse_messages(format_sse({"text": cached_answer}), format_sse(done, event='done')))
+        return jsonify({"response": cached_answer, "session_id": session_id})
+
+    headers, data = gemini_chat_request(query, format_history(summary, turns))
+    if stream:
+        return sse_response(stream_gemini_reply(GeminiStreamRelay(query, session_id, not turns), headers, data))
+
+    try:
+        response = await async_upstream.post(
+            'gemini',
+            f"{GEMINI_MODEL_URL}:generateContent?key={config.GEMINI_API_KEY}",
+            headers=headers,
+            json=data
+        )
+    except CircuitOpen as e:
+        # Degraded reply rather than an error; a follow-up may look in the answer cache
+        reply = await asyncio.to_thread(unavailable_reply, query, not turns)
+        return (jsonify({"response": reply, "session_id": session_id, "degraded": True, "retry_after": e.retry_after}),
+                200, {'Retry-After': str(e.retry_after)})
+    if response.status_code == 200:
+        try:
+            ai_response = gemini_reply_text(response.json())
+            if not is_astronomy_related_response(ai_response):
+                return jsonify({"response": ASTRONOMY_REDIRECT, "session_id": session_id})
+            await asyncio.to_thread(remember_answer, session_id, query, ai_response, not turns)
+            return jsonify({"response": ai_response, "session_id": session_id})
+        except (KeyError, IndexError):
+            return jsonify({"error": "Invalid AI response format"})
+
+    return jsonify({"error": "Failed to get AI response"})
+
+
+async def stream_gemini_reply(relay, headers, data):
+    try:
+        response = await async_upstream.post(
+            'gemini',
+            f"{GEMINI_MODEL_URL}:streamGenerateContent?alt=sse&key={config.GEMINI_API_KEY}",
+            headers=headers,
+            json=data,
+            stream=True
+        )
+    except CircuitOpen:
+        yield await asyncio.to_thread(relay.unavailable)
+        return
+    except Exception as e:
+        yield format_sse({"error": f"Failed to get AI response: {str(e)}"}, event='error')
+        return
+
+    try:
+        if response.status_code != 200:
+            yield format_sse({"error": "Failed to get AI response"}, event='error')
+            return
+
+        try:
+            async for chunk in aiter_sse_data(response):
+                message = relay.feed(chunk)
+                if message:
+                    yield message
+        except (ValueError, IndexError, AttributeError):
+            yield format_sse({"error": "Invalid AI response format"}, event='error')
+            return
+        # finish() writes the answer through to the SQLite answer cache
+        yield await asyncio.to_thread(relay.finish)
+    finally:
+        await response.aclose()
+
+
+@async_app.route('/api/weather/observing', methods=['GET'])
+async def get_observing_conditions():
+    lat = request.args.get('lat')
+    lon = request.args.get('lon')
+
+    if not lat or not lon:
+        return jsonify({"error": "Latitude and longitude are required"}), 400
+
+    try:
+        lat, lon = parse_coordinates(lat, lon)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Same per-cell cache as the Flask route, so both share one upstream fetch per
+    # cell; a miss blocks on that fetch, so it runs in a worker thread
+    try:
+        body = await asyncio.to_thread(weather_cache.get, lat, lon)
+        return Response(body, mimetype='application/json')
+    except WeatherUnavailable as e:
+        return jsonify({"error": "Failed to fetch weather data"}), e.status_code
+    except CircuitOpen as e:
+        return circuit_open_response(e)
+    except Exception as e:
+        return jsonify({"error": f"Weather API error: {str(e)}"}), 500
+
+
+@async_app.route('/api/starmap/data', methods=['GET'])
+async def get_starmap_data():
+    lat = request.args.get('lat', '0')
+    lon = request.args.get('lon', '0')
+    date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+
+    # Computed locally in a few milliseconds; only the remote fallback is awaited
+    try:
+        positions = local_starmap(lat, lon, date, request.args.get('time'), star_filters(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if positions is not None:
+        return jsonify(positions)
+
+    try:
+        response = await async_upstream.get('astronomyapi', ASTRONOMY_API_URL,
+                                            params=starmap_params(lat, lon, date))
+        if response.status_code == 200:
+            return jsonify(response.json())
+        else:
+            return jsonify({"error": "Failed to fetch star map data"}), response.status_code
+    except CircuitOpen as e:
+        return circuit_open_response(e)
+    except Exception as e:
+        return jsonify({"error": f"Star map API error: {str(e)}"}), 500
+
+
+@async_app.route('/api/huggingface/generate', methods=['POST'])
+async def generate_image():
+    data = await request.get_json()
+    prompt = data.get('prompt')
+
+    if not prompt:
+        return jsonify({"error": "No prompt provided"}), 400
+
+    # Through the shared job queue (cache, in-flight dedupe), waiting in a coroutine
+    try:
+        # submit() looks the prompt up in the on-disk image cache
+        job = await asyncio.to_thread(image_jobs.submit, prompt)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '30'}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + IMAGE_EVENTS_TIMEOUT
+    while job is not None and job['status'] not in IMAGE_JOB_DONE and loop.time() < deadline:
+        await asyncio.sleep(IMAGE_EVENTS_POLL)
+        job = image_jobs.get(job['id'])
+    payload, status = await asyncio.to_thread(image_job_outcome, job)
+    return jsonify(payload), status
+
+
+@async_app.route('/api/huggingface/jobs/<job_id>/events', methods=['GET'])
+async def image_job_events(job_id):
+    """Same events as the Flask route, but a waiting client costs a coroutine rather than a thread"""
+    if image_jobs.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + IMAGE_EVENTS_TIMEOUT
+        last_status, last_sent = None, loop.time()
+        while loop.time() < deadline:
+            job = image_jobs.get(job_id)
+            if job is None:
+                yield format_sse({"error": "Job expired"}, event='error')
+                return
+            if job['status'] != last_status:
+                last_status, last_sent = job['status'], loop.time()
+                # image_job_payload builds its (relative) URLs with Flask's url_for
+                with flask_app.test_request_context():
+                    body = image_job_payload(job)
+                yield format_sse(body, event='status')
+                if last_status in IMAGE_JOB_DONE:
+                    yield format_sse(body, event='done')
+                    return
+            elif loop.time() - last_sent >= IMAGE_EVENTS_KEEPALIVE:
+                last_sent = loop.time()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(IMAGE_EVENTS_POLL)
+        yield format_sse({"error": "Timed out"}, event='error')
+
+    return sse_response(events())
+
+
+async_routes = async_app.url_map.bind('localhost')
+# Flask is thread-safe (the threaded WSGI server relies on it too), so its
+# requests run concurrently on a pool of our own
+wsgi_fallback = WsgiThreadPool(flask_app, workers=getattr(config, 'WSGI_WORKERS', WSGI_WORKERS))
+
+
+def is_async_route(scope):
+    try:
+        endpoint, _ = async_routes.match(scope['path'], method=scope.get('method', 'GET'))
+    except HTTPException:
+        return False
+    return endpoint != 'static'
+
+
+async def application(scope, receive, send):
+    """Route the async paths to Quart and everything else to the Flask app"""
+    if scope['type'] == 'lifespan' or is_async_route(scope):
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_fallback(scope, receive, send)
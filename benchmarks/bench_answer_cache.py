@@ -0,0 +1,138 @@
+"""Benchmark: which rewordings the chatbot answer cache serves, and what a lookup costs
+
+Run from the repository root:
+
+    python benchmarks/bench_answer_cache.py
+
+Caches one answer per question in SEEDED, then checks that every rewording
+in MUST_MATCH gets that answer back and that no question in MUST_NOT_MATCH
+does: those ask about a different body, a different reference body or a
+different number, compare the same bodies the other way round, or ask in
+another tense, however close the wording. Any failure fails the run.
+Also times exact and similar lookups and misses against a full cache, and
+exact lookups while another thread keeps adding answers.
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_cache import AnswerCache, MAX_ENTRIES
+
+SEEDED = (
+    "How far is Mars from Earth?",
+    "How big is Mars?",
+    "How many moons does Jupiter have?",
+    "What is the temperature on Venus?",
+    "How long does light take to reach us from the Sun?",
+    "What happened in 1969 on the Moon?",
+    "Is Jupiter bigger than Saturn?",
+    "Is Pluto a planet?",
+)
+
+# (cached question, rewording that must get its answer)
+MUST_MATCH = (
+    ("How far is Mars from Earth?", "how far is mars from earth"),
+    ("How far is Mars from Earth?", "How far away is Mars from the Earth?"),
+    ("How far is Mars from Earth?", "What is the distance from Earth to Mars?"),
+    ("How big is Mars?", "What is the size of Mars?"),
+    ("How many moons does Jupiter have?", "Please tell me how many moons do Jupiter have"),
+    ("What is the temperature on Venus?", "How hot is it on Venus?"),
+    ("Is Jupiter bigger than Saturn?", "Jupiter: is it bigger than Saturn?"),
+    ("Is Pluto a planet?", "Is Pluto really a planet?"),
+)
+
+# (cached question, near miss that must not get its answer)
+MUST_NOT_MATCH = (
+    ("How far is Mars from Earth?", "How far is Mars from the Sun?"),
+    ("How far is Mars from Earth?", "How far is the Moon from Mars?"),
+    ("How far is Mars from Earth?", "How far is Venus from Earth?"),
+    ("How far is Mars from Earth?", "How far is Mars?"),
+    ("How big is Mars?", "How big is Phobos?"),
+    ("How big is Mars?", "How big is the atmosphere of Mars?"),
+    ("How many moons does Jupiter have?", "How many moons does Saturn have?"),
+    ("What is the temperature on Venus?", "What is the temperature on Mercury?"),
+    ("What happened in 1969 on the Moon?", "What happened in 1972 on the Moon?"),
+    ("How long does light take to reach us from the Sun?", "How long does light take to reach us from Sirius?"),
+    ("Is Jupiter bigger than Saturn?", "Is Saturn bigger than Jupiter?"),
+    ("Is Jupiter bigger than Saturn?", "Is Jupiter smaller than Saturn?"),
+    ("Is Pluto a planet?", "Was Pluto a planet?"),
+    ("Is Pluto a planet?", "Will Pluto be a planet?"),
+)
+
+
+def answer_for(question):
+    return f"answer to {question!r}"
+
+
+def check_matches(path):
+    cache = AnswerCache(path)
+    for question in SEEDED:
+        cache.put(question, answer_for(question))
+    failures = []
+    for cached, query in MUST_MATCH:
+        if cache.get(query) != answer_for(cached):
+            failures.append(f"  missed: {query!r} should reuse {cached!r}")
+    for cached, query in MUST_NOT_MATCH:
+        if cache.get(query) == answer_for(cached):
+            failures.append(f"  wrong answer: {query!r} got the answer to {cached!r}")
+    matched = len(MUST_MATCH) - sum(f.startswith('  missed') for f in failures)
+    wrong = len(failures) - (len(MUST_MATCH) - matched)
+    print(f"rewordings served: {matched} of {len(MUST_MATCH)}; "
+          f"near misses given a wrong answer: {wrong} of {len(MUST_NOT_MATCH)}")
+    for failure in failures:
+        print(failure)
+    return not failures
+
+
+def per_call(label, fn, items, number):
+    calls = iter(items * (number // len(items) + 1))
+    start = time.perf_counter()
+    for _ in range(number):
+        fn(next(calls))
+    print(f"{label:<44} {(time.perf_counter() - start) / number * 1e6:8.1f} µs")
+
+
+def timings(path):
+    rng = random.Random(5)
+    bodies = ("Mars", "Venus", "Jupiter", "Saturn", "the Moon", "Titan", "Europa", "Pluto", "Ceres", "Sirius")
+    topics = ("How far is {} from the Sun", "How big is {}", "What is the gravity on {}",
+              "How long is a day on {}", "What is {} made of", "Who discovered {}")
+    cache = AnswerCache(path)
+    questions = [f"{rng.choice(topics).format(rng.choice(bodies))} in year {i}?" for i in range(MAX_ENTRIES)]
+    for question in questions:
+        cache.put(question, answer_for(question))
+    per_call(f"get, exact ({MAX_ENTRIES} cached)", cache.get, questions, 5000)
+    per_call("get, similar", cache.get, [q.replace("How big is", "What is the size of") for q in questions], 5000)
+    per_call("get, miss", cache.get, [f"What is the albedo of {rng.choice(bodies)}?" for _ in range(100)], 5000)
+
+    # Hits only touch memory, so they shouldn't queue behind SQLite writes
+    stop = threading.Event()
+    def writer():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            cache.put(f"How bright is {rng.choice(bodies)} in year {i}?", "bright")
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        per_call("get, exact, while another thread puts", cache.get, questions[-1000:], 5000)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = check_matches(os.path.join(tmp, 'answers.db'))
+        timings(os.path.join(tmp, 'timing.db'))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
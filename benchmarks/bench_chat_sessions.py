@@ -0,0 +1,87 @@
+"""Benchmark: chat session history stays bounded in prompt size and memory
+
+Run from the repository root:
+
+    python benchmarks/bench_chat_sessions.py
+
+Checks that the history sent to Gemini stops growing however long a
+conversation runs, that memory stays flat as the number of users grows past
+max_sessions, and that a SQLite-backed store gives sessions back after a
+restart. Also times open() and add_turn() with and without SQLite.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_sessions import ChatSessions, format_history, estimate_tokens
+
+ANSWER = ("Jupiter has 95 known moons. The four largest, Io, Europa, Ganymede and Callisto, were "
+          "discovered by Galileo in 1610 and are visible in small telescopes. ") * 8
+
+
+def conversation(sessions, session_id, turns, rng):
+    for i in range(turns):
+        session_id, summary, history = sessions.open(session_id)
+        sessions.add_turn(session_id, f"What about moon number {i} of {rng.choice(['Jupiter', 'Saturn'])}?", ANSWER)
+    return session_id
+
+
+def prompt_growth():
+    sessions = ChatSessions()
+    rng = random.Random(1)
+    session_id, done, sizes = None, 0, []
+    for turns in (1, 5, 10, 50, 200):
+        session_id, done = conversation(sessions, session_id, turns - done, rng), turns
+        sizes.append(estimate_tokens(format_history(*sessions.open(session_id)[1:])))
+    print("history tokens after 1/5/10/50/200 turns:", sizes)
+    assert sizes[-1] <= sessions.token_budget + sessions.summary_token_budget + 100
+
+
+def memory(users, max_sessions=2000):
+    sessions = ChatSessions(max_sessions=max_sessions)
+    rng = random.Random(2)
+    tracemalloc.start()
+    for _ in range(users):
+        conversation(sessions, None, 4, rng)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{users:>6} users, max_sessions {max_sessions}: {current / 1e6:6.1f} MB held, "
+          f"{peak / 1e6:6.1f} MB peak, {sessions.report()['sessions']} sessions")
+    return current
+
+
+def per_call(label, fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    print(f"{label:<44} {(time.perf_counter() - start) / number * 1e6:8.1f} µs")
+
+
+def main():
+    prompt_growth()
+    held = [memory(users) for users in (2000, 8000, 20000)]
+    assert held[-1] < held[0] * 1.2, held
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'chat_sessions.db')
+        sessions = ChatSessions(path)
+        session_id = conversation(sessions, None, 12, random.Random(3))
+        before = sessions.open(session_id)
+        restarted = ChatSessions(path)
+        assert restarted.open(session_id) == before
+        print(f"restart: session restored from SQLite ({restarted.report()['restored']} restored)")
+
+        rng = random.Random(4)
+        for label, store in (("memory only", ChatSessions()), ("SQLite write-through", ChatSessions(path))):
+            ids = [conversation(store, None, 3, rng) for _ in range(200)]
+            per_call(f"open, {label}", lambda: store.open(rng.choice(ids)), 20000)
+            per_call(f"add_turn, {label}", lambda: store.add_turn(rng.choice(ids), "And its rings?", ANSWER), 2000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Accuracy check and benchmark for the local ephemeris behind /api/starmap/data
+
+Run from the repository root:
+
+    python benchmarks/bench_ephemeris.py
+
+Positions are first compared with the worked examples in Meeus,
+"Astronomical Algorithms" (2nd ed.), then timed for many observers in one
+vectorized call against one call per observer.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ephemeris
+
+# (label, computed value, reference value, tolerance); Meeus gives apparent
+# positions, which differ from these mean positions by nutation and aberration
+# (under 0.01 degrees)
+def reference_checks():
+    checks = []
+
+    # Example 47.a: the Moon on 1992 April 12, 0h TD
+    longitude, latitude, distance = ephemeris.moon_ecliptic(2448724.5)
+    checks += [("Moon longitude (deg)", longitude, 133.162655, 0.01),
+               ("Moon latitude (deg)", latitude, -3.229126, 0.01),
+               ("Moon distance (km)", distance, 368409.7, 50.0)]
+    ra, dec, _ = ephemeris.geocentric_equatorial('moon', 2448724.5)
+    checks += [("Moon right ascension (deg)", ra * 15, 134.688470, 0.02),
+               ("Moon declination (deg)", dec, 13.768368, 0.02)]
+
+    # Example 25.a: the Sun on 1992 October 13, 0h TD
+    ra, dec, distance = ephemeris.geocentric_equatorial('sun', 2448908.5)
+    checks += [("Sun right ascension (deg)", ra * 15, 198.38083, 0.01),
+               ("Sun declination (deg)", dec, -7.78507, 0.01),
+               ("Sun distance (au)", distance, 0.99766, 0.0001)]
+
+    # Example 33.a: Venus on 1992 December 20, 0h TD
+    ra, dec, distance = ephemeris.geocentric_equatorial('venus', 2448976.5)
+    checks += [("Venus right ascension (deg)", ra * 15, 316.17291, 0.02),
+               ("Venus declination (deg)", dec, -18.88801, 0.02),
+               ("Venus distance (au)", distance, 0.910947, 0.0005)]
+
+    # Example 12.a: mean sidereal time at Greenwich, 1987 April 10, 0h UT
+    checks.append(("GMST (hours)", ephemeris.sidereal_time(2446895.5) / 15, 13 + 10 / 60 + 46.3668 / 3600, 1e-5))
+
+    # Example 13.b: Venus seen from the US Naval Observatory, 1987 April 10, 19:21 UT
+    jd = ephemeris.julian_day(datetime(1987, 4, 10, 19, 21, tzinfo=timezone.utc))
+    alt, az = ephemeris.horizontal(23 + 9 / 60 + 16.641 / 3600, -(6 + 43 / 60 + 11.61 / 3600), jd,
+                                   38 + 55 / 60 + 17 / 3600, -(77 + 3 / 60 + 56 / 3600))
+    checks += [("Venus altitude at USNO (deg)", alt, 15.1249, 0.005),
+               # Meeus measures azimuth from the south
+               ("Venus azimuth at USNO (deg)", az, 68.0337 + 180, 0.005)]
+    return checks
+
+
+def check_accuracy():
+    failures = 0
+    for label, value, reference, tolerance in reference_checks():
+        error = abs(float(value) - reference)
+        ok = error <= tolerance
+        failures += not ok
+        print(f"{label:<32} {float(value):14.6f}  ref {reference:14.6f}  error {error:.6f}  {'ok' if ok else 'FAIL'}")
+    # Vectorized results must match scalar ones
+    jd = 2460000.5 + np.arange(5) * 0.37
+    batch = ephemeris.body_positions(jd[:, None], np.array([51.5, -33.9]), np.array([-0.1, 151.2]))
+    for i, t in enumerate(jd):
+        for j, (lat, lon) in enumerate(((51.5, -0.1), (-33.9, 151.2))):
+            single = ephemeris.body_positions(t, lat, lon)
+            for body in ephemeris.BODY_NAMES:
+                for key in ('ra', 'dec', 'alt', 'az'):
+                    assert abs(batch[body][key][i, j] - single[body][key]) < 1e-9, (body, key)
+    print("vectorized positions match scalar ones")
+    if failures:
+        sys.exit(f"{failures} reference checks failed")
+
+
+def bench(label, fn, number):
+    fn()
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    ms = (time.perf_counter() - start) / number * 1000
+    print(f"{label:<56} {ms:9.2f} ms")
+    return ms
+
+
+def main():
+    check_accuracy()
+    print()
+    rng = np.random.default_rng(7)
+    observers = 10000
+    lat = rng.uniform(-60, 70, observers)
+    lon = rng.uniform(-180, 180, observers)
+    jd = ephemeris.julian_day(datetime(2026, 10, 18, 21, 0, tzinfo=timezone.utc))
+
+    bench("one observer, all bodies (one /api/starmap/data call)",
+          lambda: ephemeris.positions_payload(datetime(2026, 10, 18, 21, 0, tzinfo=timezone.utc), 51.5, -0.1), 200)
+    loop = bench(f"{observers} observers, one call each",
+                 lambda: [ephemeris.body_positions(jd, la, lo) for la, lo in zip(lat, lon)], 1)
+    vector = bench(f"{observers} observers, one vectorized call",
+                   lambda: ephemeris.body_positions(jd, lat, lon), 20)
+    print(f"{'':<56} {loop / vector:9.0f}x")
+    hours = jd + np.arange(24)[:, None] / 24.0
+    bench("24 hourly times x 1000 observers, one vectorized call",
+          lambda: ephemeris.body_positions(hours, lat[:1000], lon[:1000]), 20)
+
+
+if __name__ == '__main__':
+    main()
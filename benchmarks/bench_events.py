@@ -0,0 +1,113 @@
+"""Benchmark: events API queries against 100k synthetic events
+
+Run from the repository root:
+
+    python benchmarks/bench_events.py [--events 100000]
+
+Builds a throwaway database shaped like astronomy.db, applies the startup
+migrations, then times the old full-table load against the paginated,
+filtered and featured queries the API now uses.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database
+from event_catalog import EVENTS_MIGRATIONS, featured_events, query_events
+
+EVENT_TYPES = ("Meteor Shower", "Eclipse", "Planetary Event", "Lunar Phase", "Comet",
+               "Auroral Display", "Conjunction", "ISS Pass", "Occultation", "Opposition")
+
+
+def build_database(path, count, seed=7):
+    db = Database(path)
+    rng = random.Random(seed)
+    first_day = date(2020, 1, 1)
+    rows = []
+    for event_id in range(1, count + 1):
+        event_type = rng.choice(EVENT_TYPES)
+        day = first_day + timedelta(days=rng.randrange(365 * 15))
+        rows.append((event_id, f"{event_type} #{event_id}", day.isoformat(), event_type,
+                     "Synthetic event for benchmarking. " * 4, f"https://example.org/{event_id}.jpg"))
+    with db.transaction() as conn:
+        conn.execute('''
+        CREATE TABLE events (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            date TEXT NOT NULL,
+            type TEXT NOT NULL,
+            description TEXT,
+            image TEXT
+        )
+        ''')
+        conn.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)', rows)
+    db.migrate(EVENTS_MIGRATIONS)
+    with db.connection() as conn:
+        conn.execute('ANALYZE')
+    return db
+
+
+def bench(label, fn, number):
+    fn()
+    start = time.perf_counter()
+    for _ in range(number):
+        result = fn()
+    ms = (time.perf_counter() - start) / number * 1000
+    rows = len(result[0] if isinstance(result, tuple) else result)
+    print(f"{label:<52} {ms:9.3f} ms  ({rows} rows)")
+    return result
+
+
+def query_plan(db, sql, params):
+    return '; '.join(row['detail'] for row in db.query('EXPLAIN QUERY PLAN ' + sql, params))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        db = build_database(os.path.join(tmp, 'events.db'), args.events)
+        print(f"built {args.events} events in {time.perf_counter() - start:.1f} s\n")
+
+        # What every /, /calendar and /api/events request used to do
+        bench("full load: SELECT * ORDER BY date", lambda: db.query('SELECT * FROM events ORDER BY date'), 5)
+        bench("featured: index() slicing a full load",
+              lambda: db.query('SELECT * FROM events ORDER BY date')[:3], 5)
+        bench("featured: next 3 upcoming", lambda: featured_events(db, '2027-06-01'), 2000)
+        first = bench("page 1 (limit 50)", lambda: query_events(db, limit=50), 2000)
+
+        # Walk to the middle of the table, then compare keyset paging with OFFSET
+        cursor = first[1]
+        for _ in range(args.events // 100 - 1):
+            cursor = query_events(db, limit=50, after=cursor)[1]
+        bench(f"page {args.events // 100} by cursor", lambda: query_events(db, limit=50, after=cursor), 2000)
+        offset = args.events // 2
+        bench(f"page {args.events // 100} by OFFSET {offset} (for comparison)",
+              lambda: db.query('SELECT * FROM events ORDER BY date, id LIMIT 50 OFFSET ?', (offset,)), 50)
+
+        bench("date range, one month", lambda: query_events(db, '2026-03-01', '2026-03-31', limit=500), 500)
+        bench("type filter", lambda: query_events(db, types=['Comet'], limit=50), 2000)
+        bench("type filter + date range",
+              lambda: query_events(db, '2026-01-01', '2026-12-31', ['Comet'], limit=50), 2000)
+        bench("two types + date range",
+              lambda: query_events(db, '2026-01-01', '2026-12-31', ['Comet', 'Eclipse'], limit=50), 500)
+
+        print()
+        print("plan, cursor page:  ", query_plan(
+            db, 'SELECT * FROM events WHERE (date, id) > (?, ?) ORDER BY date, id LIMIT 51', ('2027-01-01', 5)))
+        print("plan, type + range: ", query_plan(
+            db, 'SELECT * FROM events WHERE date >= ? AND date <= ? AND type IN (?) ORDER BY date, id LIMIT 51',
+            ('2026-01-01', '2026-12-31', 'Comet')))
+
+
+if __name__ == '__main__':
+    main()
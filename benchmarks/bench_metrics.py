@@ -0,0 +1,73 @@
+"""Benchmark: cost of the metrics hot paths and of rendering /metrics
+
+Run from the repository root:
+
+    python benchmarks/bench_metrics.py
+
+Times one histogram observation, one full request timer (in-flight gauge,
+route histogram and counter, unsampled and sampled for Server-Timing) and
+a render of a registry holding a realistic number of label sets.
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+
+
+def per_call(label, fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<48} {elapsed / repeat * 1e6:8.2f} µs")
+
+
+def request(sample_rate):
+    timer = metrics.RequestTimer(sample_rate)
+    metrics.observe_upstream('nasa', 0.12, '2xx')
+    metrics.observe_sqlite('astronomy', 'query', 0.0004)
+    timer.status = 200
+    timer.server_timing()
+    timer.finish('GET', '/api/nasa/apod')
+
+
+def contended(threads, repeat):
+    histogram = metrics.Histogram('bench_contended_seconds', 'contention check', ('route',))
+    def work():
+        for i in range(repeat):
+            histogram.observe(i * 1e-4, '/api/chat')
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    print(f"{f'histogram.observe, {threads} threads':<48} {elapsed / (threads * repeat) * 1e6:8.2f} µs")
+    assert sum(histogram._values[('/api/chat',)][0]) == threads * repeat
+
+
+def main():
+    histogram = metrics.Histogram('bench_seconds', 'bench', ('route',))
+    per_call("histogram.observe", lambda: histogram.observe(0.042, '/api/chat'), 200000)
+    per_call("request timer, not sampled", lambda: request(0.0), 50000)
+    per_call("request timer, sampled for Server-Timing", lambda: request(1.0), 50000)
+    contended(8, 20000)
+
+    # About what a busy process accumulates: 40 routes x 3 methods, 7 upstreams
+    for i in range(40):
+        for method in ('GET', 'POST', 'DELETE'):
+            metrics.HTTP_SECONDS.observe(0.01 * i, method, f'/api/route{i}')
+            metrics.HTTP_REQUESTS.inc(method, f'/api/route{i}', '200')
+    for upstream in ('nasa', 'pixabay', 'gemini', 'weather', 'astronomyapi', 'aztro', 'huggingface'):
+        metrics.observe_upstream(upstream, 0.2, '2xx')
+    body = metrics.registry.render()
+    per_call(f"registry.render ({body.count(chr(10))} lines)", metrics.registry.render, 200)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark: indexed star-field queries vs. converting every star
+
+Run from the repository root:
+
+    python benchmarks/bench_star_catalog.py [path/to/bright_stars.npy] [--builtin]
+
+Without a catalog file a synthetic one the size of the Yale Bright Star
+Catalogue (9110 stars, magnitudes distributed like it) is used, or with
+--builtin the bright stars built into star_catalog.py. A catalog file is
+memory-mapped as the app loads it. Indexed results are checked against a
+brute-force pass over all stars first.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ephemeris
+import star_catalog
+
+
+def synthetic_catalog(count=9110, seed=7):
+    rng = np.random.default_rng(seed)
+    stars = np.zeros(count, dtype=star_catalog.STAR_DTYPE)
+    stars['hr'] = np.arange(1, count + 1)
+    stars['ra'] = rng.uniform(0, 360, count)
+    stars['dec'] = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    # Star counts grow about 3x per magnitude up to the catalog limit
+    stars['mag'] = 6.5 - rng.exponential(1 / math.log(3), count)
+    stars['bv'] = rng.uniform(-0.3, 2.0, count)
+    return stars
+
+
+def brute_force(catalog, jd, lat, lon, mag_limit, center_alt=90.0, center_az=0.0, fov=None):
+    vec = ephemeris.precess_from_j2000(catalog.vectors.T, jd)
+    ra = np.degrees(np.arctan2(vec[1], vec[0])) % 360.0
+    dec = np.degrees(np.arcsin(np.clip(vec[2], -1, 1)))
+    alt, az = ephemeris.horizontal(ra / 15.0, dec, jd, lat, lon)
+    keep = (alt >= 0) & (catalog.stars['mag'] <= mag_limit)
+    if fov is not None:
+        a, z = np.radians(alt), np.radians(az)
+        ca, cz = math.radians(center_alt), math.radians(center_az)
+        cos_sep = np.sin(a) * math.sin(ca) + np.cos(a) * math.cos(ca) * np.cos(z - cz)
+        keep &= cos_sep >= math.cos(math.radians(fov / 2))
+    return np.sort(alt[keep])
+
+
+def check(catalog, jd):
+    rng = np.random.default_rng(11)
+    for _ in range(200):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        options = {'mag_limit': rng.uniform(-1, 7)}
+        if rng.random() < 0.5:
+            options.update(center_alt=rng.uniform(0, 90), center_az=rng.uniform(0, 360), fov=rng.uniform(5, 120))
+        indexed = np.sort(catalog.visible(jd, lat, lon, **options)['alt'])
+        expected = brute_force(catalog, jd, lat, lon, **options)
+        # Stars right on a cap edge may fall either way by rounding
+        assert abs(len(indexed) - len(expected)) <= 1, (lat, lon, options, len(indexed), len(expected))
+    print("indexed queries match brute force on 200 random observers and fields")
+
+
+def bench(label, fn, number):
+    fn()
+    start = time.perf_counter()
+    for _ in range(number):
+        result = fn()
+    ms = (time.perf_counter() - start) / number * 1000
+    print(f"{label:<52} {ms:8.3f} ms  {len(result['alt']):5d} stars")
+    return ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed star-field queries")
+    parser.add_argument('catalog', nargs='?', help="catalog file written by star_catalog.py (default: synthetic)")
+    parser.add_argument('--builtin', action='store_true', help="use the built-in bright stars")
+    args = parser.parse_args()
+    if args.catalog:
+        stars = np.load(args.catalog, mmap_mode='r')
+    elif args.builtin:
+        stars = star_catalog.builtin_catalog()
+    else:
+        stars = synthetic_catalog()
+    start = time.perf_counter()
+    catalog = star_catalog.StarCatalog(stars)
+    in_place = isinstance(catalog.stars, np.memmap)
+    print(f"indexed {len(catalog)} stars in {(time.perf_counter() - start) * 1000:.1f} ms"
+          + (" (memory-mapped in place)" if in_place else ""))
+    jd = ephemeris.julian_day(datetime(2026, 10, 18, 21, 0, tzinfo=timezone.utc))
+    check(catalog, jd)
+    print()
+
+    lat, lon = 51.5, -0.1
+    for mag in (6.5, 4.5, 3.0):
+        full = bench(f"brute force: all stars, mag <= {mag}",
+                     lambda: {'alt': brute_force(catalog, jd, lat, lon, mag)}, 200)
+        indexed = bench(f"indexed: above horizon, mag <= {mag}",
+                        lambda: catalog.visible(jd, lat, lon, mag_limit=mag), 200)
+        print(f"{'':<52} {full / indexed:8.1f}x")
+    for fov in (60, 20):
+        full = bench(f"brute force: {fov} deg field of view, mag <= 6.5",
+                     lambda: {'alt': brute_force(catalog, jd, lat, lon, 6.5, 40, 180, fov)}, 200)
+        indexed = bench(f"indexed: {fov} deg field of view, mag <= 6.5",
+                        lambda: catalog.visible(jd, lat, lon, 6.5, 40, 180, fov), 200)
+        print(f"{'':<52} {full / indexed:8.1f}x")
+    bench("payload columns: above horizon, mag <= 4.5",
+          lambda: star_catalog.star_columns(catalog.visible(jd, lat, lon)), 100)
+
+
+if __name__ == '__main__':
+    main()
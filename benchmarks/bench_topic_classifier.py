@@ -0,0 +1,277 @@
+"""Benchmark: accuracy and cost of the chat pre-filter stages
+
+Run from the repository root:
+
+    python benchmarks/bench_topic_classifier.py
+
+Scores the keyword check alone (the old pre-filter) and the staged
+screen_query (keywords, then the Naive Bayes classifier for undecided
+queries) on a labelled set that shares no query with the classifier's
+training examples. It reports precision and recall of rejecting off-topic
+queries, accuracy, the share of on-topic queries wrongly rejected, and the
+time per query of each stage. The run fails if screen_query rejects more
+on-topic queries than MAX_FALSE_REJECT_RATE allows, or accepts more
+off-topic ones than MAX_FALSE_ACCEPT_RATE: turning away a real astronomy
+question is the worse mistake, so its limit is the tighter one. It also
+checks that the incremental StreamingRelevanceCheck agrees with rescanning
+the whole reply on every chunk, and times both.
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import topic_classifier
+import topic_filter
+from bench_topic_filter import legacy_is_astronomy_related_query
+
+# (query, is astronomy); many match both keyword lists or neither on purpose
+LABELLED_QUERIES = (
+    ("How far is Neptune from the Sun?", True),
+    ("What is a light-second?", True),
+    ("How many light-years across is the Milky Way?", True),
+    ("What's the weather like on Venus?", True),
+    ("Do astronauts get sick in space?", True),
+    ("What medical problems do astronauts have after long missions?", True),
+    ("What music do astronauts listen to on the space station?", True),
+    ("How much money does NASA get each year?", True),
+    ("Which film shows a realistic black hole?", True),
+    ("What do astronauts eat for breakfast in orbit?", True),
+    ("What is the largest volcano in the solar system?", True),
+    ("Why do stars twinkle?", True),
+    ("What is the brightest object in the night sky after the Moon?", True),
+    ("Is Sirius a binary?", True),
+    ("What are the Magellanic Clouds?", True),
+    ("What is a globular cluster?", True),
+    ("How do black holes grow?", True),
+    ("Can anything escape a black hole?", True),
+    ("What is the Roche limit?", True),
+    ("Why is Io volcanic?", True),
+    ("What does Ganymede look like?", True),
+    ("Is Titan bigger than Mercury?", True),
+    ("What is Betelgeuse's diameter?", True),
+    ("When is the Geminid shower at its peak?", True),
+    ("What's the best time to see the Orionids?", True),
+    ("Where should I point my binoculars to see Andromeda?", True),
+    ("What is a dobsonian?", True),
+    ("What eyepiece should I use for Jupiter?", True),
+    ("What is seeing in observing conditions?", True),
+    ("How do I polar align an equatorial mount?", True),
+    ("What is astrophotography stacking?", True),
+    ("What is a lunar month?", True),
+    ("Why is the Moon drifting away from us?", True),
+    ("How long is a year on Neptune?", True),
+    ("What is the hottest known exoplanet?", True),
+    ("What did the Cassini probe find at Saturn?", True),
+    ("What is the Juno spacecraft studying?", True),
+    ("What happened to the Hubble mirror?", True),
+    ("How big is a neutron star?", True),
+    ("What is a kilonova?", True),
+    ("What is a protoplanetary disk?", True),
+    ("How are solar systems formed?", True),
+    ("What is the Chandrasekhar limit?", True),
+    ("What makes a star explode as a supernova?", True),
+    ("Is the universe infinite?", True),
+    ("What is the observable universe?", True),
+    ("What existed before the Big Bang?", True),
+    ("How do we know dark matter exists?", True),
+    ("What is a wormhole?", True),
+    ("Can we travel faster than light?", True),
+    ("What is the Starlink constellation doing to astronomy?", True),
+    ("How does a space telescope stay cold?", True),
+    ("How do ion thrusters work?", True),
+    ("What time does the Moon rise tomorrow?", True),
+    ("Which stars make up the Big Dipper?", True),
+    ("What is the Summer Triangle?", True),
+    ("How do I spot Mercury at dusk?", True),
+    ("Why is Venus so bright?", True),
+    ("What is the food situation for a crew going to Mars?", True),
+    ("Could humans survive the radiation on Europa?", True),
+    ("What's the weather forecast for tomorrow afternoon?", False),
+    ("Is it sunny in Madrid?", False),
+    ("Will there be a thunderstorm tonight?", False),
+    ("Who won the Champions League?", False),
+    ("Who is the star striker at Arsenal?", False),
+    ("Best movies of all time?", False),
+    ("What is the new Star Wars movie about?", False),
+    ("Who sings Walking on the Moon?", False),
+    ("Who voiced the robot in the film WALL-E?", False),
+    ("Is the Galaxy Tab worth buying?", False),
+    ("How do I take screenshots on a Samsung Galaxy?", False),
+    ("Give me a quick pasta recipe", False),
+    ("How long do I boil an egg?", False),
+    ("Are Mars bars vegan?", False),
+    ("What is the best index fund?", False),
+    ("How do I budget my monthly income?", False),
+    ("Is gold a good investment?", False),
+    ("How do I deal with stress at work?", False),
+    ("What are the signs of a heart attack?", False),
+    ("How do I treat a sprained ankle?", False),
+    ("Which vitamins should I take?", False),
+    ("What should I get my brother for his birthday?", False),
+    ("Where can I buy cheap shoes?", False),
+    ("What does Gemini mean as a star sign?", False),
+    ("What is my zodiac sign if I was born in March?", False),
+    ("Will Venus retrograde affect my love life?", False),
+    ("Are Virgos and Capricorns compatible?", False),
+    ("How do I become a lawyer?", False),
+    ("Can my employer fire me without notice?", False),
+    ("Who is the president of France?", False),
+    ("When was the Roman Empire founded?", False),
+    ("Who painted the Mona Lisa?", False),
+    ("Write a short story about a dragon", False),
+    ("Tell me something funny", False),
+    ("How do I center a div in CSS?", False),
+    ("What is a Python decorator?", False),
+    ("Which phone has the best battery?", False),
+    ("How do I speed up my computer?", False),
+    ("What is the best way to learn guitar?", False),
+    ("How do I get my toddler to sleep?", False),
+    ("How do I groom a poodle?", False),
+    ("When should I prune roses?", False),
+    ("How do volcanoes erupt on Earth?", False),
+    ("Why is the grass green?", False),
+    ("What causes hiccups?", False),
+    ("Where do penguins live?", False),
+    ("How tall is the Eiffel Tower?", False),
+    ("What's the best beach in Thailand?", False),
+    ("How do I book a train ticket to Edinburgh?", False),
+    ("What time does the station open?", False),
+    ("Recommend a space heater for my office", False),
+    ("How do I clear space on my iPhone?", False),
+    ("Is Rocket Mortgage a good lender?", False),
+    ("Where is Galaxy's Edge at Disneyland?", False),
+    ("What sunglasses block the most sun?", False),
+    ("Who played Neil Armstrong in First Man and what else have they acted in?", False),
+    ("What is the plot of the movie Moonlight?", False),
+    ("How do I get more followers on Instagram?", False),
+)
+
+CLASSIFIER_QUERIES = [topic_filter.tokenize(query) for query, _ in LABELLED_QUERIES]
+
+# Off-topic queries naming a body in another sense, which screen_query must
+# reject however little the named body lowers its threshold
+OTHER_SENSES = (
+    "Is the earth flat?",
+    "What is a Mars bar made of?",
+    "What is my moon sign personality?",
+    "Who is Bruno Mars?",
+    "What on earth is a mortgage?",
+    "Is Titan a good brand of watch?",
+)
+
+# Shares of the on-topic queries above that screen_query may reject (3 of 60
+# today) and of the off-topic ones it may accept (9 of 58); lower them as
+# that improves
+MAX_FALSE_REJECT_RATE = 0.07
+MAX_FALSE_ACCEPT_RATE = 0.16
+
+
+def report(label, predictions):
+    """Precision and recall of rejecting off-topic queries (the positive class here)
+
+    Returns the false-reject and false-accept rates.
+    """
+    rejected = [(not on_topic, not astronomy) for (_, astronomy), on_topic in zip(LABELLED_QUERIES, predictions)]
+    true_positives = sum(1 for reject, off in rejected if reject and off)
+    predicted = sum(1 for reject, _ in rejected if reject)
+    actual = sum(1 for _, off in rejected if off)
+    accuracy = sum(1 for reject, off in rejected if reject == off) / len(rejected)
+    false_reject = sum(1 for reject, off in rejected if reject and not off) / (len(rejected) - actual)
+    false_accept = 1 - true_positives / actual
+    print(f"{label:<36} precision {true_positives / max(predicted, 1):6.1%}  recall {true_positives / actual:6.1%}"
+          f"  accuracy {accuracy:6.1%}  on-topic rejected {false_reject:6.1%}")
+    return false_reject, false_accept
+
+
+def per_call(label, fn, items, number):
+    calls = iter(items * (number // len(items) + 1))
+    elapsed = timeit.timeit(lambda: fn(next(calls)), number=number)
+    print(f"{label:<44} {elapsed / number * 1e6:8.2f} µs")
+
+
+def rescanning_check(chunks):
+    """The previous StreamingRelevanceCheck: rescan all held text on every chunk"""
+    held = []
+    for i, chunk in enumerate(chunks):
+        held.append(chunk)
+        if topic_filter.is_astronomy_related_response(''.join(held)):
+            return i
+    return None
+
+
+def incremental_check(chunks):
+    check = topic_filter.StreamingRelevanceCheck()
+    for i, chunk in enumerate(chunks):
+        if check.feed(chunk):
+            return i
+    return None
+
+
+def split(rng, text):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(1, 40))))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+def check_streaming(samples=3000):
+    rng = random.Random(11)
+    words = ("the of and a light distance faint about years earth orbits planet star gravity Mars "
+             "jupiter solar system black hole " + topic_filter.ASTRONOMY_REDIRECT_MARKER).split(' ')
+    for _ in range(samples):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(2, 200)))
+        chunks = split(rng, text)
+        assert incremental_check(chunks) == rescanning_check(chunks), chunks
+    print(f"streaming: {samples} randomly chunked replies pass at the same chunk either way")
+
+
+def main():
+    report("keywords only (previous pre-filter)",
+           [legacy_is_astronomy_related_query(query) for query, _ in LABELLED_QUERIES])
+    false_reject, false_accept = report("keywords, then classifier",
+                          [topic_filter.screen_query(query)[0] for query, _ in LABELLED_QUERIES])
+    report("classifier alone", [topic_classifier.is_astronomy(query) for query in CLASSIFIER_QUERIES])
+    stages = [topic_filter.screen_query(query)[1] for query, _ in LABELLED_QUERIES]
+    print(f"decided by the classifier: {stages.count('classifier')} of {len(stages)}")
+    misses = [query for query, astronomy in LABELLED_QUERIES if topic_filter.screen_query(query)[0] != astronomy]
+    for query in misses:
+        print(f"  misclassified: {query}")
+    other_senses = [query for query in OTHER_SENSES if topic_filter.screen_query(query)[0]]
+    for query in other_senses:
+        print(f"  accepted despite naming a body in another sense: {query}")
+
+    queries = [f"{query} #{i}" for i in range(200) for query, _ in LABELLED_QUERIES]
+    per_call("screen_query", topic_filter.screen_query, queries, 20000)
+    per_call("classifier stage alone", topic_classifier.is_astronomy, CLASSIFIER_QUERIES, 20000)
+    per_call("training the classifier", lambda _: topic_classifier.NaiveBayes(
+        topic_classifier.ASTRONOMY_EXAMPLES, topic_classifier.OFF_TOPIC_EXAMPLES), [None], 20)
+
+    check_streaming()
+    rng = random.Random(3)
+    # A reply whose astronomy terms only come late: the worst case for rescanning
+    reply = ' '.join(rng.choice(("the", "of", "and", "about", "years", "distance")) for _ in range(600))
+    reply += " planet orbit"
+    chunks = [reply[i:i + 40] for i in range(0, len(reply), 40)]
+    per_call(f"stream check, rescanning ({len(chunks)} chunks)", rescanning_check, [chunks], 200)
+    per_call(f"stream check, incremental ({len(chunks)} chunks)", incremental_check, [chunks], 200)
+
+    failed = False
+    if false_reject > MAX_FALSE_REJECT_RATE:
+        print(f"FAIL: screen_query rejected {false_reject:.1%} of on-topic queries "
+              f"(at most {MAX_FALSE_REJECT_RATE:.0%} allowed)")
+        failed = True
+    if false_accept > MAX_FALSE_ACCEPT_RATE:
+        print(f"FAIL: screen_query accepted {false_accept:.1%} of off-topic queries "
+              f"(at most {MAX_FALSE_ACCEPT_RATE:.0%} allowed)")
+        failed = True
+    if other_senses:
+        print(f"FAIL: screen_query accepted {len(other_senses)} of {len(OTHER_SENSES)} queries "
+              f"naming a body in another sense")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
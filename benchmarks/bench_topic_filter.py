@@ -0,0 +1,163 @@
+"""Micro-benchmark: compiled topic matcher vs. the original per-keyword scans
+
+Run from the repository root:
+
+    python benchmarks/bench_topic_filter.py
+
+The original implementations are kept below verbatim so results can be
+checked for equivalence before they are timed. The query check is rebuilt
+from the keyword stage of topic_filter.screen_query; its time includes
+splitting the query into words, which screen_query shares with the
+classifier (see bench_topic_classifier.py for the whole screen).
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import topic_filter
+
+
+# --- Original implementations (pre-matcher app.py) ---
+
+def legacy_is_astronomy_related_query(message):
+    """Check if a query is related to astronomy"""
+    astronomy_keywords = [
+        'planet', 'moon', 'star', 'sun', 'galaxy', 'asteroid', 'comet', 'meteor', 
+        'constellation', 'nebula', 'black hole', 'supernova', 'pulsar', 'quasar',
+        'solar system', 'exoplanet', 'satellite', 'orbit', 'celestial', 
+        'nasa', 'esa', 'spacex', 'space mission', 'astronaut', 'spacecraft', 'telescope',
+        'hubble', 'james webb', 'voyager', 'rover', 'rocket', 'launch', 'station',
+        'space', 'astronomy', 'universe', 'cosmos', 'cosmic', 'astronomical',
+        'light year', 'parsec', 'gravity', 'big bang', 'eclipse', 'orbit',
+        'mercury', 'venus', 'earth', 'mars', 'jupiter', 'saturn', 'uranus', 
+        'neptune', 'pluto', 'eclipse', 'meteor shower', 'northern lights', 'aurora', 'gravity',
+        'solstice', 'equinox', 'transit', 'conjunction', 'redshift'
+    ]
+    
+    message_lower = message.lower()
+    
+    # First check for explicit non-astronomy terms
+    non_astronomy_topics = [
+        'weather', 'sports', 'politics', 'music', 'movie', 'film', 
+        'celebrity', 'actor', 'actress', 'singer', 'artist',
+        'recipe', 'food', 'cook', 'restaurant', 'diet',
+        'stock', 'market', 'finance', 'money', 'investment',
+        'dating', 'relationship', 'breakup', 'marriage',
+        'medical', 'disease', 'symptom', 'health', 'doctor',
+        'attorney', 'lawyer', 'legal', 'lawsuit',
+        'birthday', 'gift', 'present', 'shopping'
+    ]
+    
+    for topic in non_astronomy_topics:
+        if topic in message_lower:
+            return False
+    
+    # Then check for astronomy terms
+    for keyword in astronomy_keywords:
+        if keyword in message_lower:
+            return True
+            
+    # Additional space-related patterns
+    space_patterns = [
+        'why is the sky', 'what is in space', 'how far', 'light from', 
+        'how old is the', 'what causes', 'why do stars', 'when can i see', 
+        'how to observe', 'stargazing', 'night sky'
+    ]
+    
+    for pattern in space_patterns:
+        if pattern in message_lower:
+            return True
+    
+    # If no astronomy terms found, assume it's not astronomy-related
+    return False
+
+def legacy_is_astronomy_related_response(response):
+    """Check if AI response is astronomy-related"""
+    # If it's the standard redirect, it's valid
+    if "I can only answer questions about astronomy and space topics" in response:
+        return True
+    
+    # Count astronomy terms in the response
+    astronomy_keywords = [
+        'planet', 'moon', 'star', 'sun', 'galaxy', 'asteroid', 'comet', 
+        'constellation', 'nebula', 'black hole', 'supernova', 
+        'solar system', 'exoplanet', 'orbit', 'celestial', 
+        'nasa', 'telescope', 'space', 'astronomy', 'universe', 'cosmos', 
+        'astronomical', 'light year', 'gravity', 'earth', 'mars', 'jupiter'
+    ]
+    
+    response_lower = response.lower()
+    
+    astronomy_term_count = sum(1 for keyword in astronomy_keywords if keyword in response_lower)
+    
+    # If the response contains at least 2 astronomy terms, consider it valid
+    return astronomy_term_count >= 2
+
+
+def is_astronomy_related_query(message):
+    """The original query check, from the keyword stage of screen_query"""
+    categories = topic_filter.query_categories(topic_filter.tokenize(message))
+    if 'off_topic' in categories:
+        return False
+    return 'astronomy' in categories or 'space_pattern' in categories
+
+
+# --- Workload ---
+
+FILLER = ("the of and a to in is that it for on with as by this from which are be an "
+          "at or was were light distance observed bright faint about years during").split()
+VOCABULARY = FILLER * 4 + list(topic_filter.ASTRONOMY_KEYWORDS) + list(topic_filter.NON_ASTRONOMY_TOPICS) + [
+    'stargazing', 'Sunday', 'desatellite', 'Exoplanets', 'how far', 'night sky', 'I can only answer']
+
+
+def make_text(rng, words):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def check_equivalence(samples=5000):
+    rng = random.Random(42)
+    for _ in range(samples):
+        text = make_text(rng, rng.randint(1, 60))
+        assert is_astronomy_related_query(text) == legacy_is_astronomy_related_query(text), text
+        assert topic_filter.is_astronomy_related_response(text) == legacy_is_astronomy_related_response(text), text
+    print(f"equivalence: {samples} random texts agree on both checks")
+
+
+def bench(label, new, old, texts, number):
+    """Mean time per call"""
+    new_calls = iter(texts * (number // len(texts) + 1))
+    old_calls = iter(texts * (number // len(texts) + 1))
+    new_us = timeit.timeit(lambda: new(next(new_calls)), number=number) / number * 1e6
+    old_us = timeit.timeit(lambda: old(next(old_calls)), number=number) / number * 1e6
+    print(f"{label:<44} {old_us:9.1f} us -> {new_us:9.1f} us  ({old_us / new_us:5.1f}x)")
+
+
+def main():
+    check_equivalence()
+    rng = random.Random(7)
+    queries = [f"How far away is Mars from Earth and when can I see it tonight? #{i}" for i in range(20000)]
+    # ~1024 Gemini tokens is roughly 4 KB of English text
+    long_response = make_text(rng, 700)
+    off_topic_response = ' '.join(rng.choice(FILLER) for _ in range(700))
+    typical_answer = ("Mars is the fourth planet from the Sun, orbiting at an average distance of about "
+                      "228 million kilometres. Its distance from Earth varies between roughly 55 and 400 "
+                      "million kilometres as both worlds move along their orbits. ") * 20
+
+    bench("query: is_astronomy_related_query", is_astronomy_related_query,
+          legacy_is_astronomy_related_query, queries, 20000)
+    bench(f"response ({len(typical_answer)} chars, typical answer)", topic_filter.is_astronomy_related_response,
+          legacy_is_astronomy_related_response, [typical_answer], 2000)
+    bench(f"response ({len(long_response)} chars, on topic)", topic_filter.is_astronomy_related_response,
+          legacy_is_astronomy_related_response, [long_response], 2000)
+    # Worst case for the matcher: no early exit, and CPython's substring search
+    # beats a regex pass per character. Gemini answers off-topic questions with
+    # the short redirect, which is caught before any scan, so this is rare.
+    bench(f"response ({len(off_topic_response)} chars, off topic)", topic_filter.is_astronomy_related_response,
+          legacy_is_astronomy_related_response, [off_topic_response], 2000)
+
+
+if __name__ == '__main__':
+    main()
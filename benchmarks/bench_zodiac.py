@@ -0,0 +1,104 @@
+"""Benchmark: zodiac day-of-year table and batch path vs. the original per-request lookup
+
+Run from the repository root:
+
+    python benchmarks/bench_zodiac.py
+
+The original lookup is kept below (minus the Flask response) so every
+calendar date can be checked for equivalence before anything is timed.
+"""
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zodiac
+
+
+# --- Original implementation (pre-table calculate_zodiac) ---
+
+def legacy_zodiac(birth_date):
+    month, day = int(birth_date.split('-')[1]), int(birth_date.split('-')[2])
+    zodiac_signs = {
+        sign: {"start": start, "end": end, "element": element, "traits": traits,
+               "description": description, "emoji": emoji}
+        for sign, start, end, element, traits, description, emoji in zodiac.ZODIAC_SIGNS
+    }
+    for sign, info in zodiac_signs.items():
+        start_month, start_day = info["start"]
+        end_month, end_day = info["end"]
+        if start_month > end_month:
+            if (month == start_month and day >= start_day) or (month == end_month and day <= end_day) or (month > start_month) or (month < end_month):
+                result = {"sign": sign, "element": info["element"], "traits": info["traits"],
+                          "description": info["description"], "emoji": info["emoji"]}
+                break
+        else:
+            if (month == start_month and day >= start_day) or (month == end_month and day <= end_day) or (start_month < month < end_month):
+                result = {"sign": sign, "element": info["element"], "traits": info["traits"],
+                          "description": info["description"], "emoji": info["emoji"]}
+                break
+    else:
+        return None
+    # jsonify's encoding, so bodies compare equal
+    return json.dumps(result, sort_keys=True).encode('utf-8')
+
+
+def new_zodiac(birth_date):
+    index = zodiac.sign_index(*zodiac.parse_month_day(birth_date))
+    return zodiac.SIGN_PAYLOADS[index] if index is not None else None
+
+
+def check_equivalence():
+    day = date(2000, 1, 1)
+    dates = []
+    while day.year == 2000:
+        dates.append(day.isoformat())
+        day += timedelta(days=1)
+    for value in dates:
+        assert new_zodiac(value) == legacy_zodiac(value), value
+    batch = zodiac.batch_sign_indexes(dates + ['2001-02-29', '2000-13-01', 'bad', '2000-3-5', '1999-12-31x'])
+    python_batch = [zodiac._sign_index_or_invalid(value) for value in dates]
+    assert batch[:len(dates)] == python_batch
+    assert [json.loads(zodiac.SIGN_PAYLOADS[i])['sign'] for i in batch[:len(dates)]] == \
+        [json.loads(legacy_zodiac(value))['sign'] for value in dates]
+    # Feb 29 is valid in the table whatever the year; out-of-range and malformed dates are not
+    assert batch[len(dates):] == [zodiac.sign_index(2, 29), zodiac.INVALID, zodiac.INVALID,
+                                  zodiac.sign_index(3, 5), zodiac.INVALID]
+    print(f"equivalence: all {len(dates)} calendar days agree with the original lookup")
+
+
+def throughput(label, fn, items, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(items)
+    elapsed = time.perf_counter() - start
+    rate = len(items) * repeat / elapsed
+    print(f"{label:<44} {rate / 1e6:8.2f} M dates/s")
+    return rate
+
+
+def main():
+    check_equivalence()
+    rng = random.Random(7)
+    start = date(1940, 1, 1)
+    birthdays = [(start + timedelta(days=rng.randrange(365 * 80))).isoformat() for _ in range(10000)]
+
+    old = throughput("single: original dict + range loop", lambda items: [legacy_zodiac(d) for d in items],
+                     birthdays, 5)
+    new = throughput("single: day-of-year table", lambda items: [new_zodiac(d) for d in items], birthdays, 20)
+    print(f"{'':<44} {new / old:8.1f}x")
+    python_batch = throughput("batch of 10000: pure Python",
+                              lambda items: b'[' + b','.join(zodiac._SIGN_NAMES_JSON[zodiac._sign_index_or_invalid(d)]
+                                                             for d in items) + b']',
+                              birthdays, 20)
+    if zodiac.np is not None:
+        numpy_batch = throughput("batch of 10000: NumPy (batch_signs_json)", zodiac.batch_signs_json, birthdays, 50)
+        print(f"{'':<44} {numpy_batch / python_batch:8.1f}x over pure Python, {numpy_batch / old:.0f}x over original")
+
+
+if __name__ == '__main__':
+    main()
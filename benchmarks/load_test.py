@@ -0,0 +1,425 @@
+"""Offline load test: every route of app.py against local fake upstreams
+
+Run from the repository root:
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --scenarios zodiac,events,chat_filter --concurrency 1,50,200 --duration 10
+    python benchmarks/load_test.py --latency 0.1 --upstream-latency gemini=1.5 --upstream-error-rate aztro=0.2
+    python benchmarks/load_test.py --server uvicorn
+    python benchmarks/load_test.py --compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+
+fake_upstreams.py and the app each run in a child process. The app gets a
+generated config.py that points every upstream at the fakes and keeps its
+databases and caches in a scratch directory, so every run starts from the
+same state. Requests come from seeded generators, so they are the same
+across runs too.
+
+Each scenario is warmed up and then driven for --duration seconds at each
+--concurrency by closed-loop clients. The report gives p50/p95/p99 latency,
+throughput, status codes and the app's resident memory. Results are saved
+to benchmarks/results/<commit>.json. --compare prints two result files side
+by side and exits with status 1 if a scenario got slower than --threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+try:
+    import httpx
+except ImportError:  # required for the load generator; asgi.py already depends on it
+    httpx = None
+
+DEFAULT_CONCURRENCY = (1, 10, 50)
+DEFAULT_DURATION = 5.0
+WARMUP_REQUESTS = 20
+# A p95 this much higher, or a throughput this much lower, is reported as a regression
+DEFAULT_THRESHOLD = 0.15
+STARTUP_TIMEOUT = 60
+REQUEST_TIMEOUT = 60
+# Werkzeug listens with a backlog of 128, too short for the higher concurrency levels
+LISTEN_BACKLOG = 2048
+
+CONFIG_TEMPLATE = '''\
+# Generated by benchmarks/load_test.py
+class Config:
+    NASA_API_KEY = 'bench'
+    PIXABAY_API_KEY = 'bench'
+    GEMINI_API_KEY = 'bench'
+    WEATHER_API_KEY = 'bench'
+    ASTRONOMY_API_KEY = 'bench'
+    HUGGINGFACE_API_KEY = 'bench'
+    NASA_APOD_URL = '{base}/planetary/apod'
+    NASA_IMAGE_SEARCH_URL = '{base}/search'
+    PIXABAY_API_URL = '{base}/api/'
+    AZTRO_URL = '{base}/'
+    GEMINI_MODEL_URL = '{base}/v1beta/models/gemini-2.0-flash'
+    WEATHER_API_URL = '{base}/data/2.5/weather'
+    WEATHER_FORECAST_URL = '{base}/data/2.5/forecast'
+    ASTRONOMY_API_URL = '{base}/api/v2/bodies/positions'
+    HUGGINGFACE_MODEL_URL = '{base}/models/stabilityai/stable-diffusion-xl-base-1.0'
+    HUGGINGFACE_WHOAMI_URL = '{base}/api/whoami-v2'
+    INSTANCE_PATH = {instance!r}
+    DATABASE_PATH = {database!r}
+'''
+
+# --- Request generators: each takes a seeded random.Random and returns (method, path, JSON body) ---
+
+_points = random.Random(1)
+POINTS = [(round(_points.uniform(-60, 65), 3), round(_points.uniform(-180, 180), 3)) for _ in range(50)]
+QUESTIONS = [
+    "What is a black hole?", "How far is Mars from Earth?", "Why does Saturn have rings?",
+    "What is a neutron star?", "How old is the universe?", "What causes a solar eclipse?",
+    "How hot is the surface of the Sun?", "What is dark matter?", "How many moons does Jupiter have?",
+    "What is a light year?", "Why is Venus so hot?", "What is the Andromeda galaxy?",
+]
+OFF_TOPIC = ["What is a good recipe for lasagna?", "How do I fix my car brakes?",
+             "Which football team won the league?", "How do I learn to knit?"]
+SEARCH_TERMS = ['nebula', 'galaxy', 'saturn', 'aurora', 'comet', 'moon', 'eclipse', 'jupiter']
+PROMPTS = ["a spiral galaxy over a mountain lake", "the rings of saturn at sunset",
+           "an astronaut on the moon", "a comet above a desert"]
+SIGNS = ['aries', 'taurus', 'gemini', 'cancer', 'leo', 'virgo', 'libra', 'scorpio',
+         'sagittarius', 'capricorn', 'aquarius', 'pisces']
+PAGES = ['/', '/calendar', '/astrology', '/chat', '/explore', '/starmap']
+
+
+def _birth_date(rng):
+    return (date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 80))).isoformat()
+
+
+def _point(rng):
+    return rng.choice(POINTS)
+
+
+def _starmap(rng, extra=''):
+    lat, lon = _point(rng)
+    day = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+    return 'GET', f'/api/starmap/data?lat={lat}&lon={lon}&date={day}&time={rng.randrange(24):02d}:00{extra}', None
+
+
+SCENARIOS = {
+    'zodiac': lambda rng: ('POST', '/api/zodiac', {"birth_date": _birth_date(rng)}),
+    'zodiac_batch': lambda rng: ('POST', '/api/zodiac/batch', {"birth_dates": [_birth_date(rng) for _ in range(100)]}),
+    'chat_filter': lambda rng: ('POST', '/api/chat', {"query": rng.choice(OFF_TOPIC)}),
+    'chat': lambda rng: ('POST', '/api/chat', {"query": rng.choice(QUESTIONS)}),
+    'chat_stream': lambda rng: ('POST', '/api/chat', {"query": rng.choice(QUESTIONS), "stream": True}),
+    'events': lambda rng: ('GET', '/api/events', None),
+    'events_page': lambda rng: ('GET', f'/api/events?from=2025-0{rng.randrange(1, 10)}-01&limit=5', None),
+    'event': lambda rng: ('GET', f'/api/events/{rng.randrange(1, 11)}', None),
+    'starmap': lambda rng: _starmap(rng, '&stars=0'),
+    'starmap_stars': lambda rng: _starmap(rng, '&mag=5'),
+    'horoscope': lambda rng: ('GET', f'/api/horoscope?sign={rng.choice(SIGNS)}&day=today', None),
+    'apod': lambda rng: ('GET', '/api/nasa/apod', None),
+    'nasa_search': lambda rng: ('GET', f'/api/nasa/search?q={rng.choice(SEARCH_TERMS)}', None),
+    'pixabay_search': lambda rng: ('GET', f'/api/pixabay/search?q={rng.choice(SEARCH_TERMS)}', None),
+    'weather': lambda rng: ('GET', '/api/weather/observing?lat={}&lon={}'.format(*_point(rng)), None),
+    'forecast': lambda rng: ('GET', '/api/weather/forecast?lat={}&lon={}'.format(*_point(rng)), None),
+    'image_job': lambda rng: ('POST', '/api/huggingface/jobs', {"prompt": rng.choice(PROMPTS)}),
+    'health': lambda rng: ('GET', '/api/health', None),
+    'quiz': lambda rng: ('GET', '/api/quiz/question', None),
+    'pages': lambda rng: ('GET', rng.choice(PAGES), None),
+    'metrics': lambda rng: ('GET', '/metrics', None),
+}
+
+
+# --- Processes ---
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=STARTUP_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args[:3])} exited with status {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout} s")
+
+
+def rss_mb(pid):
+    """(current, peak) resident set size of a process in MB, from /proc; (None, None) elsewhere"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def start_fake_upstreams(args):
+    port = free_port()
+    command = [sys.executable, os.path.join(ROOT, 'fake_upstreams.py'), '--port', str(port),
+               '--latency', str(args.latency), '--error-rate', str(args.error_rate),
+               '--chunk-delay', str(args.chunk_delay), '--image-delay', str(args.image_delay)]
+    for pair in args.upstream_latency:
+        command += ['--upstream-latency', pair]
+    for pair in args.upstream_error_rate:
+        command += ['--upstream-error-rate', pair]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    wait_for_port(port, process)
+    return process, f'http://127.0.0.1:{port}'
+
+
+def start_app(args, upstream_url, scratch):
+    config_dir = os.path.join(scratch, 'config')
+    os.makedirs(config_dir)
+    with open(os.path.join(config_dir, 'config.py'), 'w') as f:
+        f.write(CONFIG_TEMPLATE.format(base=upstream_url, instance=os.path.join(scratch, 'instance'),
+                                       database=os.path.join(scratch, 'astronomy.db')))
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([config_dir, ROOT]))
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', args.server, '--port', str(port)],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                               stderr=None if args.verbose else subprocess.DEVNULL)
+    wait_for_port(port, process)
+    return process, f'http://127.0.0.1:{port}'
+
+
+def serve(server, port):
+    """Child process: run the app on port with the chosen server"""
+    import logging
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    if server == 'uvicorn':
+        import uvicorn
+        uvicorn.run('asgi:application', host='127.0.0.1', port=port, log_level='warning',
+                    backlog=LISTEN_BACKLOG)
+        return
+    from werkzeug.serving import make_server
+    from app import app
+    httpd = make_server('127.0.0.1', port, app, threaded=True)
+    httpd.socket.listen(LISTEN_BACKLOG)
+    httpd.serve_forever()
+
+
+# --- Load generation ---
+
+def percentile(ordered, q):
+    """q-th quantile (0-1) of sorted values, interpolating between neighbours"""
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+async def send(client, base_url, method, path, body):
+    try:
+        response = await client.request(method, base_url + path, json=body)
+        return response.status_code
+    except httpx.HTTPError as e:
+        return type(e).__name__
+
+
+async def drive(client, base_url, name, concurrency, duration, seed):
+    """Closed loop: concurrency clients each send their next request as soon as the last one is answered"""
+    generate = SCENARIOS[name]
+    latencies = []
+    statuses = Counter()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def client_loop(index):
+        rng = random.Random(f'{seed}:{name}:{index}')
+        while loop.time() < deadline:
+            method, path, body = generate(rng)
+            start = time.perf_counter()
+            status = await send(client, base_url, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    failed = sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 400)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "max": ms(latencies[-1]) if latencies else None,
+        },
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "error_rate": round(failed / len(latencies), 4) if latencies else None,
+    }
+
+
+async def run_scenarios(args, base_url, app_pid):
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results = []
+    async with httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT) as client:
+        for name in args.scenarios:
+            # Warm-up fills the caches the way steady traffic would; it is not measured
+            rng = random.Random(f'{args.seed}:{name}:warmup')
+            for _ in range(args.warmup):
+                await send(client, base_url, *SCENARIOS[name](rng))
+            for concurrency in args.concurrency:
+                result = await drive(client, base_url, name, concurrency, args.duration, args.seed)
+                result["rss_mb"], _ = rss_mb(app_pid)
+                results.append(result)
+                print_result(result)
+    return results
+
+
+# --- Reporting ---
+
+def print_result(result):
+    latency = result["latency_ms"]
+    errors = f'{result["error_rate"]:.1%}' if result["error_rate"] is not None else '-'
+    print(f'{result["scenario"]:<16} c={result["concurrency"]:<4} {result["throughput_rps"]:>9.1f} req/s  '
+          f'p50 {_ms(latency["p50"])}  p95 {_ms(latency["p95"])}  p99 {_ms(latency["p99"])}  '
+          f'errors {errors:>6}  rss {result["rss_mb"]} MB')
+
+
+def _ms(value):
+    return f'{value:9.2f} ms' if value is not None else f'{"-":>9}   '
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def compare(old_path, new_path, threshold):
+    """Print two result files side by side; returns the number of regressions"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    before = {(r["scenario"], r["concurrency"]): r for r in old["results"]}
+    print(f'{old_path} ({old.get("commit")}) -> {new_path} ({new.get("commit")})')
+    regressions = 0
+    for result in new["results"]:
+        key = (result["scenario"], result["concurrency"])
+        if key not in before:
+            continue
+        was = before[key]
+        p95_was, p95_now = was["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        rps_was, rps_now = was["throughput_rps"], result["throughput_rps"]
+        p95_change = (p95_now - p95_was) / p95_was if p95_was and p95_now is not None else 0.0
+        rps_change = (rps_now - rps_was) / rps_was if rps_was else 0.0
+        slower = p95_change > threshold or rps_change < -threshold
+        regressions += slower
+        print(f'{key[0]:<16} c={key[1]:<4} p95 {p95_was:9.2f} -> {p95_now:9.2f} ms ({p95_change:+7.1%})  '
+              f'{rps_was:9.1f} -> {rps_now:9.1f} req/s ({rps_change:+7.1%})'
+              f'{"  REGRESSION" if slower else ""}')
+    print(f'{regressions} regression(s) beyond {threshold:.0%}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', default=','.join(map(str, DEFAULT_CONCURRENCY)),
+                        help="comma-separated concurrency levels")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="seconds per scenario and level")
+    parser.add_argument('--warmup', type=int, default=WARMUP_REQUESTS, help="unmeasured requests per scenario")
+    parser.add_argument('--server', choices=('werkzeug', 'uvicorn'), default='werkzeug',
+                        help="threaded WSGI server for app.py, or uvicorn for asgi.py")
+    parser.add_argument('--latency', type=float, default=0.0, help="fake upstream latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of upstream calls answered with 503")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="seconds between streamed Gemini chunks")
+    parser.add_argument('--image-delay', type=float, default=0.0, help="extra seconds per image generation")
+    parser.add_argument('--upstream-latency', action='append', default=[], metavar='NAME=SECONDS')
+    parser.add_argument('--upstream-error-rate', action='append', default=[], metavar='NAME=FRACTION')
+    parser.add_argument('--seed', default='1')
+    parser.add_argument('--output', help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two result files and exit")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative p95 or throughput change reported as a regression")
+    parser.add_argument('--verbose', action='store_true', help="show the app's log output")
+    parser.add_argument('--serve', choices=('werkzeug', 'uvicorn'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve, args.port)
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    if httpx is None:
+        sys.exit("The load generator needs httpx (pip install httpx)")
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}")
+    args.concurrency = [int(level) for level in args.concurrency.split(',')]
+
+    commit, dirty = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit or "unknown"}{"-dirty" if dirty else ""}.json')
+    with tempfile.TemporaryDirectory(prefix='astro-load-') as scratch:
+        upstreams, upstream_url = start_fake_upstreams(args)
+        app_process = None
+        try:
+            app_process, base_url = start_app(args, upstream_url, scratch)
+            rss_start, _ = rss_mb(app_process.pid)
+            results = asyncio.run(run_scenarios(args, base_url, app_process.pid))
+            rss_end, rss_peak = rss_mb(app_process.pid)
+        finally:
+            for process in (app_process, upstreams):
+                if process is not None:
+                    process.terminate()
+                    process.wait()
+
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "server": args.server, "duration_s": args.duration, "warmup": args.warmup, "seed": args.seed,
+            "latency": args.latency, "error_rate": args.error_rate, "chunk_delay": args.chunk_delay,
+            "image_delay": args.image_delay, "upstream_latency": args.upstream_latency,
+            "upstream_error_rate": args.upstream_error_rate,
+        },
+        "rss_mb": {"start": rss_start, "end": rss_end, "peak": rss_peak},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"RSS {rss_start} -> {rss_end} MB (peak {rss_peak} MB); results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
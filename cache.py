@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class TTLCache:
+    """In-memory TTL cache with stale-while-revalidate and single-flight loads
+
+    A fresh entry is returned directly. An entry that expired less than
+    ``stale_ttl`` seconds ago is returned immediately while one background
+    refresh runs. Anything older (or missing) is loaded in the calling thread,
+    and concurrent callers for the same key wait on that one load instead of
+    starting their own. Loaders return None to signal "don't cache this".
+    """
+
+    def __init__(self, ttl=300, stale_ttl=0, clock=time.time):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'loads': 0, 'load_errors': 0}
+
+    def get(self, key, loader, ttl=None):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if now < expires_at:
+                    self.stats['hits'] += 1
+                    return value
+                if now < expires_at + self.stale_ttl:
+                    self.stats['stale_hits'] += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = Future()
+                        threading.Thread(target=self._load, args=(key, loader, ttl),
+                                         daemon=True).start()
+                    return value
+            self.stats['misses'] += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if leader:
+            self._load(key, loader, ttl)
+        return future.result()
+
+    def peek(self, key):
+        """Return the cached value regardless of age, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def set(self, key, value, ttl=None):
+        ttl = self._resolve_ttl(ttl, value)
+        with self._lock:
+            self._entries[key] = (value, self.clock() + ttl)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _load(self, key, loader, ttl):
+        with self._lock:
+            future = self._inflight[key]
+            self.stats['loads'] += 1
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl)
+        except Exception as e:
+            with self._lock:
+                self.stats['load_errors'] += 1
+                del self._inflight[key]
+            future.set_exception(e)
+            return
+        with self._lock:
+            del self._inflight[key]
+        future.set_result(value)
+
+    def _resolve_ttl(self, ttl, value):
+        ttl = self.ttl if ttl is None else ttl
+        return ttl(value) if callable(ttl) else ttl
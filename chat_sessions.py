@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Sessions kept in memory; the least recently used are dropped beyond this
+MAX_SESSIONS = 5000
+# Sessions untouched for this long are forgotten, in memory and on disk
+IDLE_TTL = 30 * 60
+# Most recent turns kept verbatim, and the tokens they may take up between them
+MAX_TURNS = 8
+TOKEN_BUDGET = 1000
+# Tokens of the summary that older turns are folded into
+SUMMARY_TOKEN_BUDGET = 250
+# Longest question and answer stored for a turn; Gemini answers run to ~4 KB
+MAX_QUESTION_CHARS = 500
+MAX_ANSWER_CHARS = 1500
+# Characters of a question and of its answer kept in its summary line
+SUMMARY_CHARS = 160
+# Seconds between sweeps of idle sessions out of the SQLite store
+SWEEP_INTERVAL = 60
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def estimate_tokens(text):
+    """Rough Gemini token count: about four characters of English text per token"""
+    return len(text) // 4 + 1
+
+
+def clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+
+def summary_line(question, answer):
+    """One line standing in for a turn that no longer fits: the question and the answer's first sentence"""
+    first_sentence = SENTENCE_END.split(answer.strip(), 1)[0]
+    return f"Q: {clip(question, SUMMARY_CHARS)} A: {clip(first_sentence, SUMMARY_CHARS)}"
+
+
+def format_history(summary, turns):
+    """The conversation so far as prompt text, or '' for a new conversation"""
+    lines = []
+    if summary:
+        lines.append("Earlier in this conversation (summarized):")
+        lines.extend(summary)
+    if turns:
+        lines.append("Most recent exchanges:")
+        for question, answer in turns:
+            lines.append(f"User: {question}")
+            lines.append(f"Assistant: {answer}")
+    return '\n'.join(lines)
+
+
+class ChatSession:
+    __slots__ = ('turns', 'summary', 'tokens', 'summary_tokens', 'last_active')
+
+    def __init__(self, turns=(), summary=(), last_active=None):
+        self.turns = deque(turns)      # (question, answer), oldest first
+        self.summary = deque(summary)  # summary lines of folded turns, oldest first
+        self.tokens = sum(estimate_tokens(q) + estimate_tokens(a) for q, a in self.turns)
+        self.summary_tokens = sum(estimate_tokens(line) for line in self.summary)
+        self.last_active = last_active if last_active is not None else time.time()
+
+
+class ChatSessions:
+    """Per-session chat history with a bounded size, so follow-up questions keep their context
+
+    Each session keeps its latest turns in a ring buffer within ``token_budget``;
+    older turns are folded into a summary of one line each, and the oldest
+    summary lines are dropped beyond ``summary_token_budget``. A session's
+    prompt history is therefore bounded however long the conversation runs,
+    and memory by ``max_sessions`` of those. Sessions idle for ``idle_ttl``
+    seconds are forgotten.
+
+    With a ``path`` every turn is written through to SQLite and a session that
+    is not in memory (after a restart, or evicted) is read back on its next
+    request; without one, sessions live in memory only.
+    """
+
+    def __init__(self, path=None, max_sessions=MAX_SESSIONS, idle_ttl=IDLE_TTL, max_turns=MAX_TURNS,
+                 token_budget=TOKEN_BUDGET, summary_token_budget=SUMMARY_TOKEN_BUDGET):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self._sessions = OrderedDict()  # session id -> ChatSession, least recently used first
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.stats = {'created': 0, 'resumed': 0, 'restored': 0, 'unknown': 0, 'turns': 0,
+                      'folded_turns': 0, 'dropped_summary_lines': 0, 'evictions': 0, 'expired': 0}
+
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                id TEXT PRIMARY KEY,
+                turns TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            ''')
+            self._conn.execute('DELETE FROM chat_sessions WHERE updated_at <= ?', (time.time() - idle_ttl,))
+            self._conn.commit()
+
+    def open(self, session_id=None):
+        """Return ``(session_id, summary, turns)`` for a request
+
+        A known session id gets its history; a missing, expired or unknown one
+        gets a new id and an empty history (ids are never chosen by clients).
+        Nothing is stored until the first turn is added.
+        """
+        now = time.time()
+        with self._lock:
+            session = self._load(session_id, now) if session_id else None
+            if session is None:
+                if session_id:
+                    self.stats['unknown'] += 1
+                self.stats['created'] += 1
+                return secrets.token_urlsafe(16), (), ()
+            self.stats['resumed'] += 1
+            session.last_active = now
+            self._sessions.move_to_end(session_id)
+            return session_id, tuple(session.summary), tuple(session.turns)
+
+    def add_turn(self, session_id, question, answer):
+        """Append a question and its answer, compacting the session to its budgets"""
+        question = clip(question.strip(), MAX_QUESTION_CHARS)
+        answer = clip(answer.strip(), MAX_ANSWER_CHARS)
+        now = time.time()
+        with self._lock:
+            session = self._load(session_id, now)
+            if session is None:
+                session = self._sessions[session_id] = ChatSession()
+            self._sessions.move_to_end(session_id)
+            session.last_active = now
+            session.turns.append((question, answer))
+            session.tokens += estimate_tokens(question) + estimate_tokens(answer)
+            self.stats['turns'] += 1
+            self._compact(session)
+            if self._conn is not None:
+                self._conn.execute('INSERT OR REPLACE INTO chat_sessions VALUES (?, ?, ?, ?)',
+                                   (session_id, json.dumps(list(session.turns)),
+                                    json.dumps(list(session.summary)), now))
+            self._evict(now)
+            if self._conn is not None:
+                self._conn.commit()
+
+    def report(self):
+        with self._lock:
+            return dict(self.stats, sessions=len(self._sessions),
+                        tokens=sum(s.tokens + s.summary_tokens for s in self._sessions.values()))
+
+    def _compact(self, session):
+        # The newest turn always stays, even when it alone is over the budget
+        while len(session.turns) > 1 and (len(session.turns) > self.max_turns
+                                          or session.tokens > self.token_budget):
+            question, answer = session.turns.popleft()
+            session.tokens -= estimate_tokens(question) + estimate_tokens(answer)
+            line = summary_line(question, answer)
+            session.summary.append(line)
+            session.summary_tokens += estimate_tokens(line)
+            self.stats['folded_turns'] += 1
+        while session.summary and session.summary_tokens > self.summary_token_budget:
+            session.summary_tokens -= estimate_tokens(session.summary.popleft())
+            self.stats['dropped_summary_lines'] += 1
+
+    def _load(self, session_id, now):
+        """The live session with this id from memory, else from SQLite, else None"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            if now - session.last_active < self.idle_ttl:
+                return session
+            del self._sessions[session_id]
+            self.stats['expired'] += 1
+        if self._conn is None:
+            return None
+        row = self._conn.execute('SELECT turns, summary, updated_at FROM chat_sessions WHERE id = ?',
+                                 (session_id,)).fetchone()
+        if row is None or now - row[2] >= self.idle_ttl:
+            return None
+        session = self._sessions[session_id] = ChatSession(map(tuple, json.loads(row[0])), json.loads(row[1]), row[2])
+        self.stats['restored'] += 1
+        return session
+
+    def _evict(self, now):
+        # Least recently used first, so idle sessions are always at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_active >= self.idle_ttl:
+                self.stats['expired'] += 1
+            elif len(self._sessions) > self.max_sessions:
+                self.stats['evictions'] += 1
+            else:
+                break
+            del self._sessions[session_id]
+        # Evicted sessions stay on disk until idle, so they can be restored
+        if self._conn is not None and now - self._last_sweep >= SWEEP_INTERVAL:
+            self._last_sweep = now
+            self._conn.execute('DELETE FROM chat_sessions WHERE updated_at <= ?', (now - self.idle_ttl,))
@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+# Gauge values for the states, in order of how much they let through
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Outcomes of the last WINDOW calls decide whether a closed circuit opens,
+# once at least MIN_CALLS have been made
+WINDOW = 20
+MIN_CALLS = 10
+FAILURE_RATE = 0.5
+SLOW_CALL_RATE = 0.8
+# Seconds an open circuit rejects calls before letting HALF_OPEN_CALLS trial calls through
+OPEN_SECONDS = 30
+HALF_OPEN_CALLS = 2
+# A call slower than this (seconds until the response headers) counts as slow;
+# set well above each upstream's normal latency and below its read timeout
+SLOW_CALL_SECONDS = {
+    'nasa': 5,
+    'pixabay': 5,
+    'gemini': 30,
+    'weather': 5,
+    'astronomyapi': 8,
+    'aztro': 5,
+    'huggingface': 90,
+}
+DEFAULT_SLOW_CALL_SECONDS = 10
+TRANSITIONS_KEPT = 20
+
+
+class CircuitOpen(requests.RequestException):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    # Lets callers that map upstream errors to a status (the image jobs) answer 503
+    status_code = 503
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"{upstream} is unavailable; not retrying for {retry_after} s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one upstream
+
+    Callers ask ``allow()`` before each call and report it with
+    ``record(ok, duration)``, or ``release()`` when an allowed call never
+    reached the upstream. A closed circuit opens once the failed or slow
+    share of its recent calls crosses a threshold; an open one rejects
+    every call for open_seconds, then lets half_open_calls trial calls
+    through. Those all succeeding in time closes it; any of them failing
+    opens it again.
+    """
+
+    def __init__(self, name, window=WINDOW, min_calls=MIN_CALLS, failure_rate=FAILURE_RATE,
+                 slow_call_seconds=DEFAULT_SLOW_CALL_SECONDS, slow_call_rate=SLOW_CALL_RATE,
+                 open_seconds=OPEN_SECONDS, half_open_calls=HALF_OPEN_CALLS, clock=time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self.state = CLOSED
+        # (failed, slow) of the most recent calls while closed
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        # Trial calls let through and completed successfully in the current half-open spell
+        self._trials = 0
+        self._trial_successes = 0
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0}
+        self.transitions = {}
+        self._history = deque(maxlen=TRANSITIONS_KEPT)
+
+    def allow(self):
+        """True if a call may go ahead now"""
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self._opened_at < self.open_seconds:
+                    self.stats['rejected'] += 1
+                    return False
+                self._transition(HALF_OPEN, "open period over")
+            if self.state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.stats['rejected'] += 1
+                    return False
+                self._trials += 1
+            return True
+
+    def release(self):
+        """Give back an allowed call that never reached the upstream"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._trials > self._trial_successes:
+                self._trials -= 1
+
+    def record(self, ok, duration):
+        """Report an allowed call: whether the upstream answered properly, and how long it took"""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['failures'] += not ok
+            self.stats['slow_calls'] += slow
+            if self.state == HALF_OPEN:
+                if not ok or slow:
+                    self._transition(OPEN, "trial call failed" if not ok else "trial call slow")
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self._transition(CLOSED, "trial calls succeeded")
+            elif self.state == CLOSED:
+                self._outcomes.append((not ok, slow))
+                self._check_rates()
+            # Calls that were under way when the circuit opened change nothing
+
+    def retry_after(self):
+        """Whole seconds until an open circuit lets a trial call through"""
+        with self._lock:
+            if self.state != OPEN:
+                return 1
+            return max(int(self._opened_at + self.open_seconds - self.clock()) + 1, 1)
+
+    def report(self):
+        with self._lock:
+            calls = len(self._outcomes)
+            return dict(
+                self.stats,
+                state=self.state,
+                state_value=STATE_VALUES[self.state],
+                window_calls=calls,
+                failure_rate=round(sum(f for f, _ in self._outcomes) / calls, 3) if calls else 0.0,
+                slow_call_rate=round(sum(s for _, s in self._outcomes) / calls, 3) if calls else 0.0,
+                transitions=dict(self.transitions),
+                recent_transitions=list(self._history),
+            )
+
+    def _check_rates(self):
+        # Caller holds the lock
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        failures = sum(f for f, _ in self._outcomes)
+        slow = sum(s for _, s in self._outcomes)
+        if failures / calls >= self.failure_rate:
+            self._transition(OPEN, f"{failures} of the last {calls} calls failed")
+        elif slow / calls >= self.slow_call_rate:
+            self._transition(OPEN, f"{slow} of the last {calls} calls were slow")
+
+    def _transition(self, state, reason):
+        # Caller holds the lock
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self._history.append({"at": time.time(), "from": self.state, "to": state, "reason": reason})
+        logger.warning("Circuit for %s: %s -> %s (%s)", self.name, self.state, state, reason)
+        self.state = state
+        if state == OPEN:
+            self._opened_at = self.clock()
+        elif state == HALF_OPEN:
+            self._trials = self._trial_successes = 0
+        else:
+            self._outcomes.clear()
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per upstream name, created on first use"""
+
+    def __init__(self, slow_call_seconds=None, **settings):
+        self.slow_call_seconds = dict(SLOW_CALL_SECONDS, **(slow_call_seconds or {}))
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(
+                        name, slow_call_seconds=self.slow_call_seconds.get(name, DEFAULT_SLOW_CALL_SECONDS),
+                        **self.settings)
+        return breaker
+
+    def report(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.report() for breaker in breakers}
+
+
+# Shared by the sync and async upstream clients, so both see one state per upstream
+breakers = CircuitBreakers()
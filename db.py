@@ -0,0 +1,117 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+# Applied to every connection when it is opened
+CONNECTION_PRAGMAS = (
+    # WAL is persistent in the file; with it readers never wait on a writer
+    'PRAGMA journal_mode=WAL',
+    # Durable across application crashes; only an OS crash can lose the last commits
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-16000',      # 16 MB page cache per connection
+    'PRAGMA mmap_size=268435456',    # read pages straight from a 256 MB memory map
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000',      # a second writer waits instead of failing at once
+)
+
+POOL_SIZE = 8
+# Prepared statements kept per connection, keyed on the SQL text
+STATEMENT_CACHE_SIZE = 128
+
+
+class Database:
+    """Pooled SQLite connections for request handlers
+
+    Connections are opened once and handed out from a pool, so each keeps its
+    page cache, memory map and prepared statements across requests. They run
+    in autocommit mode: a SELECT reads the latest committed snapshot and never
+    holds a transaction open, and writes go through ``transaction()``.
+    """
+
+    def __init__(self, path, pool_size=POOL_SIZE):
+        self.path = path
+        # Label of this database's query timings in /metrics
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.stats = {'connections_opened': 0, 'checkouts': 0}
+
+    def connect(self):
+        """Open a new connection with the standard settings, outside the pool"""
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self.stats['connections_opened'] += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection from the pool for the duration of the block"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        with self._lock:
+            self.stats['checkouts'] += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run the block in a write transaction, committed on success"""
+        start = time.perf_counter()
+        with self.connection() as conn:
+            # Take the write lock up front so the transaction can't fail halfway on SQLITE_BUSY
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        metrics.observe_sqlite(self.name, 'transaction', time.perf_counter() - start)
+
+    def query(self, sql, params=()):
+        """Return all rows of a SELECT as dicts"""
+        start = time.perf_counter()
+        with self.connection() as conn:
+            rows = [dict(row) for row in conn.execute(sql, params)]
+        metrics.observe_sqlite(self.name, 'query', time.perf_counter() - start)
+        return rows
+
+    def query_one(self, sql, params=()):
+        """Return the first row of a SELECT as a dict, or None"""
+        start = time.perf_counter()
+        with self.connection() as conn:
+            # fetchall so the statement is reset before the connection goes back to the pool
+            rows = conn.execute(sql, params).fetchall()
+        metrics.observe_sqlite(self.name, 'query', time.perf_counter() - start)
+        return dict(rows[0]) if rows else None
+
+    def migrate(self, migrations):
+        """Apply the migrations not yet recorded in PRAGMA user_version, in order"""
+        with self.transaction() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for number, statement in enumerate(migrations[version:], start=version + 1):
+                conn.execute(statement)
+                # PRAGMA doesn't take bound parameters
+                conn.execute(f'PRAGMA user_version = {int(number)}')
+
+    def report(self):
+        with self._lock:
+            return dict(self.stats, pooled=self._pool.qsize())
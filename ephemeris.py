@@ -0,0 +1,315 @@
+"""Low-precision solar-system ephemeris for the star map
+
+Planets use the JPL approximate Keplerian elements (Standish, valid
+1800-2050, arcminute-level), the Moon a truncated form of the Meeus
+chapter 47 series, and planet positions are precessed from J2000 to the
+equinox of date. Nutation and aberration (well under an arcminute) are
+ignored. Every function works on NumPy arrays, so many times and observers
+are handled in one call.
+"""
+from datetime import datetime, timezone
+
+try:
+    import numpy as np
+except ImportError:  # app.py falls back to the remote positions API
+    np = None
+
+J2000 = 2451545.0
+# Dynamical minus universal time, close enough for the 2000-2050 range
+DELTA_T_SECONDS = 69.2
+AU_KM = 149597870.7
+EARTH_RADIUS_KM = 6378.14
+# Days for light to travel one astronomical unit
+LIGHT_TIME_DAYS_PER_AU = 0.0057755183
+VALID_YEARS = (1800, 2050)
+
+BODY_NAMES = {
+    'sun': 'Sun', 'moon': 'Moon', 'mercury': 'Mercury', 'venus': 'Venus', 'mars': 'Mars',
+    'jupiter': 'Jupiter', 'saturn': 'Saturn', 'uranus': 'Uranus', 'neptune': 'Neptune', 'pluto': 'Pluto',
+}
+
+# a (au), e, I, L, longitude of perihelion, longitude of ascending node (degrees),
+# each followed by its rate per Julian century, J2000 ecliptic and equinox
+ORBITAL_ELEMENTS = {
+    'mercury': ((0.38709927, 0.00000037), (0.20563593, 0.00001906), (7.00497902, -0.00594749),
+                (252.25032350, 149472.67411175), (77.45779628, 0.16047689), (48.33076593, -0.12534081)),
+    'venus': ((0.72333566, 0.00000390), (0.00677672, -0.00004107), (3.39467605, -0.00078890),
+              (181.97909950, 58517.81538729), (131.60246718, 0.00268329), (76.67984255, -0.27769418)),
+    'earth': ((1.00000261, 0.00000562), (0.01671123, -0.00004392), (-0.00001531, -0.01294668),
+              (100.46457166, 35999.37244981), (102.93768193, 0.32327364), (0.0, 0.0)),
+    'mars': ((1.52371034, 0.00001847), (0.09339410, 0.00007882), (1.84969142, -0.00813131),
+             (-4.55343205, 19140.30268499), (-23.94362959, 0.44441088), (49.55953891, -0.29257343)),
+    'jupiter': ((5.20288700, -0.00011607), (0.04838624, -0.00013253), (1.30439695, -0.00183714),
+                (34.39644051, 3034.74612775), (14.72847983, 0.21252668), (100.47390909, 0.20469106)),
+    'saturn': ((9.53667594, -0.00125060), (0.05386179, -0.00050991), (2.48599187, 0.00193609),
+               (49.95424423, 1222.49362201), (92.59887831, -0.41897216), (113.66242448, -0.28867794)),
+    'uranus': ((19.18916464, -0.00196176), (0.04725744, -0.00004397), (0.77263783, -0.00242939),
+               (313.23810451, 428.48202785), (170.95427630, 0.40805281), (74.01692503, 0.04240589)),
+    'neptune': ((30.06992276, 0.00026291), (0.00859048, 0.00005105), (1.77004347, 0.00035372),
+                (-55.12002969, 218.45945325), (44.96476227, -0.32241464), (131.78422574, -0.00508664)),
+    'pluto': ((39.48211675, -0.00031596), (0.24882730, 0.00005170), (17.14001206, 0.00004818),
+              (238.92903833, 145.20780515), (224.06891629, -0.04062942), (110.30393684, -0.01183482)),
+}
+
+OBLIQUITY_J2000 = 23.43928
+
+# Moon, Meeus table 47.A: multiples of D, M, M', F; longitude (1e-6 deg); distance (1e-3 km)
+MOON_LR_TERMS = (
+    (0, 0, 1, 0, 6288774, -20905355), (2, 0, -1, 0, 1274027, -3699111),
+    (2, 0, 0, 0, 658314, -2955968), (0, 0, 2, 0, 213618, -569925),
+    (0, 1, 0, 0, -185116, 48888), (0, 0, 0, 2, -114332, -3149),
+    (2, 0, -2, 0, 58793, 246158), (2, -1, -1, 0, 57066, -152138),
+    (2, 0, 1, 0, 53322, -170733), (2, -1, 0, 0, 45758, -204586),
+    (0, 1, -1, 0, -40923, -129620), (1, 0, 0, 0, -34720, 108743),
+    (0, 1, 1, 0, -30383, 104755), (2, 0, 0, -2, 15327, 10321),
+    (0, 0, 1, 2, -12528, 0), (0, 0, 1, -2, 10980, 79661),
+    (4, 0, -1, 0, 10675, -34782), (0, 0, 3, 0, 10034, -23210),
+    (4, 0, -2, 0, 8548, -21636), (2, 1, -1, 0, -7888, 24208),
+    (2, 1, 0, 0, -6766, 30824), (1, 0, -1, 0, -5163, -8379),
+    (1, 1, 0, 0, 4987, -16675), (2, -1, 1, 0, 4036, -12831),
+    (2, 0, 2, 0, 3994, -10445), (4, 0, 0, 0, 3861, -11650),
+    (2, 0, -3, 0, 3665, 14403), (0, 1, -2, 0, -2689, -7003),
+    (2, 0, -1, 2, -2602, 0), (2, -1, -2, 0, 2390, 10056),
+    (1, 0, 1, 0, -2348, 6322), (2, -2, 0, 0, 2236, -9884),
+)
+
+# Moon, Meeus table 47.B: multiples of D, M, M', F; latitude (1e-6 deg)
+MOON_B_TERMS = (
+    (0, 0, 0, 1, 5128122), (0, 0, 1, 1, 280602), (0, 0, 1, -1, 277693),
+    (2, 0, 0, -1, 173237), (2, 0, -1, 1, 55413), (2, 0, -1, -1, 46271),
+    (2, 0, 0, 1, 32573), (0, 0, 2, 1, 17198), (2, 0, 1, -1, 9266),
+    (0, 0, 2, -1, 8822), (2, -1, 0, -1, 8216), (2, 0, -2, -1, 4324),
+    (2, 0, 1, 1, 4200), (2, 1, 0, -1, -3359), (2, -1, -1, 1, 2463),
+    (2, -1, 0, 1, 2211), (2, -1, -1, -1, 2065), (0, 1, -1, -1, -1870),
+    (4, 0, -1, -1, 1828), (0, 1, 0, 1, -1794), (0, 0, 0, 3, -1749),
+    (0, 1, -1, 1, -1565), (1, 0, 0, 1, -1491), (0, 1, 1, 1, -1475),
+    (0, 1, 1, -1, -1410), (0, 1, 0, -1, -1344), (1, 0, 0, -1, -1335),
+    (0, 0, 3, 1, 1107), (4, 0, 0, -1, 1021), (4, 0, -1, 1, 833),
+)
+
+if np is not None:
+    _LR = np.array(MOON_LR_TERMS, dtype=float)
+    _B = np.array(MOON_B_TERMS, dtype=float)
+
+
+def julian_day(moment):
+    """Julian day (UT) of a datetime; naive datetimes are taken as UTC"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - datetime(2000, 1, 1, 12, tzinfo=timezone.utc)).total_seconds() / 86400.0 + J2000
+
+
+def in_valid_range(jd):
+    """Whether every time in jd is within the years the orbital elements cover"""
+    years = 2000.0 + (np.asarray(jd) - J2000) / 365.25
+    return bool(np.all((years >= VALID_YEARS[0]) & (years <= VALID_YEARS[1])))
+
+
+def _heliocentric(body, jd_tt):
+    """Heliocentric equatorial J2000 position (au) of a planet, shape (3, ...)"""
+    t = (jd_tt - J2000) / 36525.0
+    (a, e, incl, mean_long, peri, node) = [base + rate * t for base, rate in ORBITAL_ELEMENTS[body]]
+    mean_anomaly = np.radians((mean_long - peri + 180.0) % 360.0 - 180.0)
+    arg_peri = np.radians(peri - node)
+    node = np.radians(node)
+    incl = np.radians(incl)
+
+    ecc = mean_anomaly + e * np.sin(mean_anomaly)
+    for _ in range(6):
+        ecc = ecc - (ecc - e * np.sin(ecc) - mean_anomaly) / (1.0 - e * np.cos(ecc))
+    xp = a * (np.cos(ecc) - e)
+    yp = a * np.sqrt(1.0 - e * e) * np.sin(ecc)
+
+    cw, sw = np.cos(arg_peri), np.sin(arg_peri)
+    cn, sn = np.cos(node), np.sin(node)
+    ci, si = np.cos(incl), np.sin(incl)
+    x = (cw * cn - sw * sn * ci) * xp + (-sw * cn - cw * sn * ci) * yp
+    y = (cw * sn + sw * cn * ci) * xp + (-sw * sn + cw * cn * ci) * yp
+    z = (sw * si) * xp + (cw * si) * yp
+
+    eps = np.radians(OBLIQUITY_J2000)
+    return np.array([x, y * np.cos(eps) - z * np.sin(eps), y * np.sin(eps) + z * np.cos(eps)])
+
+
+def precess_from_j2000(vec, jd_tt):
+    """Rotate equatorial J2000 vectors (3, ...) to the mean equator and equinox of date"""
+    t = (jd_tt - J2000) / 36525.0
+    arcsec = np.pi / (180.0 * 3600.0)
+    zeta = (2306.2181 * t + 0.30188 * t ** 2 + 0.017998 * t ** 3) * arcsec
+    z = (2306.2181 * t + 1.09468 * t ** 2 + 0.018203 * t ** 3) * arcsec
+    theta = (2004.3109 * t - 0.42665 * t ** 2 - 0.041833 * t ** 3) * arcsec
+    cz, sz = np.cos(zeta), np.sin(zeta)
+    cZ, sZ = np.cos(z), np.sin(z)
+    ct, st = np.cos(theta), np.sin(theta)
+    x, y, w = vec
+    return np.array([
+        (cz * cZ * ct - sz * sZ) * x + (-sz * cZ * ct - cz * sZ) * y + (-cZ * st) * w,
+        (cz * sZ * ct + sz * cZ) * x + (-sz * sZ * ct + cz * cZ) * y + (-sZ * st) * w,
+        (cz * st) * x + (-sz * st) * y + ct * w,
+    ])
+
+
+def _mean_obliquity(t):
+    return 23.4392911 - (46.8150 * t + 0.00059 * t ** 2 - 0.001813 * t ** 3) / 3600.0
+
+
+def moon_ecliptic(jd_tt):
+    """Geocentric ecliptic longitude, latitude (degrees, equinox of date) and distance (km) of the Moon"""
+    t = (np.asarray(jd_tt, dtype=float) - J2000) / 36525.0
+    lp = 218.3164477 + 481267.88123421 * t - 0.0015786 * t ** 2 + t ** 3 / 538841 - t ** 4 / 65194000
+    d = 297.8501921 + 445267.1114034 * t - 0.0018819 * t ** 2 + t ** 3 / 545868 - t ** 4 / 113065000
+    m = 357.5291092 + 35999.0502909 * t - 0.0001536 * t ** 2 + t ** 3 / 24490000
+    mp = 134.9633964 + 477198.8675055 * t + 0.0087414 * t ** 2 + t ** 3 / 69699 - t ** 4 / 14712000
+    f = 93.2720950 + 483202.0175233 * t - 0.0036539 * t ** 2 - t ** 3 / 3526000 + t ** 4 / 863310000
+    ecc = 1.0 - 0.002516 * t - 0.0000074 * t ** 2
+    a1 = np.radians(119.75 + 131.849 * t)
+    a2 = np.radians(53.09 + 479264.290 * t)
+    a3 = np.radians(313.45 + 481266.484 * t)
+
+    # Arguments of every term at once: (..., terms)
+    args = np.stack([d, m, mp, f], axis=-1)
+    lr_angles = np.radians(args @ _LR[:, :4].T)
+    b_angles = np.radians(args @ _B[:, :4].T)
+    # Terms involving the Sun's anomaly M are scaled by E per multiple of M
+    lr_scale = ecc[..., None] ** np.abs(_LR[:, 1])
+    b_scale = ecc[..., None] ** np.abs(_B[:, 1])
+
+    sum_l = (lr_scale * _LR[:, 4] * np.sin(lr_angles)).sum(axis=-1)
+    sum_r = (lr_scale * _LR[:, 5] * np.cos(lr_angles)).sum(axis=-1)
+    sum_b = (b_scale * _B[:, 4] * np.sin(b_angles)).sum(axis=-1)
+    lp_rad, f_rad, mp_rad = np.radians(lp), np.radians(f), np.radians(mp)
+    sum_l = sum_l + 3958 * np.sin(a1) + 1962 * np.sin(lp_rad - f_rad) + 318 * np.sin(a2)
+    sum_b = (sum_b - 2235 * np.sin(lp_rad) + 382 * np.sin(a3) + 175 * np.sin(a1 - f_rad)
+             + 175 * np.sin(a1 + f_rad) + 127 * np.sin(lp_rad - mp_rad) - 115 * np.sin(lp_rad + mp_rad))
+
+    longitude = (lp + sum_l / 1e6) % 360.0
+    latitude = sum_b / 1e6
+    distance = 385000.56 + sum_r / 1000.0
+    return longitude, latitude, distance
+
+
+def geocentric_equatorial(body, jd_tt):
+    """Right ascension (hours), declination (degrees) of date and distance (au) of a body"""
+    jd_tt = np.asarray(jd_tt, dtype=float)
+    if body == 'moon':
+        longitude, latitude, distance = moon_ecliptic(jd_tt)
+        eps = np.radians(_mean_obliquity((jd_tt - J2000) / 36525.0))
+        lam, beta = np.radians(longitude), np.radians(latitude)
+        vec = np.array([np.cos(beta) * np.cos(lam),
+                        np.cos(beta) * np.sin(lam) * np.cos(eps) - np.sin(beta) * np.sin(eps),
+                        np.cos(beta) * np.sin(lam) * np.sin(eps) + np.sin(beta) * np.cos(eps)])
+        distance_au = distance / AU_KM
+    else:
+        earth = _heliocentric('earth', jd_tt)
+        if body == 'sun':
+            vec = -earth
+        else:
+            vec = _heliocentric(body, jd_tt) - earth
+            # One light-time iteration: where the planet was when the light left it
+            light_time = np.sqrt((vec ** 2).sum(axis=0)) * LIGHT_TIME_DAYS_PER_AU
+            vec = _heliocentric(body, jd_tt - light_time) - earth
+        distance_au = np.sqrt((vec ** 2).sum(axis=0))
+        vec = precess_from_j2000(vec, jd_tt)
+    ra = np.degrees(np.arctan2(vec[1], vec[0])) % 360.0 / 15.0
+    dec = np.degrees(np.arctan2(vec[2], np.hypot(vec[0], vec[1])))
+    return ra, dec, distance_au
+
+
+def sidereal_time(jd_ut):
+    """Greenwich mean sidereal time in degrees"""
+    d = jd_ut - J2000
+    t = d / 36525.0
+    return (280.46061837 + 360.98564736629 * d + 0.000387933 * t ** 2 - t ** 3 / 38710000.0) % 360.0
+
+
+def horizontal(ra_hours, dec, jd_ut, lat, lon):
+    """Altitude and azimuth (degrees, azimuth from north through east) for observers
+
+    Arrays broadcast against each other; lon is east-positive.
+    """
+    hour_angle = np.radians(sidereal_time(jd_ut) + lon - ra_hours * 15.0)
+    phi, delta = np.radians(lat), np.radians(dec)
+    sin_alt = np.sin(phi) * np.sin(delta) + np.cos(phi) * np.cos(delta) * np.cos(hour_angle)
+    alt = np.degrees(np.arcsin(np.clip(sin_alt, -1.0, 1.0)))
+    az = np.degrees(np.arctan2(-np.cos(delta) * np.sin(hour_angle),
+                               np.sin(delta) * np.cos(phi) - np.cos(delta) * np.cos(hour_angle) * np.sin(phi)))
+    return alt, az % 360.0
+
+
+def body_positions(jd_ut, lat, lon, bodies=tuple(BODY_NAMES), delta_t=DELTA_T_SECONDS):
+    """Positions of each body for arrays of times and observers
+
+    jd_ut, lat and lon broadcast against each other (e.g. times of shape
+    (T, 1) with observers of shape (N,) give (T, N) results). Returns
+    body -> dict of arrays: ra (hours), dec, alt, az (degrees), distance (au).
+    RA/Dec are geocentric; altitude includes the Moon's parallax.
+    """
+    jd_ut = np.asarray(jd_ut, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    jd_tt = jd_ut + delta_t / 86400.0
+    shape = np.broadcast_shapes(jd_ut.shape, lat.shape, lon.shape)
+    positions = {}
+    for body in bodies:
+        # RA/Dec depend only on time, so they are computed once per time
+        ra, dec, distance = geocentric_equatorial(body, jd_tt)
+        alt, az = horizontal(ra, dec, jd_ut, lat, lon)
+        if body == 'moon':
+            parallax = np.arcsin(EARTH_RADIUS_KM / (distance * AU_KM))
+            alt = alt - np.degrees(np.arcsin(np.sin(parallax) * np.cos(np.radians(alt))))
+        positions[body] = {
+            'ra': np.broadcast_to(ra, shape), 'dec': np.broadcast_to(dec, shape),
+            'alt': np.broadcast_to(alt, shape), 'az': np.broadcast_to(az, shape),
+            'distance': np.broadcast_to(distance, shape),
+        }
+    return positions
+
+
+def _hms(hours):
+    total = round(hours * 3600.0, 2) % 86400.0
+    h, rest = divmod(total, 3600.0)
+    m, s = divmod(rest, 60.0)
+    return f"{int(h):02d}h {int(m):02d}m {s:05.2f}s"
+
+
+def _dms(degrees):
+    sign = '-' if degrees < 0 else ''
+    total = round(abs(degrees) * 3600.0, 1)
+    d, rest = divmod(total, 3600.0)
+    m, s = divmod(rest, 60.0)
+    return f"{sign}{int(d)}° {int(m):02d}' {s:04.1f}\""
+
+
+def positions_payload(moment, lat, lon, elevation=0.0):
+    """Positions of all bodies for one observer, shaped like the Astronomy API positions response"""
+    positions = body_positions(julian_day(moment), lat, lon)
+    stamp = moment.replace(tzinfo=moment.tzinfo or timezone.utc).isoformat(timespec='milliseconds')
+    rows = []
+    for body, name in BODY_NAMES.items():
+        p = {key: float(value) for key, value in positions[body].items()}
+        rows.append({
+            "entry": {"id": body, "name": name},
+            "cells": [{
+                "date": stamp,
+                "id": body,
+                "name": name,
+                "distance": {"fromEarth": {"au": f"{p['distance']:.8f}",
+                                           "km": f"{p['distance'] * AU_KM:.2f}"}},
+                "position": {
+                    # The upstream API spells this key "horizonal"
+                    "horizonal": {
+                        "altitude": {"degrees": f"{p['alt']:.2f}", "string": _dms(p['alt'])},
+                        "azimuth": {"degrees": f"{p['az']:.2f}", "string": _dms(p['az'])},
+                    },
+                    "equatorial": {
+                        "rightAscension": {"hours": f"{p['ra']:.2f}", "string": _hms(p['ra'])},
+                        "declination": {"degrees": f"{p['dec']:.2f}", "string": _dms(p['dec'])},
+                    },
+                },
+            }],
+        })
+    return {"data": {
+        "dates": {"from": stamp, "to": stamp},
+        "observer": {"location": {"longitude": lon, "latitude": lat, "elevation": elevation}},
+        "table": {"header": [stamp], "rows": rows},
+    }}
@@ -0,0 +1,132 @@
+import base64
+import binascii
+import hashlib
+import json
+import threading
+from datetime import date
+
+# Schema changes applied at startup by init_db, in order; never edit or reorder applied entries
+EVENTS_MIGRATIONS = (
+    'CREATE INDEX IF NOT EXISTS idx_events_date ON events(date)',
+    'CREATE INDEX IF NOT EXISTS idx_events_type ON events(type)',
+    # Serves type filters in date order; it also covers plain type lookups
+    'CREATE INDEX IF NOT EXISTS idx_events_type_date ON events(type, date)',
+    'DROP INDEX IF EXISTS idx_events_type',
+)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Tag colors handed out to event types in order of first appearance
+EVENT_TYPE_COLORS = ("#FF5733", "#33A8FF", "#33FF57", "#FF33A8", "#A833FF",
+                     "#FFD700", "#4682B4", "#FF6347", "#2E8B57", "#9932CC")
+
+
+def display_class(event_type):
+    """CSS class name for an event type (lowercase, no spaces)"""
+    return 'event-' + event_type.lower().replace(' ', '-')
+
+
+def parse_date(value):
+    """Validate a YYYY-MM-DD date parameter and return it as stored in the table"""
+    return date.fromisoformat(value).isoformat()
+
+
+def encode_cursor(row):
+    """Opaque cursor pointing just after row in (date, id) order"""
+    return base64.urlsafe_b64encode(json.dumps([row['date'], row['id']]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        event_date, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return parse_date(event_date), int(event_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor") from None
+
+
+def query_events(db, start=None, end=None, types=(), after=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of events in (date, id) order, plus the cursor for the next page or None
+
+    start and end are inclusive dates; after is a cursor from a previous page.
+    Paging continues from the last (date, id) seen rather than skipping an
+    OFFSET, so a deep page costs the same as the first one on idx_events_date
+    (or idx_events_type_date when filtering on type).
+    """
+    clauses = []
+    params = []
+    if start:
+        clauses.append('date >= ?')
+        params.append(start)
+    if end:
+        clauses.append('date <= ?')
+        params.append(end)
+    if types:
+        clauses.append('type IN (%s)' % ', '.join('?' * len(types)))
+        params.extend(types)
+    if after:
+        clauses.append('(date, id) > (?, ?)')
+        params.extend(decode_cursor(after))
+    where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+    # One extra row tells us whether another page follows
+    rows = db.query(f'SELECT * FROM events{where} ORDER BY date, id LIMIT ?', params + [limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def featured_events(db, today, count=3):
+    """The next count events from today on, or the latest ones if none are upcoming"""
+    events = db.query('SELECT * FROM events WHERE date >= ? ORDER BY date, id LIMIT ?', (today, count))
+    if not events:
+        events = db.query('SELECT * FROM events ORDER BY date DESC, id DESC LIMIT ?', (count,))[::-1]
+    return events
+
+
+class EventSnapshot:
+    """Immutable view of the events table, with everything the pages need precomputed"""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: (row['date'], row['id']))
+        self.by_id = {row['id']: row for row in self.rows}
+
+        self.type_colors = {}
+        for row in sorted(self.rows, key=lambda row: row['id']):
+            if row['type'] not in self.type_colors:
+                self.type_colors[row['type']] = EVENT_TYPE_COLORS[len(self.type_colors) % len(EVENT_TYPE_COLORS)]
+
+        # Rows as shown on the calendar: the table columns plus tag color and CSS class
+        self.events = [dict(row, tag_color=self.type_colors[row['type']],
+                            display_class=display_class(row['type']))
+                       for row in self.rows]
+
+        # /api/events body, serialized once per snapshot
+        self.json_body = json.dumps(self.rows, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.json_body).hexdigest()
+
+
+class EventCatalog:
+    """In-memory copy of the events table, rebuilt only after the table changes
+
+    Changes are detected with ``PRAGMA data_version`` on a connection kept for
+    that purpose: its value moves whenever any other connection, in this
+    process or another, commits to the database. Checking it costs one pragma
+    per request; the table is only re-read when it has moved.
+    """
+
+    def __init__(self, db):
+        self._conn = db.connect()
+        self._lock = threading.Lock()
+        self._version = None
+        self._snapshot = None
+        self.stats = {'rebuilds': 0, 'reads': 0}
+
+    def snapshot(self):
+        with self._lock:
+            version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if version != self._version or self._snapshot is None:
+                rows = [dict(row) for row in self._conn.execute('SELECT * FROM events')]
+                self._snapshot = EventSnapshot(rows)
+                self._version = version
+                self.stats['rebuilds'] += 1
+            self.stats['reads'] += 1
+            return self._snapshot
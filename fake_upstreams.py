@@ -0,0 +1,329 @@
+"""Local stand-ins for the external APIs app.py calls, for offline development
+
+Start it with:
+
+    python fake_upstreams.py --port 8090
+
+and point config.py at it, e.g.
+
+    NASA_APOD_URL = 'http://127.0.0.1:8090/planetary/apod'
+    NASA_IMAGE_SEARCH_URL = 'http://127.0.0.1:8090/search'
+    PIXABAY_API_URL = 'http://127.0.0.1:8090/api/'
+    AZTRO_URL = 'http://127.0.0.1:8090/'
+    GEMINI_MODEL_URL = 'http://127.0.0.1:8090/v1beta/models/gemini-2.0-flash'
+    WEATHER_API_URL = 'http://127.0.0.1:8090/data/2.5/weather'
+    WEATHER_FORECAST_URL = 'http://127.0.0.1:8090/data/2.5/forecast'
+    ASTRONOMY_API_URL = 'http://127.0.0.1:8090/api/v2/bodies/positions'
+    HUGGINGFACE_MODEL_URL = 'http://127.0.0.1:8090/models/stabilityai/stable-diffusion-xl-base-1.0'
+    HUGGINGFACE_WHOAMI_URL = 'http://127.0.0.1:8090/api/whoami-v2'
+
+Latency and injected 503s can be set for all upstreams and per upstream
+(--upstream-latency gemini=1.5 --upstream-error-rate aztro=1).
+benchmarks/load_test.py starts it this way for its runs.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from zoneinfo import ZoneInfo
+
+FAKE_ANSWER = (
+    "Mars is the fourth planet from the Sun. Its distance from Earth changes as both "
+    "planets follow their orbits, from about 55 million kilometres at a close approach "
+    "to roughly 400 million kilometres when the two are on opposite sides of the Sun. "
+    "Light takes between three and twenty-two minutes to cross that gap."
+)
+
+# 1x1 JPEG returned by the image generation fake
+FAKE_IMAGE = base64.b64decode(
+    '/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAAgGBgcGBQgHBwcJCQgKDBQNDAsLDBkSEw8UHRofHh0aHBwgJC4nICIsIxwc'
+    'KDcpLDAxNDQ0Hyc5PTgyPC4zNDL/wAALCAABAAEBAREA/8QAFAABAAAAAAAAAAAAAAAAAAAACf/EABQQAQAAAAAAAAAA'
+    'AAAAAAAAAAD/2gAIAQEAAD8AKp//2Q==')
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, each response
+    # would wait for the client's delayed ACK (about 40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_HEAD(self):
+        self._dispatch('HEAD')
+
+    def _dispatch(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+        url = urlsplit(self.path)
+        path = url.path
+        self.query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        self.server.count(path)
+        # Health checks send HEAD, which only needs to find the endpoint
+        route = next((route for route in ROUTES if (route[1] == method or method == 'HEAD')
+                      and re.fullmatch(route[2], path)), None)
+        upstream = route[0] if route else None
+        latency = self.server.setting('latency', upstream)
+        if latency:
+            time.sleep(latency)
+        error_rate = self.server.setting('error_rate', upstream)
+        if error_rate and random.random() < error_rate:
+            return self.send_json({"error": {"message": "Injected failure"}}, status=503)
+
+        if method == 'HEAD':
+            self.send_response(200 if route else 404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if route is None:
+            return self.send_json({"error": f"No fake for {method} {path}"}, status=404)
+        route[3](self)
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        if self.server.settings['verbose']:
+            super().log_message(format, *args)
+
+
+def nasa_apod(handler):
+    # Dated today in NASA's time zone, so the app caches it until the next publication
+    today = datetime.now(ZoneInfo('America/New_York')).strftime('%Y-%m-%d')
+    handler.send_json({
+        "date": today,
+        "title": "The Horsehead Nebula",
+        "explanation": "A dark cloud of cold gas and dust, silhouetted against the glowing nebula IC 434.",
+        "media_type": "image",
+        "url": "https://apod.nasa.gov/apod/image/horsehead_1024.jpg",
+        "hdurl": "https://apod.nasa.gov/apod/image/horsehead_4096.jpg",
+        "service_version": "v1",
+    })
+
+
+def nasa_image_search(handler):
+    query = handler.query.get('q', '')
+    handler.send_json({"collection": {
+        "version": "1.0",
+        "items": [{
+            "href": f"https://images-assets.nasa.gov/image/{query}-{i}/collection.json",
+            "data": [{"nasa_id": f"{query}-{i}", "title": f"{query.title()} {i}", "media_type": "image",
+                      "description": f"Image {i} of {query}", "center": "GSFC"}],
+            "links": [{"href": f"https://images-assets.nasa.gov/image/{query}-{i}/{query}-{i}~thumb.jpg",
+                       "rel": "preview", "render": "image"}],
+        } for i in range(20)],
+        "metadata": {"total_hits": 20},
+    }})
+
+
+def pixabay_search(handler):
+    query = handler.query.get('q', '')
+    handler.send_json({"total": 20, "totalHits": 20, "hits": [{
+        "id": 1000 + i,
+        "tags": f"{query}, space, astronomy",
+        "previewURL": f"https://cdn.pixabay.com/photo/{query}-{i}_150.jpg",
+        "webformatURL": f"https://pixabay.com/get/{query}-{i}_640.jpg",
+        "largeImageURL": f"https://pixabay.com/get/{query}-{i}_1280.jpg",
+        "user": "fake-user",
+    } for i in range(20)]})
+
+
+def aztro_horoscope(handler):
+    sign = handler.query.get('sign', 'aries')
+    handler.send_json({
+        "date_range": "Mar 21 - Apr 20",
+        "current_date": datetime.now().strftime('%B %d, %Y'),
+        "description": f"A calm day for {sign.title()}; the stars favour patient plans.",
+        "compatibility": "Libra",
+        "mood": "Focused",
+        "color": "Blue",
+        "lucky_number": "7",
+        "lucky_time": "9pm",
+    })
+
+
+def _gemini_candidate(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+def gemini_generate(handler):
+    handler.send_json(_gemini_candidate(FAKE_ANSWER))
+
+
+def gemini_stream(handler):
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'text/event-stream')
+    handler.send_header('Transfer-Encoding', 'chunked')
+    handler.end_headers()
+    # Roughly what Gemini does: a few words per event
+    words = FAKE_ANSWER.split(' ')
+    for i in range(0, len(words), 4):
+        text = ' '.join(words[i:i + 4]) + (' ' if i + 4 < len(words) else '')
+        handler.send_chunk(f"data: {json.dumps(_gemini_candidate(text))}\r\n\r\n".encode('utf-8'))
+        time.sleep(handler.server.settings['chunk_delay'])
+    handler.send_chunk(b'')
+
+
+def gemini_model(handler):
+    handler.send_json({"name": "models/gemini-2.0-flash", "displayName": "Gemini 2.0 Flash",
+                       "supportedGenerationMethods": ["generateContent", "countTokens"]})
+
+
+def huggingface_whoami(handler):
+    handler.send_json({"type": "user", "name": "fake-user", "auth": {"type": "access_token"}})
+
+
+def weather_current(handler):
+    handler.send_json({
+        "weather": [{"main": "Clear", "description": "clear sky"}],
+        "main": {"temp": 12.5, "humidity": 60},
+        "visibility": 10000,
+        "wind": {"speed": 3.1},
+        "clouds": {"all": 5},
+    })
+
+
+def weather_forecast(handler):
+    # Five days of 3-hourly entries with cloud cover drifting between clear and overcast
+    start = int(time.time()) // 10800 * 10800
+    entries = []
+    for i in range(40):
+        clouds = int(50 + 50 * math.sin(i / 5.0))
+        entries.append({
+            "dt": start + i * 10800,
+            "weather": [{"main": "Clouds" if clouds > 20 else "Clear", "description": "scattered clouds"}],
+            "main": {"temp": 10.0 + 4 * math.sin(i / 4.0), "humidity": 70},
+            "visibility": 10000,
+            "wind": {"speed": 2.0 + (i % 4)},
+            "clouds": {"all": clouds},
+        })
+    handler.send_json({"cnt": len(entries), "list": entries, "city": {"timezone": 0}})
+
+
+def astronomy_positions(handler):
+    handler.send_json({"data": {"table": {"rows": [
+        {"entry": {"id": "moon", "name": "Moon"}, "cells": [{
+            "position": {
+                "horizonal": {"altitude": {"degrees": "35.2"}, "azimuth": {"degrees": "120.4"}},
+                "equatorial": {"rightAscension": {"hours": "4.21"}, "declination": {"degrees": "18.7"}},
+            }}]},
+    ]}}})
+
+
+def huggingface_generate(handler):
+    # Stable Diffusion takes a while; simulate it on top of the general latency
+    time.sleep(handler.server.settings['image_delay'])
+    # Decoders ignore bytes after the JPEG end marker, so each prompt gets its own file
+    prompt = json.loads(handler.body or b'{}').get('inputs', '')
+    image = FAKE_IMAGE + hashlib.sha256(prompt.encode('utf-8')).digest()
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'image/jpeg')
+    handler.send_header('Content-Length', str(len(image)))
+    handler.end_headers()
+    handler.wfile.write(image)
+
+
+# (upstream, method, path regex, handler); the upstream names match http_client.UPSTREAM_TIMEOUTS
+ROUTES = [
+    ('nasa', 'GET', r'/planetary/apod', nasa_apod),
+    ('nasa', 'GET', r'/search', nasa_image_search),
+    ('pixabay', 'GET', r'/api/', pixabay_search),
+    ('aztro', 'POST', r'/', aztro_horoscope),
+    ('gemini', 'POST', r'/v1beta/models/[^/:]+:generateContent', gemini_generate),
+    ('gemini', 'POST', r'/v1beta/models/[^/:]+:streamGenerateContent', gemini_stream),
+    ('gemini', 'GET', r'/v1beta/models/[^/:]+', gemini_model),
+    ('huggingface', 'GET', r'/api/whoami-v2', huggingface_whoami),
+    ('weather', 'GET', r'/data/2\.5/weather', weather_current),
+    ('weather', 'GET', r'/data/2\.5/forecast', weather_forecast),
+    ('astronomyapi', 'GET', r'/api/v2/bodies/positions', astronomy_positions),
+    ('huggingface', 'POST', r'/models/.+', huggingface_generate),
+]
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+
+    def __init__(self, host='127.0.0.1', port=8090, latency=0.0, chunk_delay=0.05,
+                 error_rate=0.0, verbose=False, image_delay=0.0, upstream_latency=None, upstream_error_rate=None):
+        super().__init__((host, port), FakeUpstreamHandler)
+        self.settings = {'latency': latency, 'chunk_delay': chunk_delay,
+                         'error_rate': error_rate, 'verbose': verbose, 'image_delay': image_delay}
+        # Per-upstream overrides of latency and error_rate, by upstream name
+        self.overrides = {'latency': dict(upstream_latency or {}), 'error_rate': dict(upstream_error_rate or {})}
+        self.hits = {}
+        self._lock = threading.Lock()
+
+    def setting(self, name, upstream):
+        """latency or error_rate for a request to upstream (None when no fake route matched)"""
+        return self.overrides[name].get(upstream, self.settings[name])
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path):
+        with self._lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    def start(self):
+        """Serve from a background thread (for use from tests and benchmarks)"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def upstream_values(pairs):
+    """{'gemini': 1.5} from ['gemini=1.5']"""
+    values = {}
+    for pair in pairs:
+        name, _, value = pair.partition('=')
+        values[name] = float(value)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds before each response")
+    parser.add_argument('--chunk-delay', type=float, default=0.05, help="seconds between streamed chunks")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--image-delay', type=float, default=0.0, help="extra seconds per image generation")
+    parser.add_argument('--upstream-latency', action='append', default=[], metavar='NAME=SECONDS',
+                        help="latency for one upstream (nasa, pixabay, gemini, weather, astronomyapi, aztro, huggingface)")
+    parser.add_argument('--upstream-error-rate', action='append', default=[], metavar='NAME=FRACTION',
+                        help="error rate for one upstream")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    server = FakeUpstreamServer(args.host, args.port, args.latency, args.chunk_delay,
+                                args.error_rate, args.verbose, args.image_delay,
+                                upstream_values(args.upstream_latency), upstream_values(args.upstream_error_rate))
+    print(f"Fake upstreams listening on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
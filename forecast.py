@@ -0,0 +1,137 @@
+"""Stargazing scores for an OpenWeatherMap forecast series
+
+The 3-hourly forecast is interpolated to hourly steps, each hour is rated
+with the same thresholds as the current-conditions endpoint, and the
+rating is weighted by how dark the sky is (Sun below the horizon) and by
+the Moon (illuminated fraction while it is up), both computed locally.
+"""
+from datetime import datetime, timezone
+
+try:
+    import numpy as np
+except ImportError:  # /api/weather/forecast answers 503 without it
+    np = None
+
+import ephemeris
+
+# Thresholds of the observing-quality rule
+CLEAR_CLOUDS = 20
+FAIR_CLOUDS = 40
+CALM_WIND = 15
+GOOD_VISIBILITY = 8000
+# OpenWeatherMap omits visibility above its 10 km maximum
+DEFAULT_VISIBILITY = 10000
+
+QUALITY_LABELS = ("Poor", "Fair", "Good")
+QUALITY_WEIGHTS = (0.1, 0.6, 1.0)
+# Sun altitudes (degrees) where darkness goes from 0 (civil twilight) to 1 (astronomical night)
+CIVIL_TWILIGHT = -6.0
+ASTRONOMICAL_TWILIGHT = -18.0
+# Share of the score a full Moon above the horizon takes away
+MOON_PENALTY = 0.5
+MIN_WINDOW_SCORE = 0.5
+MAX_WINDOWS = 5
+STEP_SECONDS = 3600
+
+
+def observing_quality(clouds, wind_speed, visibility):
+    """"Good", "Fair" or "Poor" for one set of conditions"""
+    is_calm = wind_speed < CALM_WIND
+    if clouds < CLEAR_CLOUDS and is_calm and visibility > GOOD_VISIBILITY:
+        return "Good"
+    return "Fair" if (clouds < FAIR_CLOUDS and is_calm) else "Poor"
+
+
+def quality_indexes(clouds, wind_speed, visibility):
+    """observing_quality over arrays, as indexes into QUALITY_LABELS"""
+    is_calm = wind_speed < CALM_WIND
+    good = (clouds < CLEAR_CLOUDS) & is_calm & (visibility > GOOD_VISIBILITY)
+    fair = (clouds < FAIR_CLOUDS) & is_calm
+    return np.where(good, 2, np.where(fair, 1, 0))
+
+
+def hourly_series(forecast):
+    """Hourly (times, clouds, wind_speed, visibility) arrays from a /data/2.5/forecast payload"""
+    entries = sorted(forecast.get('list', []), key=lambda entry: entry['dt'])
+    if len(entries) < 2:
+        raise ValueError("Forecast has fewer than two entries")
+    dt = np.array([entry['dt'] for entry in entries], dtype=float)
+    clouds = np.array([entry.get('clouds', {}).get('all', 0) for entry in entries], dtype=float)
+    wind = np.array([entry.get('wind', {}).get('speed', 0) for entry in entries], dtype=float)
+    visibility = np.array([entry.get('visibility', DEFAULT_VISIBILITY) for entry in entries], dtype=float)
+    times = np.arange(dt[0], dt[-1] + 1, STEP_SECONDS)
+    return times, np.interp(times, dt, clouds), np.interp(times, dt, wind), np.interp(times, dt, visibility)
+
+
+def sky_conditions(times, lat, lon):
+    """Sun altitude, Moon altitude and Moon illuminated fraction at unix times"""
+    jd = 2440587.5 + np.asarray(times) / 86400.0
+    positions = ephemeris.body_positions(jd, lat, lon, bodies=('sun', 'moon'))
+    sun, moon = positions['sun'], positions['moon']
+    ra1, dec1 = np.radians(sun['ra'] * 15.0), np.radians(sun['dec'])
+    ra2, dec2 = np.radians(moon['ra'] * 15.0), np.radians(moon['dec'])
+    cos_elongation = np.sin(dec1) * np.sin(dec2) + np.cos(dec1) * np.cos(dec2) * np.cos(ra1 - ra2)
+    return sun['alt'], moon['alt'], (1 - cos_elongation) / 2
+
+
+def score_hours(times, clouds, wind_speed, visibility, lat, lon):
+    """Per-hour arrays: score (0-1), quality index, sun and moon altitude, moon illumination"""
+    quality = quality_indexes(clouds, wind_speed, visibility)
+    sun_alt, moon_alt, illumination = sky_conditions(times, lat, lon)
+    darkness = np.clip((CIVIL_TWILIGHT - sun_alt) / (CIVIL_TWILIGHT - ASTRONOMICAL_TWILIGHT), 0.0, 1.0)
+    moonlight = 1.0 - MOON_PENALTY * illumination * (moon_alt > 0)
+    score = np.asarray(QUALITY_WEIGHTS)[quality] * darkness * moonlight
+    return score, quality, sun_alt, moon_alt, illumination
+
+
+def best_windows(times, score, clouds, illumination, limit=MAX_WINDOWS):
+    """Runs of consecutive hours scoring at least MIN_WINDOW_SCORE, best first
+
+    Windows are ranked by their summed score, so a long good night beats a
+    short excellent gap.
+    """
+    good = np.concatenate([[False], score >= MIN_WINDOW_SCORE, [False]])
+    edges = np.flatnonzero(np.diff(good.astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    totals = np.add.reduceat(score, starts) if len(starts) else np.empty(0)
+    windows = []
+    for i in np.argsort(-totals, kind='stable')[:limit]:
+        start, end = starts[i], ends[i]
+        windows.append({
+            "start": _iso(times[start]),
+            "end": _iso(times[end - 1] + STEP_SECONDS),
+            "hours": int(end - start),
+            "score": round(float(score[start:end].mean()), 3),
+            "cloud_cover_percent": round(float(clouds[start:end].mean()), 1),
+            "moon_illumination": round(float(illumination[start:end].mean()), 3),
+        })
+    return windows
+
+
+def stargazing_forecast(forecast, lat, lon):
+    """Hourly scores and ranked observing windows for an OpenWeatherMap forecast payload"""
+    times, clouds, wind_speed, visibility = hourly_series(forecast)
+    score, quality, sun_alt, moon_alt, illumination = score_hours(times, clouds, wind_speed, visibility, lat, lon)
+    hours = [{
+        "time": _iso(t),
+        "score": round(s, 3),
+        "observing_quality": QUALITY_LABELS[q],
+        "cloud_cover_percent": round(c, 1),
+        "wind_speed": round(w, 1),
+        "visibility": round(v),
+        "sun_altitude": round(sa, 1),
+        "moon_altitude": round(ma, 1),
+        "moon_illumination": round(mi, 3),
+    } for t, s, q, c, w, v, sa, ma, mi in zip(times.tolist(), score.tolist(), quality.tolist(), clouds.tolist(),
+                                              wind_speed.tolist(), visibility.tolist(), sun_alt.tolist(),
+                                              moon_alt.tolist(), illumination.tolist())]
+    return {
+        "location": {"lat": lat, "lon": lon},
+        "timezone_offset": forecast.get('city', {}).get('timezone', 0),
+        "best_windows": best_windows(times, score, clouds, illumination),
+        "hours": hours,
+    }
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cache import TTLCache
+
+# Seconds a health report is served before the checks run again; a report up
+# to STALE_SECONDS older still answers at once while a refresh runs
+HEALTH_TTL = 30
+STALE_SECONDS = 300
+# (connect, read) timeout of one check; the whole run takes at most about this long
+CHECK_TIMEOUT = (2.0, 3.0)
+
+
+def classify(status_code):
+    """Health state for an upstream's HTTP status"""
+    if status_code < 400 or status_code == 405:
+        # 405: the endpoint exists but only takes another method, which is all a HEAD can show
+        return 'ok'
+    if status_code in (401, 403):
+        return 'unauthorized'
+    if status_code == 429:
+        return 'rate_limited'
+    return 'down' if status_code >= 500 else 'error'
+
+
+class HealthMonitor:
+    """Concurrent, cached reachability checks of the upstream APIs
+
+    ``checks`` maps an upstream name to a callable that makes one cheap
+    request (metadata or HEAD, no retries) and returns the response. All
+    checks run at once on a small pool; the aggregated report is cached
+    for ``ttl`` seconds, and concurrent callers share one run. Upstreams
+    named in ``optional`` are checked and reported but don't make the
+    aggregate status degraded.
+    """
+
+    def __init__(self, checks, ttl=HEALTH_TTL, stale_seconds=STALE_SECONDS, clock=time.time, optional=()):
+        self.checks = checks
+        self.optional = frozenset(optional)
+        self.clock = clock
+        self._cache = TTLCache(ttl=ttl, stale_ttl=stale_seconds, clock=clock)
+        self._pool = ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix='health-check')
+
+    def report(self):
+        """{"status": "ok" | "degraded", "checked_at", "checks": {name: result}}"""
+        return self._cache.get('report', self._run)
+
+    def check(self, name):
+        return self.report()['checks'][name]
+
+    def _run(self):
+        started = self.clock()
+        futures = {name: self._pool.submit(self._check, check) for name, check in self.checks.items()}
+        # Each check is bounded by its request timeout; this only guards against a hung one
+        wait(futures.values(), timeout=sum(CHECK_TIMEOUT) + 1)
+        results = {}
+        for name, future in futures.items():
+            if future.done():
+                results[name] = future.result()
+            else:
+                results[name] = {"status": "down", "error": "Check did not finish in time"}
+        return {
+            "status": 'ok' if all(r['status'] == 'ok' for name, r in results.items()
+                                  if name not in self.optional) else 'degraded',
+            "checked_at": started,
+            "checks": results,
+        }
+
+    def _check(self, check):
+        start = time.perf_counter()
+        try:
+            response = check()
+            response.close()
+        except Exception as e:
+            return {"status": "down", "error": str(e),
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+        return {"status": classify(response.status_code), "http_status": response.status_code,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
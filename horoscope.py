@@ -0,0 +1,279 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from cache import TTLCache
+from zodiac import ZODIAC_SIGNS
+
+logger = logging.getLogger(__name__)
+
+SIGNS = tuple(sign.lower() for sign, *_ in ZODIAC_SIGNS)
+DAYS = ('yesterday', 'today', 'tomorrow')
+
+# Seconds before retrying the upstream after a failed fetch
+RETRY_SECONDS = 600
+WARMUP_WORKERS = 4
+
+# Element and traits per sign, for the generated fallback horoscope
+SIGN_DATA = {sign.lower(): {"element": element, "traits": traits}
+             for sign, _, _, element, traits, _, _ in ZODIAC_SIGNS}
+
+COMPATIBLE_SIGNS = {
+    "aries": "Libra",
+    "taurus": "Scorpio",
+    "gemini": "Sagittarius",
+    "cancer": "Capricorn",
+    "leo": "Aquarius",
+    "virgo": "Pisces",
+    "libra": "Aries",
+    "scorpio": "Taurus",
+    "sagittarius": "Gemini",
+    "capricorn": "Cancer",
+    "aquarius": "Leo",
+    "pisces": "Virgo"
+}
+
+# Mapping from Western to Vedic zodiac signs (approximately)
+VEDIC_SIGNS = {
+    "aries": "Pisces",  # or early Aries
+    "taurus": "Aries",
+    "gemini": "Taurus",
+    "cancer": "Gemini",
+    "leo": "Cancer",
+    "virgo": "Leo",
+    "libra": "Virgo",
+    "scorpio": "Libra",
+    "sagittarius": "Scorpio",
+    "capricorn": "Sagittarius",
+    "aquarius": "Capricorn",
+    "pisces": "Aquarius"
+}
+
+# Sanskrit names for Vedic zodiac signs
+SANSKRIT_NAMES = {
+    "Aries": "Mesha",
+    "Taurus": "Vrishabha",
+    "Gemini": "Mithuna",
+    "Cancer": "Karka",
+    "Leo": "Simha",
+    "Virgo": "Kanya",
+    "Libra": "Tula",
+    "Scorpio": "Vrishchika",
+    "Sagittarius": "Dhanu",
+    "Capricorn": "Makara",
+    "Aquarius": "Kumbha",
+    "Pisces": "Meena"
+}
+
+# Nakshatra information (simplified - in real calculations this depends on exact birth time)
+NAKSHATRAS = {
+    "Aries": ["Ashwini", "Bharani", "Krittika"],
+    "Taurus": ["Krittika", "Rohini", "Mrigashira"],
+    "Gemini": ["Mrigashira", "Ardra", "Punarvasu"],
+    "Cancer": ["Punarvasu", "Pushya", "Ashlesha"],
+    "Leo": ["Magha", "Purva Phalguni", "Uttara Phalguni"],
+    "Virgo": ["Uttara Phalguni", "Hasta", "Chitra"],
+    "Libra": ["Chitra", "Swati", "Vishakha"],
+    "Scorpio": ["Vishakha", "Anuradha", "Jyeshtha"],
+    "Sagittarius": ["Mula", "Purva Ashadha", "Uttara Ashadha"],
+    "Capricorn": ["Uttara Ashadha", "Shravana", "Dhanishta"],
+    "Aquarius": ["Dhanishta", "Shatabhisha", "Purva Bhadrapada"],
+    "Pisces": ["Purva Bhadrapada", "Uttara Bhadrapada", "Revati"]
+}
+
+VEDIC_RULING_PLANETS = {
+    "Aries": "Mars",
+    "Taurus": "Venus",
+    "Gemini": "Mercury",
+    "Cancer": "Moon",
+    "Leo": "Sun",
+    "Virgo": "Mercury",
+    "Libra": "Venus",
+    "Scorpio": "Mars (traditionally) / Pluto (modern)",
+    "Sagittarius": "Jupiter",
+    "Capricorn": "Saturn",
+    "Aquarius": "Saturn (traditionally) / Uranus (modern)",
+    "Pisces": "Jupiter (traditionally) / Neptune (modern)"
+}
+
+VEDIC_ELEMENTS = {
+    "Aries": "Fire (Agni)",
+    "Taurus": "Earth (Prithvi)",
+    "Gemini": "Air (Vayu)",
+    "Cancer": "Water (Jala)",
+    "Leo": "Fire (Agni)",
+    "Virgo": "Earth (Prithvi)",
+    "Libra": "Air (Vayu)",
+    "Scorpio": "Water (Jala)",
+    "Sagittarius": "Fire (Agni)",
+    "Capricorn": "Earth (Prithvi)",
+    "Aquarius": "Air (Vayu)",
+    "Pisces": "Water (Jala)"
+}
+
+VEDIC_QUALITIES = {
+    "Aries": "Movable (Chara)",
+    "Taurus": "Fixed (Sthira)",
+    "Gemini": "Dual (Dvisvabhava)",
+    "Cancer": "Movable (Chara)",
+    "Leo": "Fixed (Sthira)",
+    "Virgo": "Dual (Dvisvabhava)",
+    "Libra": "Movable (Chara)",
+    "Scorpio": "Fixed (Sthira)",
+    "Sagittarius": "Dual (Dvisvabhava)",
+    "Capricorn": "Movable (Chara)",
+    "Aquarius": "Fixed (Sthira)",
+    "Pisces": "Dual (Dvisvabhava)"
+}
+
+# Planet of the day, indexed by datetime.weekday()
+WEEKDAY_PLANETS = ("Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn")
+
+# Auspicious direction for each ruling planet
+AUSPICIOUS_DIRECTIONS = {
+    "Sun": "East",
+    "Moon": "Northwest",
+    "Mars": "South",
+    "Mercury": "North",
+    "Jupiter": "Northeast",
+    "Venus": "Southeast",
+    "Saturn": "West"
+}
+
+
+def _build_vedic_info():
+    info = {}
+    for sign in SIGNS:
+        vedic_sign = VEDIC_SIGNS[sign]
+        for weekday, planet in enumerate(WEEKDAY_PLANETS):
+            info[sign, weekday] = {
+                "vedic_sign": vedic_sign,
+                "sanskrit_name": SANSKRIT_NAMES[vedic_sign],
+                "possible_nakshatras": NAKSHATRAS[vedic_sign],
+                "ruling_planet": VEDIC_RULING_PLANETS[vedic_sign],
+                "todays_planet": planet,
+                "auspicious_direction": AUSPICIOUS_DIRECTIONS[planet],
+                "vedic_element": VEDIC_ELEMENTS[vedic_sign],
+                "vedic_quality": VEDIC_QUALITIES[vedic_sign]
+            }
+    return info
+
+
+# (sign, weekday) -> Vedic astrology block; treat as read-only
+VEDIC_INFO = _build_vedic_info()
+
+
+def vedic_astrology_info(sign, weekday):
+    """Vedic astrology block for a Western sign on a given weekday"""
+    return VEDIC_INFO[sign, weekday]
+
+
+def fallback_horoscope(sign, now):
+    """Generated horoscope used when the upstream has nothing for us"""
+    sign_data = SIGN_DATA[sign]
+    return {
+        "description": f"Today is a good day to embrace your {sign_data['element']} element. Focus on your {sign_data['traits'].split(', ')[0].lower()} nature.",
+        "compatibility": COMPATIBLE_SIGNS[sign],
+        "mood": "Reflective",
+        "lucky_number": str(((now.day + ord(sign[0])) % 9) + 1),
+        "lucky_time": f"{(now.hour % 12) + 1}:{now.minute:02d} {('AM' if now.hour < 12 else 'PM')}",
+        "current_date": now.strftime("%B %d, %Y"),
+        "vedic_astrology": vedic_astrology_info(sign, now.weekday())
+    }
+
+
+def seconds_until_midnight(now):
+    next_midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max((next_midnight - now).total_seconds(), 1)
+
+
+class HoroscopeCache:
+    """Horoscope response bodies per (sign, day, local date), refreshed at local midnight
+
+    ``fetch(sign, day)`` returns the upstream horoscope dict, or None when the
+    upstream answered with an error; it may also raise. Successful responses
+    are cached until midnight. When a fetch fails, the last good horoscope for
+    that (sign, day) is served instead (or a generated one if there is none)
+    and the upstream is retried after RETRY_SECONDS.
+    """
+
+    def __init__(self, fetch, clock=datetime.now):
+        self.fetch = fetch
+        self.clock = clock
+        self._cache = TTLCache(clock=lambda: self.clock().timestamp())
+        self._last_good = {}
+        self._date = None
+        self._lock = threading.Lock()
+        self.stats = {'upstream_ok': 0, 'upstream_failed': 0, 'served_last_good': 0, 'served_generated': 0}
+
+    def get(self, sign, day):
+        """Serialized horoscope for sign and day ('yesterday', 'today' or 'tomorrow')"""
+        now = self.clock()
+        self._roll_over(now.date())
+        body, _ = self._cache.get((sign, day, now.date().isoformat()), lambda: self._load(sign, day),
+                                  ttl=self._entry_ttl)
+        return body
+
+    def warm(self):
+        """Fetch every (sign, day) combination for the current date"""
+        with ThreadPoolExecutor(max_workers=WARMUP_WORKERS) as pool:
+            list(pool.map(lambda combo: self.get(*combo), [(s, d) for s in SIGNS for d in DAYS]))
+
+    def start(self):
+        """Warm the cache now and again just after every local midnight, from a daemon thread"""
+        def run():
+            while True:
+                try:
+                    self.warm()
+                except Exception as e:
+                    logger.warning("Horoscope warm-up failed: %s", e)
+                time.sleep(seconds_until_midnight(self.clock()) + 1)
+
+        threading.Thread(target=run, name='horoscope-warmup', daemon=True).start()
+        return self
+
+    def report(self):
+        with self._lock:
+            report = dict(self.stats)
+        report['cache'] = dict(self._cache.stats)
+        return report
+
+    def _entry_ttl(self, value):
+        _, ok = value
+        return seconds_until_midnight(self.clock()) if ok else RETRY_SECONDS
+
+    def _load(self, sign, day):
+        now = self.clock()
+        try:
+            data = self.fetch(sign, day)
+        except Exception as e:
+            logger.warning("Error fetching horoscope for %s (%s): %s", sign, day, e)
+            data = None
+        ok = data is not None
+        with self._lock:
+            if ok:
+                self.stats['upstream_ok'] += 1
+                self._last_good[sign, day] = data
+            else:
+                self.stats['upstream_failed'] += 1
+                data = self._last_good.get((sign, day))
+                self.stats['served_last_good' if data is not None else 'served_generated'] += 1
+        if data is None:
+            payload = fallback_horoscope(sign, now)
+        else:
+            payload = dict(data, vedic_astrology=vedic_astrology_info(sign, now.weekday()))
+        return json.dumps(payload, sort_keys=True).encode('utf-8'), ok
+
+    def _roll_over(self, today):
+        # Drop the previous date's entries once the date changes
+        with self._lock:
+            if self._date == today:
+                return
+            previous, self._date = self._date, today
+        if previous is not None:
+            for sign in SIGNS:
+                for day in DAYS:
+                    self._cache.invalidate((sign, day, previous.isoformat()))
@@ -0,0 +1,336 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+import metrics
+from circuit_breaker import CircuitOpen, breakers as default_breakers
+
+try:
+    import httpx
+except ImportError:  # only needed by the async client used from asgi.py
+    httpx = None
+
+# (connect, read) timeouts in seconds for each upstream we talk to
+UPSTREAM_TIMEOUTS = {
+    'nasa': (3.05, 10),
+    'pixabay': (3.05, 10),
+    'gemini': (3.05, 60),
+    'weather': (3.05, 10),
+    'astronomyapi': (3.05, 15),
+    'aztro': (3.05, 8),
+    'huggingface': (3.05, 120),
+}
+DEFAULT_TIMEOUT = (3.05, 15)
+
+# Keep-alive pool sizing: one pool per host, POOL_MAXSIZE sockets per pool
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+
+# Retry policy (exponential backoff with full jitter)
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Cap on outbound requests in flight across all workers of this process
+MAX_CONCURRENT_REQUESTS = 64
+# The async client holds no thread per request, so it can keep far more in flight
+ASYNC_MAX_CONCURRENT_REQUESTS = 2048
+SLOT_WAIT_TIMEOUT = 5.0
+
+
+class UpstreamBusy(requests.RequestException):
+    """Raised when no outbound request slot frees up in time"""
+
+
+def upstream_failed(status_code):
+    """Whether a response counts against the upstream's circuit breaker"""
+    return status_code >= 500 or status_code == 429
+
+
+def never_sent(exc):
+    """Whether a requests ConnectionError happened before the request reached the upstream
+
+    ConnectionError also covers resets and RemoteDisconnected after the body
+    went out; only connect timeouts and failed new connections are safe to
+    repeat for a POST.
+    """
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    # The adapter wraps the cause in urllib3's MaxRetryError
+    return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
+
+def backoff_delay(attempt):
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+class UpstreamClient:
+    """Pooled, retrying HTTP client shared by every outbound API call
+
+    Every attempt goes through the upstream's circuit breaker: while it is
+    open, requests raise CircuitOpen at once instead of waiting on a dead host.
+    """
+
+    def __init__(self, timeouts=None, max_retries=MAX_RETRIES,
+                 max_concurrent=MAX_CONCURRENT_REQUESTS, breakers=None):
+        self.timeouts = dict(UPSTREAM_TIMEOUTS, **(timeouts or {}))
+        self.max_retries = max_retries
+        self.breakers = default_breakers if breakers is None else breakers
+        self.session = requests.Session()
+        # Retries are handled here so backoff and jitter stay under our control
+        self.adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                                   pool_maxsize=POOL_MAXSIZE, max_retries=0)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._counts = {'requests': 0, 'retries': 0, 'errors': 0, 'busy': 0, 'short_circuited': 0}
+
+    def get(self, upstream, url, **kwargs):
+        return self.request(upstream, 'GET', url, **kwargs)
+
+    def post(self, upstream, url, **kwargs):
+        return self.request(upstream, 'POST', url, **kwargs)
+
+    def request(self, upstream, method, url, retries=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeouts.get(upstream, DEFAULT_TIMEOUT))
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            try:
+                response = self._call(upstream, method, url, **kwargs)
+            except requests.ConnectionError as e:
+                # A POST may have been processed if the connection dropped after
+                # it was sent, so those are only repeated when it never left
+                if attempt >= retries or (method != 'GET' and not never_sent(e)):
+                    self._count('errors')
+                    raise
+            except requests.Timeout:
+                # A read timeout on POST may have been processed upstream, so only
+                # idempotent requests are repeated
+                if attempt >= retries or method != 'GET':
+                    self._count('errors')
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                response.close()
+            attempt += 1
+            self._count('retries')
+            time.sleep(self._backoff(attempt))
+
+    def _call(self, upstream, method, url, **kwargs):
+        # One attempt, guarded by and reported to the upstream's circuit breaker
+        breaker = self.breakers.get(upstream)
+        if not breaker.allow():
+            self._count('short_circuited')
+            metrics.UPSTREAM_REQUESTS.inc(upstream, 'short_circuited')
+            raise CircuitOpen(upstream, breaker.retry_after())
+        start = time.perf_counter()
+        metrics.UPSTREAM_IN_FLIGHT.inc(upstream)
+        try:
+            response = self._send(method, url, **kwargs)
+        except UpstreamBusy:
+            breaker.release()
+            raise
+        except Exception:
+            elapsed = time.perf_counter() - start
+            breaker.record(False, elapsed)
+            metrics.observe_upstream(upstream, elapsed, 'error')
+            raise
+        finally:
+            metrics.UPSTREAM_IN_FLIGHT.dec(upstream)
+        elapsed = time.perf_counter() - start
+        breaker.record(not upstream_failed(response.status_code), elapsed)
+        metrics.observe_upstream(upstream, elapsed, metrics.status_class(response.status_code))
+        return response
+
+    def _send(self, method, url, **kwargs):
+        if not self._slots.acquire(timeout=SLOT_WAIT_TIMEOUT):
+            self._count('busy')
+            raise UpstreamBusy(f"Too many outbound requests in flight for {url}")
+        try:
+            self._count('requests')
+            response = self.session.request(method, url, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        if not kwargs.get('stream'):
+            self._slots.release()
+            return response
+        # A streamed body is still being read, so the slot is held until the response is closed
+        close, released = response.close, []
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self._slots.release()
+        response.close = close_and_release
+        return response
+
+    def _backoff(self, attempt):
+        return backoff_delay(attempt)
+
+    def _count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self):
+        """Request counters plus per-host connection reuse from the urllib3 pools"""
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened = pool.num_connections
+            sent = pool.num_requests
+            hosts[f"{pool.scheme}://{pool.host}"] = {
+                "requests": sent,
+                "connections_opened": opened,
+                "connections_reused": max(sent - opened, 0),
+            }
+        with self._lock:
+            counts = dict(self._counts)
+        counts["connections_reused"] = sum(h["connections_reused"] for h in hosts.values())
+        counts["hosts"] = hosts
+        return counts
+
+
+class AsyncUpstreamClient:
+    """asyncio counterpart of UpstreamClient, backed by httpx
+
+    Same timeouts, retry policy, circuit breakers and concurrency cap, but waiting requests don't
+    hold a thread, so one event loop can keep thousands of upstream calls in
+    flight. The httpx client and semaphore are created on first use so they
+    belong to the event loop that serves requests.
+    """
+
+    def __init__(self, timeouts=None, max_retries=MAX_RETRIES,
+                 max_concurrent=ASYNC_MAX_CONCURRENT_REQUESTS, breakers=None):
+        if httpx is None:
+            raise RuntimeError("AsyncUpstreamClient needs httpx (pip install httpx)")
+        self.timeouts = dict(UPSTREAM_TIMEOUTS, **(timeouts or {}))
+        self.max_retries = max_retries
+        self.max_concurrent = max_concurrent
+        self.breakers = default_breakers if breakers is None else breakers
+        self._client = None
+        self._slots = None
+        self._counts = {'requests': 0, 'retries': 0, 'errors': 0, 'busy': 0, 'short_circuited': 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=self.max_concurrent, max_keepalive_connections=POOL_MAXSIZE))
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._client
+
+    async def get(self, upstream, url, **kwargs):
+        return await self.request(upstream, 'GET', url, **kwargs)
+
+    async def post(self, upstream, url, **kwargs):
+        return await self.request(upstream, 'POST', url, **kwargs)
+
+    async def request(self, upstream, method, url, retries=None, stream=False, **kwargs):
+        """Send a request; with stream=True the caller must ``await response.aclose()``"""
+        connect, read = self.timeouts.get(upstream, DEFAULT_TIMEOUT)
+        timeout = httpx.Timeout(read, connect=connect)
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            try:
+                response = await self._call(upstream, method, url, stream, timeout=timeout, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= retries:
+                    self._counts['errors'] += 1
+                    raise
+            except httpx.TimeoutException:
+                # Same rule as the sync client: only idempotent requests are repeated
+                if attempt >= retries or method != 'GET':
+                    self._counts['errors'] += 1
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                await response.aclose()
+            attempt += 1
+            self._counts['retries'] += 1
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def _call(self, upstream, method, url, stream, **kwargs):
+        breaker = self.breakers.get(upstream)
+        if not breaker.allow():
+            self._counts['short_circuited'] += 1
+            metrics.UPSTREAM_REQUESTS.inc(upstream, 'short_circuited')
+            raise CircuitOpen(upstream, breaker.retry_after())
+        start = time.perf_counter()
+        metrics.UPSTREAM_IN_FLIGHT.inc(upstream)
+        try:
+            response = await self._send(method, url, stream, **kwargs)
+        except (UpstreamBusy, asyncio.CancelledError):
+            # Never reached the upstream, or was abandoned by our side
+            breaker.release()
+            raise
+        except Exception:
+            elapsed = time.perf_counter() - start
+            breaker.record(False, elapsed)
+            metrics.observe_upstream(upstream, elapsed, 'error')
+            raise
+        finally:
+            metrics.UPSTREAM_IN_FLIGHT.dec(upstream)
+        elapsed = time.perf_counter() - start
+        breaker.record(not upstream_failed(response.status_code), elapsed)
+        metrics.observe_upstream(upstream, elapsed, metrics.status_class(response.status_code))
+        return response
+
+    async def _send(self, method, url, stream, **kwargs):
+        client = self.client
+        try:
+            await asyncio.wait_for(self._slots.acquire(), SLOT_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._counts['busy'] += 1
+            raise UpstreamBusy(f"Too many outbound requests in flight for {url}")
+        try:
+            self._counts['requests'] += 1
+            request = client.build_request(method, url, **kwargs)
+            response = await client.send(request, stream=stream)
+        except BaseException:
+            self._slots.release()
+            raise
+        if not stream:
+            self._slots.release()
+            return response
+        # As in the sync client, a streamed response keeps its slot until it is closed
+        aclose, released = response.aclose, []
+        async def aclose_and_release():
+            try:
+                await aclose()
+            finally:
+                if not released:
+                    released.append(True)
+                    self._slots.release()
+        response.aclose = aclose_and_release
+        return response
+
+    def stats(self):
+        return dict(self._counts)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Process-wide client used by app.py
+upstream = UpstreamClient()
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from search_cache import normalize_query
+
+DISK_LIMIT_BYTES = 512 * 1024 * 1024
+
+
+def prompt_key(model, prompt):
+    """Cache key for a prompt on a model; case and spacing of the prompt don't matter"""
+    return hashlib.sha256(f"{model}\n{normalize_query(prompt)}".encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    """Generated images by (model, normalized prompt), evicted least recently used first
+
+    The images themselves are the content-addressed files of an ImageStore;
+    this keeps a SQLite index from prompt key to file name. Several prompts
+    may map to the same file, so the size limit counts each file once and a
+    file is deleted only when its last prompt is evicted. Files pinned by a
+    live image job are never evicted; the cache may run over its limit until
+    they are unpinned.
+    """
+
+    def __init__(self, path, store, model, disk_limit=DISK_LIMIT_BYTES):
+        self.store = store
+        self.model = model
+        self.disk_limit = disk_limit
+        self._lock = threading.Lock()
+        self._pinned = Counter()  # image name -> live jobs pointing at it
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_saved': 0, 'evictions': 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS image_cache (
+            key TEXT PRIMARY KEY,
+            prompt TEXT NOT NULL,
+            image TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_image_cache_accessed ON image_cache(accessed_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_image_cache_image ON image_cache(image)')
+        self._conn.commit()
+        self._disk_bytes = self._stored_bytes()
+
+    def key(self, prompt):
+        return prompt_key(self.model, prompt)
+
+    def get(self, prompt):
+        """Stored image name for prompt, or None"""
+        key = self.key(prompt)
+        with self._lock:
+            row = self._conn.execute('SELECT image, size FROM image_cache WHERE key = ?', (key,)).fetchone()
+            if row is not None and self.store.path(row[0]) is None:
+                # The file went away underneath us; forget the entry
+                self._conn.execute('DELETE FROM image_cache WHERE key = ?', (key,))
+                self._conn.commit()
+                self._disk_bytes = self._stored_bytes()
+                row = None
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute('UPDATE image_cache SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+            self.stats['hits'] += 1
+            self.stats['bytes_saved'] += row[1]
+            return row[0]
+
+    def put(self, prompt, image):
+        """Remember that prompt produced the stored image named image"""
+        path = self.store.path(image)
+        if path is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO image_cache VALUES (?, ?, ?, ?, ?, ?)',
+                               (self.key(prompt), normalize_query(prompt), image, os.path.getsize(path), now, now))
+            self._disk_bytes = self._stored_bytes()
+            self._evict()
+            self._conn.commit()
+
+    def pin(self, image):
+        """Keep the file named image on disk until a matching unpin()"""
+        with self._lock:
+            self._pinned[image] += 1
+
+    def unpin(self, image):
+        with self._lock:
+            self._pinned[image] -= 1
+            if self._pinned[image] <= 0:
+                del self._pinned[image]
+
+    def report(self):
+        with self._lock:
+            report = dict(self.stats, pinned=len(self._pinned))
+            report['entries'] = self._conn.execute('SELECT COUNT(*) FROM image_cache').fetchone()[0]
+            report['disk_bytes'] = self._disk_bytes
+        lookups = report['hits'] + report['misses']
+        report['hit_ratio'] = report['hits'] / lookups if lookups else 0.0
+        return report
+
+    def _stored_bytes(self):
+        # Each file counts once, however many prompts point at it
+        return self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT image, size FROM image_cache)').fetchone()[0]
+
+    def _evict(self):
+        pinned = tuple(self._pinned)
+        while self._disk_bytes > self.disk_limit:
+            row = self._conn.execute(
+                f'SELECT key, image, size FROM image_cache WHERE image NOT IN ({",".join("?" * len(pinned))}) '
+                'ORDER BY accessed_at LIMIT 1', pinned).fetchone()
+            if row is None:
+                break
+            key, image, size = row
+            self._conn.execute('DELETE FROM image_cache WHERE key = ?', (key,))
+            self.stats['evictions'] += 1
+            if self._conn.execute('SELECT 1 FROM image_cache WHERE image = ? LIMIT 1', (image,)).fetchone() is None:
+                self.store.remove(image)
+                self._disk_bytes -= size
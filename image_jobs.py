@@ -0,0 +1,219 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from search_cache import normalize_query
+
+WORKERS = 2
+# Jobs waiting or running at once; further submissions are refused
+MAX_PENDING = 32
+# Seconds a finished job stays queryable (the image file itself is kept)
+JOB_TTL = 3600
+TERMINAL_STATES = ('done', 'failed')
+
+# (magic bytes, extension, MIME type) of the formats the model returns
+IMAGE_FORMATS = (
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'RIFF', 'webp', 'image/webp'),
+)
+IMAGE_NAME = re.compile(r'[0-9a-f]{64}\.(jpg|png|webp)')
+MIME_TYPES = {extension: mime for _, extension, mime in IMAGE_FORMATS}
+
+
+class QueueFull(Exception):
+    """Too many image jobs are already waiting"""
+
+
+def image_format(data):
+    """(extension, MIME type) of image bytes, defaulting to JPEG"""
+    for magic, extension, mime in IMAGE_FORMATS:
+        if data.startswith(magic):
+            return extension, mime
+    return 'jpg', 'image/jpeg'
+
+
+class ImageStore:
+    """Generated images on disk, named by the SHA-256 of their content
+
+    Identical images share one file, and a name never changes meaning, so
+    files can be served with long-lived immutable caching headers.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def put(self, data):
+        """Store image bytes and return the file name"""
+        extension, _ = image_format(data)
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            # Write then rename, so a reader never sees a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return name
+
+    def remove(self, name):
+        path = self.path(name)
+        if path is not None:
+            os.remove(path)
+
+    def path(self, name):
+        """Path of a stored image, or None for a malformed or unknown name"""
+        if not IMAGE_NAME.fullmatch(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+
+class ImageJobQueue:
+    """Image generations run by a bounded worker pool, tracked by job ID
+
+    ``generate(prompt)`` returns image bytes or raises; its exception message
+    (and ``status_code``, if it has one) become the job's error. Each job
+    moves through queued -> running -> done (with the stored image name) or
+    failed. ``version`` counts state changes so pollers can tell when
+    something moved.
+
+    With an ImageCache, a prompt generated before is answered by a job that
+    is done at once (``cached``), and finished images are added to it. A
+    prompt that matches a job still queued or running gets that job back
+    instead of a new one.
+    """
+
+    def __init__(self, generate, store, workers=WORKERS, max_pending=MAX_PENDING, job_ttl=JOB_TTL,
+                 cache=None):
+        self.generate = generate
+        self.store = store
+        self.cache = cache
+        self._key = cache.key if cache is not None else normalize_query
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-job')
+        self._jobs = OrderedDict()
+        # prompt key -> ID of the job generating it
+        self._inflight = {}
+        self._pending = 0
+        self._changed = threading.Condition()
+        self.version = 0
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0,
+                      'joined': 0, 'from_cache': 0}
+
+    def submit(self, prompt):
+        """Queue a generation and return the job; raises QueueFull when max_pending jobs are waiting"""
+        key = self._key(prompt)
+        with self._changed:
+            job = self._join(key)
+            if job is not None:
+                return job
+        cached = self.cache.get(prompt) if self.cache is not None else None
+        if cached is not None:
+            # The job points at the file until it expires, so eviction must leave it alone
+            self.cache.pin(cached)
+            if self.store.path(cached) is None:
+                # Evicted between the lookup and the pin
+                self.cache.unpin(cached)
+                cached = None
+        with self._changed:
+            self._prune()
+            # Someone may have started the same prompt while we looked in the cache
+            job = self._join(key) if cached is None else None
+            if job is not None:
+                return job
+            job = {'id': uuid.uuid4().hex, 'status': 'queued', 'prompt': prompt, 'created_at': time.time(),
+                   'image': None, 'error': None, 'error_status': None, 'cached': False}
+            if cached is not None:
+                job.update(status='done', image=cached, cached=True, finished_at=job['created_at'])
+                self.stats['from_cache'] += 1
+            elif self._pending >= self.max_pending:
+                self.stats['rejected'] += 1
+                raise QueueFull(f"{self._pending} image jobs are already waiting")
+            else:
+                self._inflight[key] = job['id']
+                self._pending += 1
+                self.stats['submitted'] += 1
+            self._jobs[job['id']] = job
+            self._touch()
+        if not job['cached']:
+            self._pool.submit(self._run, job['id'], key, prompt)
+        return dict(job)
+
+    def get(self, job_id):
+        """Snapshot of a job, or None if unknown or expired"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id, since_version, timeout):
+        """Block until anything changes after since_version (or timeout); returns (job, version)"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != since_version, timeout)
+            job = self._jobs.get(job_id)
+            return (dict(job) if job is not None else None), self.version
+
+    def report(self):
+        with self._changed:
+            states = [job['status'] for job in self._jobs.values()]
+            return dict(self.stats, pending=self._pending, queued=states.count('queued'),
+                        running=states.count('running'), tracked=len(states))
+
+    def _join(self, key):
+        # Caller holds the lock
+        job_id = self._inflight.get(key)
+        if job_id is None:
+            return None
+        self.stats['joined'] += 1
+        return dict(self._jobs[job_id])
+
+    def _run(self, job_id, key, prompt):
+        self._update(job_id, key, status='running', started_at=time.time())
+        name = None
+        try:
+            name = self.store.put(self.generate(prompt))
+            if self.cache is not None:
+                # Pinned before put() so its eviction pass can't take the new file
+                self.cache.pin(name)
+                self.cache.put(prompt, name)
+        except Exception as e:
+            if name is not None and self.cache is not None:
+                self.cache.unpin(name)
+            print(f"Error generating image: {str(e)}")
+            self._update(job_id, key, status='failed', error=str(e),
+                         error_status=getattr(e, 'status_code', None), finished_at=time.time())
+        else:
+            self._update(job_id, key, status='done', image=name, finished_at=time.time())
+
+    def _update(self, job_id, key, **fields):
+        with self._changed:
+            job = self._jobs[job_id]
+            job.update(fields)
+            if job['status'] in TERMINAL_STATES:
+                self._pending -= 1
+                del self._inflight[key]
+                self.stats['completed' if job['status'] == 'done' else 'failed'] += 1
+            self._touch()
+
+    def _touch(self):
+        # Caller holds the condition's lock
+        self.version += 1
+        self._changed.notify_all()
+
+    def _prune(self):
+        # Caller holds the lock; only finished jobs expire
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in TERMINAL_STATES and job.get('finished_at', 0) < cutoff]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if job['image'] is not None and self.cache is not None:
+                self.cache.unpin(job['image'])
@@ -0,0 +1,265 @@
+"""Request, upstream and SQLite metrics in the Prometheus text format
+
+Hot paths only bump counters and histogram buckets under a per-metric lock;
+everything that already keeps its own statistics (caches, circuit breakers,
+the image queue) is read by collector functions when /metrics is scraped.
+
+A sampled fraction of requests also collects spans (upstream calls, SQLite
+queries, template rendering) for a ``Server-Timing`` response header.
+"""
+import bisect
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds (seconds) of the histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SQLITE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+# Label of requests that matched no route, so scanners can't grow the label set
+UNMATCHED_ROUTE = '<unmatched>'
+# X-Request-Start older than this is taken to be a clock problem, not queueing
+MAX_QUEUE_SECONDS = 300
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_pairs(names, values):
+    """'a="x",b="y"' with the values escaped"""
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _format_labels(names, values):
+    pairs = _label_pairs(names, values)
+    return '{' + pairs + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}' for key, value in items]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        # Buckets are stored per bound and only made cumulative when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        bounds = [_format_value(bound) for bound in self.buckets + (float('inf'),)]
+        lines = []
+        for key, (counts, total) in items:
+            pairs = _label_pairs(self.labels, key)
+            bucket_prefix = f'{self.name}_bucket{{{pairs},le="' if pairs else f'{self.name}_bucket{{le="'
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{bucket_prefix}{bound}"}} {cumulative}')
+            labels = f'{{{pairs}}}' if pairs else ''
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors, rendered together in the text exposition format
+
+    A collector is a function returning ``(name, kind, help, samples)``
+    tuples, samples being ``(labels dict, value)`` pairs; it runs on every
+    scrape, so values it reports cost nothing between scrapes.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def collector(self, collect):
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += [f'# HELP {metric.name} {metric.help}', f'# TYPE {metric.name} {metric.kind}']
+            lines += metric.render()
+        for collect in self._collectors:
+            for name, kind, help, samples in collect():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f'{name}{_format_labels(labels, labels.values())} {_format_value(value)}'
+                                     if labels else f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+registry = Registry()
+
+HTTP_SECONDS = registry.histogram('http_request_duration_seconds', 'Time spent handling a request', ('method', 'route'))
+HTTP_REQUESTS = registry.counter('http_requests_total', 'Requests handled', ('method', 'route', 'status'))
+HTTP_IN_FLIGHT = registry.gauge('http_requests_in_flight', 'Requests being handled right now')
+HTTP_QUEUE_SECONDS = registry.histogram(
+    'http_request_queue_seconds', 'Time from the front proxy receiving a request (X-Request-Start) to a worker starting it')
+UPSTREAM_SECONDS = registry.histogram('upstream_request_duration_seconds',
+                                      'Time until an upstream answered (headers), per attempt', ('upstream',))
+UPSTREAM_REQUESTS = registry.counter('upstream_requests_total', 'Upstream attempts by outcome', ('upstream', 'outcome'))
+UPSTREAM_IN_FLIGHT = registry.gauge('upstream_requests_in_flight', 'Upstream requests waiting on an answer',
+                                    ('upstream',))
+SQLITE_SECONDS = registry.histogram('sqlite_query_duration_seconds', 'Time spent in SQLite, pool checkout included',
+                                    ('db', 'operation'), buckets=SQLITE_BUCKETS)
+TEMPLATE_SECONDS = registry.histogram('template_render_duration_seconds', 'Time spent rendering a template',
+                                      ('template',))
+CHAT_SCREENED = registry.counter('chat_queries_screened_total',
+                                 'Chat queries by the pre-filter stage that decided them and its verdict',
+                                 ('stage', 'verdict'))
+
+# Spans of the current request when it was sampled for Server-Timing, else None
+_spans = ContextVar('server_timing_spans', default=None)
+
+
+def add_span(name, seconds):
+    """Add to the named Server-Timing span of the current request, if it is sampled"""
+    spans = _spans.get()
+    if spans is not None:
+        total, count = spans.get(name, (0.0, 0))
+        spans[name] = (total + seconds, count + 1)
+
+
+def observe_upstream(upstream, seconds, outcome):
+    """One upstream attempt: outcome is its status class ('2xx', ...) or 'error'"""
+    UPSTREAM_SECONDS.observe(seconds, upstream)
+    UPSTREAM_REQUESTS.inc(upstream, outcome)
+    add_span(f'upstream-{upstream}', seconds)
+
+
+def observe_sqlite(db, operation, seconds):
+    SQLITE_SECONDS.observe(seconds, db, operation)
+    add_span('sqlite', seconds)
+
+
+def observe_template(template, seconds):
+    TEMPLATE_SECONDS.observe(seconds, template)
+    add_span('template', seconds)
+
+
+def status_class(status_code):
+    return f'{status_code // 100}xx'
+
+
+def request_start_time(header):
+    """Unix time from an X-Request-Start header ("t=<seconds|ms|µs>" or a bare number), or None"""
+    try:
+        value = float(header.strip().removeprefix('t='))
+    except (AttributeError, ValueError):
+        return None
+    # nginx sends seconds with a fraction, Heroku milliseconds, some proxies microseconds
+    for scale in (1, 1e3, 1e6):
+        if value / scale < 1e10:
+            return value / scale
+    return None
+
+
+class RequestTimer:
+    """Times one request for the route metrics, and collects its spans when sampled
+
+    Create it when the request starts; call ``server_timing()`` for the
+    header while the response is built and ``finish()`` once it is done.
+    """
+
+    def __init__(self, sample_rate=0.0, request_start=None):
+        self.start = time.perf_counter()
+        self.status = 500
+        self.spans = {} if sample_rate and random.random() < sample_rate else None
+        _spans.set(self.spans)
+        HTTP_IN_FLIGHT.inc()
+        started_at = request_start_time(request_start) if request_start else None
+        if started_at is not None:
+            queued = time.time() - started_at
+            if 0 <= queued < MAX_QUEUE_SECONDS:
+                HTTP_QUEUE_SECONDS.observe(queued)
+                add_span('queue', queued)
+
+    def server_timing(self):
+        """Server-Timing header value for a sampled request, else None"""
+        if self.spans is None:
+            return None
+        parts = [f'{name};dur={total * 1000:.2f};desc="{count}x"' for name, (total, count) in self.spans.items()]
+        parts.append(f'total;dur={(time.perf_counter() - self.start) * 1000:.2f}')
+        return ', '.join(parts)
+
+    def finish(self, method, route):
+        HTTP_IN_FLIGHT.dec()
+        HTTP_SECONDS.observe(time.perf_counter() - self.start, method, route or UNMATCHED_ROUTE)
+        HTTP_REQUESTS.inc(method, route or UNMATCHED_ROUTE, str(self.status))
+        # Worker threads are reused for the next request
+        _spans.set(None)
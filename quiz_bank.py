@@ -0,0 +1,160 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# Seconds between mtime checks of the quiz file
+RELOAD_CHECK_INTERVAL = 1.0
+# No-repeat sessions kept, and how long an idle one lives
+MAX_SESSIONS = 10000
+SESSION_IDLE_SECONDS = 6 * 3600
+
+
+class QuizIndex:
+    """One parsed version of the quiz file
+
+    Each question is kept only as its serialized JSON bytes, ready to send;
+    ids, categories and difficulties are indexed into compact arrays of
+    positions so lookups and sampling never touch the question text.
+    """
+
+    def __init__(self, questions, version):
+        self.version = version
+        self.bodies = [json.dumps(q, separators=(',', ':')).encode('utf-8') for q in questions]
+        # Non-numeric "id" fields; a numeric ?id= always means a position
+        self.ids = {}
+        self.pools = {}
+        for position, question in enumerate(questions):
+            if 'id' in question:
+                self.ids.setdefault(str(question['id']), position)
+            category = str(question.get('category', '')).lower()
+            difficulty = str(question.get('difficulty', '')).lower()
+            for key in ((None, None), (category, None), (None, difficulty), (category, difficulty)):
+                self.pools.setdefault(key, array('I')).append(position)
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def pool(self, category=None, difficulty=None):
+        """Positions of the questions matching the filters (empty if none)"""
+        key = (category.lower() if category else None, difficulty.lower() if difficulty else None)
+        return self.pools.get(key, ())
+
+
+def load_questions(path):
+    """Questions from a JSON array file, or one object per line if the file ends in .jsonl"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+class QuizBank:
+    """Quiz questions parsed once and re-parsed only when the file changes on disk"""
+
+    def __init__(self, path, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._index = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'loads': 0}
+
+    def current(self):
+        """The QuizIndex for the file as it is now, reloading it if its mtime moved"""
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            if self._index is None or now - self._checked_at >= self.check_interval:
+                stat = os.stat(self.path)
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                if stamp != self._stamp:
+                    self._index = QuizIndex(load_questions(self.path), version=self.stats['loads'] + 1)
+                    self._stamp = stamp
+                    self.stats['loads'] += 1
+                self._checked_at = now
+            return self._index
+
+    def get(self, question_id):
+        """Serialized question for a ?id= value, or None
+
+        An integer is the question's position in the bank (modulo its size),
+        as it always was; anything else is looked up among the questions' own
+        "id" fields.
+        """
+        index = self.current()
+        if not len(index):
+            return None
+        try:
+            return index.bodies[int(question_id) % len(index)]
+        except (TypeError, ValueError):
+            position = index.ids.get(str(question_id))
+            return index.bodies[position] if position is not None else None
+
+    def sample(self, category=None, difficulty=None, rng=random):
+        """Serialized random question matching the filters, or None if nothing matches"""
+        index = self.current()
+        pool = index.pool(category, difficulty)
+        return index.bodies[pool[rng.randrange(len(pool))]] if pool else None
+
+
+class NoRepeatSampler:
+    """Per-session question sampling that doesn't repeat until the pool is used up
+
+    Each session walks a random permutation of its pool: position k maps to
+    (a * k + b) mod n with a coprime to n, so the state is four integers
+    whatever the size of the bank. When the pool is exhausted, or the filters
+    or the quiz file change, the session starts a fresh permutation.
+    """
+
+    def __init__(self, bank, max_sessions=MAX_SESSIONS, idle_seconds=SESSION_IDLE_SECONDS):
+        self.bank = bank
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions = OrderedDict()  # session id -> [pool key, a, b, k, last used]
+        self._lock = threading.Lock()
+
+    def next(self, session_id, category=None, difficulty=None, rng=random):
+        """Serialized next question for the session, or None if nothing matches"""
+        index = self.bank.current()
+        pool = index.pool(category, difficulty)
+        n = len(pool)
+        if not n:
+            return None
+        pool_key = (index.version, (category or '').lower(), (difficulty or '').lower())
+        now = time.monotonic()
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+            if state is None or state[0] != pool_key or state[3] >= n:
+                state = [pool_key, self._stride(n, rng), rng.randrange(n), 0, now]
+            _, a, b, k, _ = state
+            state[3] = k + 1
+            state[4] = now
+            self._sessions[session_id] = state
+            self._evict(now)
+        return index.bodies[pool[(a * k + b) % n]]
+
+    @staticmethod
+    def _stride(n, rng):
+        if n <= 2:
+            return 1
+        while True:
+            a = rng.randrange(1, n)
+            if math.gcd(a, n) == 1:
+                return a
+
+    def _evict(self, now):
+        while self._sessions:
+            session_id, state = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - state[4] < self.idle_seconds:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Seconds a cached search result stays valid, per provider
+PROVIDER_TTLS = {
+    'nasa': 24 * 3600,
+    'pixabay': 24 * 3600,
+}
+DEFAULT_TTL = 3600
+
+MEMORY_LIMIT_BYTES = 16 * 1024 * 1024
+DISK_LIMIT_BYTES = 256 * 1024 * 1024
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so "Mars ", "mars" and "MARS" share an entry"""
+    return ' '.join(str(query).lower().split())
+
+
+def make_key(provider, params):
+    parts = [f"{name}={normalize_query(value)}" for name, value in sorted(params.items())]
+    return provider + '?' + '&'.join(parts)
+
+
+class SearchCache:
+    """Two-tier cache of raw upstream search responses
+
+    Entries live in an LRU memory tier bounded by total body size, backed by a
+    SQLite file that survives restarts and is bounded the same way. Bodies are
+    stored as the upstream's JSON bytes so hits are served without re-encoding.
+
+    The memory tier has its own lock, so memory hits never wait on SQLite, and
+    concurrent lookups of a key that isn't in memory share one disk read or
+    upstream load (single-flight, as in cache.TTLCache).
+    """
+
+    def __init__(self, path, memory_limit=MEMORY_LIMIT_BYTES, disk_limit=DISK_LIMIT_BYTES,
+                 ttls=None):
+        self.path = path
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.ttls = dict(PROVIDER_TTLS, **(ttls or {}))
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # Serializes use of the shared SQLite connection; never held with _lock
+        self._db_lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'joined': 0,
+                      'memory_evictions': 0, 'disk_evictions': 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS search_cache (
+            key TEXT PRIMARY KEY,
+            provider TEXT NOT NULL,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache(accessed_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_search_cache_expires ON search_cache(expires_at)')
+        self._conn.commit()
+        self._disk_bytes = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM search_cache').fetchone()[0]
+
+    def get(self, provider, params, loader):
+        """Return cached body bytes for (provider, params), calling loader() on a miss
+
+        loader returns the response body as bytes, or None if it should not be cached.
+        """
+        key = make_key(provider, params)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                body, expires_at = entry
+                if time.time() < expires_at:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return body
+                self._drop_memory(key)
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats['joined'] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            body = self._load(provider, key, loader)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+        future.set_result(body)
+        return body
+
+    def put(self, provider, key, body):
+        now = time.time()
+        expires_at = now + self.ttls.get(provider, DEFAULT_TTL)
+        with self._lock:
+            self._put_memory(key, body, expires_at)
+        with self._db_lock:
+            old = self._conn.execute('SELECT size FROM search_cache WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?, ?)',
+                (key, provider, body, len(body), expires_at, now))
+            self._disk_bytes += len(body) - (old[0] if old else 0)
+            evicted = self._evict_disk(now)
+            self._conn.commit()
+        if evicted:
+            with self._lock:
+                self.stats['disk_evictions'] += evicted
+
+    def report(self):
+        with self._lock:
+            report = dict(self.stats)
+            report['memory_entries'] = len(self._memory)
+            report['memory_bytes'] = self._memory_bytes
+        report['disk_bytes'] = self._disk_bytes
+        lookups = report['memory_hits'] + report['disk_hits'] + report['misses']
+        report['hit_ratio'] = (report['memory_hits'] + report['disk_hits']) / lookups if lookups else 0.0
+        return report
+
+    def _load(self, provider, key, loader):
+        # The one lookup in flight for key: disk tier first, then the upstream
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute(
+                'SELECT body, expires_at FROM search_cache WHERE key = ?', (key,)).fetchone()
+            if row is not None and now < row[1]:
+                self._conn.execute('UPDATE search_cache SET accessed_at = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+        if row is not None and now < row[1]:
+            body = bytes(row[0])
+            with self._lock:
+                self._put_memory(key, body, row[1])
+                self.stats['disk_hits'] += 1
+            return body
+        with self._lock:
+            self.stats['misses'] += 1
+
+        body = loader()
+        if body is not None:
+            self.put(provider, key, body)
+        return body
+
+    def _put_memory(self, key, body, expires_at):
+        if len(body) > self.memory_limit:
+            return
+        self._drop_memory(key)
+        self._memory[key] = (body, expires_at)
+        self._memory_bytes += len(body)
+        while self._memory_bytes > self.memory_limit:
+            _, (old_body, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_body)
+            self.stats['memory_evictions'] += 1
+
+    def _drop_memory(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0])
+
+    def _evict_disk(self, now):
+        # Caller holds _db_lock. Expired rows go first, then least recently used
+        # until under the limit; returns how many rows were deleted
+        cursor = self._conn.execute('DELETE FROM search_cache WHERE expires_at <= ?', (now,))
+        evicted = max(cursor.rowcount, 0)
+        if evicted:
+            self._disk_bytes = self._conn.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM search_cache').fetchone()[0]
+        while self._disk_bytes > self.disk_limit:
+            row = self._conn.execute(
+                'SELECT key, size FROM search_cache ORDER BY accessed_at LIMIT 1').fetchone()
+            if row is None:
+                break
+            self._conn.execute('DELETE FROM search_cache WHERE key = ?', (row[0],))
+            self._disk_bytes -= row[1]
+            evicted += 1
+        return evicted
@@ -0,0 +1,54 @@
+import json
+
+
+def format_sse(data, event=None):
+    """Encode one Server-Sent Events message with a JSON data field"""
+    message = f"event: {event}\n" if event else ''
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+class _SSEDataParser:
+    """Collects data lines and returns the decoded JSON when an event ends"""
+
+    def __init__(self):
+        self.data_lines = []
+
+    def feed(self, line):
+        if line:
+            if line.startswith('data:'):
+                self.data_lines.append(line[5:].lstrip())
+            return None
+        # A blank line ends the event
+        return self.flush()
+
+    def flush(self):
+        if not self.data_lines:
+            return None
+        data = json.loads('\n'.join(self.data_lines))
+        self.data_lines = []
+        return data
+
+
+def iter_sse_data(response):
+    """Yield the decoded JSON data of each event in a streamed SSE requests response"""
+    parser = _SSEDataParser()
+    # SSE is always UTF-8, whatever charset the response headers claim
+    for line in response.iter_lines():
+        data = parser.feed(line.decode('utf-8'))
+        if data is not None:
+            yield data
+    data = parser.flush()
+    if data is not None:
+        yield data
+
+
+async def aiter_sse_data(response):
+    """Async counterpart of iter_sse_data for a streamed httpx response"""
+    parser = _SSEDataParser()
+    async for line in response.aiter_lines():
+        data = parser.feed(line)
+        if data is not None:
+            yield data
+    data = parser.flush()
+    if data is not None:
+        yield data
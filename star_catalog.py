@@ -0,0 +1,297 @@
+"""Bright-star catalog and sky index for the star map
+
+The catalog is a NumPy structured array saved as ``static/data/bright_stars.npy``
+in index order and memory-mapped at startup. Build it from the Yale Bright
+Star Catalogue (BSC5, VizieR V/50 ``catalog`` file) with:
+
+    python star_catalog.py path/to/catalog
+
+Without the file the brightest hundred or so stars built into this module
+are used, so the star map still has its familiar constellations.
+"""
+import argparse
+import math
+import os
+
+try:
+    import numpy as np
+except ImportError:  # the star field needs NumPy; app.py leaves it out without it
+    np = None
+
+import ephemeris
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'data', 'bright_stars.npy')
+
+# Side of an index cell in degrees (about 1650 cells over the sky)
+CELL_DEG = 5.0
+# Magnitude steps of the per-cell cumulative count table
+MAG_MIN, MAG_MAX, MAG_STEP = -2.0, 9.0, 0.1
+DEFAULT_MAG_LIMIT = 4.5
+
+STAR_DTYPE = [('hr', '<i2'), ('name', 'S16'), ('ra', '<f4'), ('dec', '<f4'), ('mag', '<f4'), ('bv', '<f4')]
+
+# name, RA (J2000, h m s), Dec (J2000, d m s), V magnitude
+BUILTIN_STARS = (
+    ("Sirius", "06 45 08.9", "-16 42 58", -1.46), ("Canopus", "06 23 57.1", "-52 41 45", -0.74),
+    ("Arcturus", "14 15 39.7", "+19 10 57", -0.05), ("Vega", "18 36 56.3", "+38 47 01", 0.03),
+    ("Capella", "05 16 41.4", "+45 59 53", 0.08), ("Rigel", "05 14 32.3", "-08 12 06", 0.13),
+    ("Procyon", "07 39 18.1", "+05 13 30", 0.34), ("Betelgeuse", "05 55 10.3", "+07 24 25", 0.42),
+    ("Achernar", "01 37 42.8", "-57 14 12", 0.46), ("Hadar", "14 03 49.4", "-60 22 23", 0.61),
+    ("Altair", "19 50 47.0", "+08 52 06", 0.76), ("Acrux", "12 26 35.9", "-63 05 57", 0.76),
+    ("Aldebaran", "04 35 55.2", "+16 30 33", 0.86), ("Antares", "16 29 24.4", "-26 25 55", 0.96),
+    ("Spica", "13 25 11.6", "-11 09 41", 0.97), ("Pollux", "07 45 18.9", "+28 01 34", 1.14),
+    ("Fomalhaut", "22 57 39.0", "-29 37 20", 1.16), ("Deneb", "20 41 25.9", "+45 16 49", 1.25),
+    ("Mimosa", "12 47 43.3", "-59 41 19", 1.25), ("Regulus", "10 08 22.3", "+11 58 02", 1.35),
+    ("Adhara", "06 58 37.5", "-28 58 20", 1.50), ("Castor", "07 34 36.0", "+31 53 18", 1.58),
+    ("Shaula", "17 33 36.5", "-37 06 14", 1.62), ("Gacrux", "12 31 09.9", "-57 06 48", 1.63),
+    ("Bellatrix", "05 25 07.9", "+06 20 59", 1.64), ("Elnath", "05 26 17.5", "+28 36 27", 1.65),
+    ("Miaplacidus", "09 13 12.0", "-69 43 02", 1.67), ("Alnilam", "05 36 12.8", "-01 12 07", 1.69),
+    ("Alnair", "22 08 14.0", "-46 57 40", 1.74), ("Alnitak", "05 40 45.5", "-01 56 34", 1.77),
+    ("Alioth", "12 54 01.7", "+55 57 35", 1.77), ("Dubhe", "11 03 43.7", "+61 45 03", 1.79),
+    ("Mirfak", "03 24 19.4", "+49 51 40", 1.79), ("Wezen", "07 08 23.5", "-26 23 36", 1.84),
+    ("Kaus Australis", "18 24 10.3", "-34 23 05", 1.85), ("Sargas", "17 37 19.1", "-42 59 52", 1.86),
+    ("Avior", "08 22 30.8", "-59 30 34", 1.86), ("Alkaid", "13 47 32.4", "+49 18 48", 1.86),
+    ("Menkalinan", "05 59 31.7", "+44 56 51", 1.90), ("Atria", "16 48 39.9", "-69 01 40", 1.91),
+    ("Alhena", "06 37 42.7", "+16 23 57", 1.92), ("Peacock", "20 25 38.9", "-56 44 06", 1.94),
+    ("Alsephina", "08 44 42.2", "-54 42 32", 1.96), ("Mirzam", "06 22 42.0", "-17 57 21", 1.98),
+    ("Alphard", "09 27 35.2", "-08 39 31", 1.98), ("Polaris", "02 31 49.1", "+89 15 51", 1.98),
+    ("Hamal", "02 07 10.4", "+23 27 45", 2.00), ("Diphda", "00 43 35.4", "-17 59 12", 2.04),
+    ("Nunki", "18 55 15.9", "-26 17 48", 2.05), ("Mirach", "01 09 43.9", "+35 37 14", 2.05),
+    ("Menkent", "14 06 40.9", "-36 22 12", 2.06), ("Alpheratz", "00 08 23.3", "+29 05 26", 2.06),
+    ("Tiaki", "22 42 40.1", "-46 53 04", 2.07), ("Kochab", "14 50 42.3", "+74 09 20", 2.08),
+    ("Rasalhague", "17 34 56.1", "+12 33 36", 2.08), ("Saiph", "05 47 45.4", "-09 40 11", 2.09),
+    ("Algol", "03 08 10.1", "+40 57 20", 2.09), ("Almach", "02 03 54.0", "+42 19 47", 2.10),
+    ("Denebola", "11 49 03.6", "+14 34 19", 2.11), ("Naos", "08 03 35.0", "-40 00 12", 2.21),
+    ("Suhail", "09 07 59.8", "-43 25 57", 2.21), ("Aspidiske", "09 17 05.4", "-59 16 31", 2.21),
+    ("Alphecca", "15 34 41.3", "+26 42 53", 2.22), ("Mizar", "13 23 55.5", "+54 55 31", 2.23),
+    ("Sadr", "20 22 13.7", "+40 15 24", 2.23), ("Mintaka", "05 32 00.4", "-00 17 57", 2.23),
+    ("Schedar", "00 40 30.4", "+56 32 14", 2.24), ("Eltanin", "17 56 36.4", "+51 29 20", 2.24),
+    ("Caph", "00 09 10.7", "+59 08 59", 2.28), ("Dschubba", "16 00 20.0", "-22 37 18", 2.32),
+    ("Merak", "11 01 50.5", "+56 22 57", 2.37), ("Izar", "14 44 59.2", "+27 04 27", 2.37),
+    ("Enif", "21 44 11.2", "+09 52 30", 2.39), ("Ankaa", "00 26 17.0", "-42 18 22", 2.40),
+    ("Phecda", "11 53 49.8", "+53 41 41", 2.44), ("Scheat", "23 03 46.5", "+28 04 58", 2.42),
+    ("Sabik", "17 10 22.7", "-15 43 29", 2.43), ("Aludra", "07 24 05.7", "-29 18 11", 2.45),
+    ("Alderamin", "21 18 34.8", "+62 35 08", 2.45), ("Navi", "00 56 42.5", "+60 43 00", 2.47),
+    ("Markab", "23 04 45.7", "+15 12 19", 2.48), ("Menkar", "03 02 16.8", "+04 05 23", 2.53),
+    ("Arneb", "05 32 43.8", "-17 49 20", 2.58), ("Gienah", "12 15 48.4", "-17 32 31", 2.59),
+    ("Unukalhai", "15 44 16.1", "+06 25 32", 2.63), ("Sheratan", "01 54 38.4", "+20 48 29", 2.64),
+    ("Phact", "05 39 38.9", "-34 04 27", 2.65), ("Ruchbah", "01 25 49.0", "+60 14 07", 2.68),
+    ("Muphrid", "13 54 41.1", "+18 23 52", 2.68), ("Tarazed", "19 46 15.6", "+10 36 48", 2.72),
+    ("Zubenelgenubi", "14 50 52.7", "-16 02 30", 2.75), ("Algenib", "00 13 14.2", "+15 11 01", 2.83),
+    ("Vindemiatrix", "13 02 10.6", "+10 57 33", 2.83), ("Alcyone", "03 47 29.1", "+24 06 18", 2.87),
+    ("Cor Caroli", "12 56 01.7", "+38 19 06", 2.89), ("Albireo", "19 30 43.3", "+27 57 35", 3.08),
+    ("Megrez", "12 15 25.6", "+57 01 57", 3.31),
+)
+
+
+def _sexagesimal(text):
+    sign = -1.0 if text.strip().startswith('-') else 1.0
+    a, b, c = (abs(float(part)) for part in text.split())
+    return sign * (a + b / 60.0 + c / 3600.0)
+
+
+def builtin_catalog():
+    stars = np.zeros(len(BUILTIN_STARS), dtype=STAR_DTYPE)
+    for i, (name, ra, dec, mag) in enumerate(BUILTIN_STARS):
+        stars[i] = (0, name.encode('ascii'), _sexagesimal(ra) * 15.0, _sexagesimal(dec), mag, np.nan)
+    return stars
+
+
+def read_bsc5(path):
+    """Stars from the fixed-width BSC5 ``catalog`` file (entries without a position are skipped)"""
+    rows = []
+    with open(path, 'r', encoding='ascii', errors='replace') as f:
+        for line in f:
+            if len(line) < 107 or not line[75:77].strip() or not line[102:107].strip():
+                continue
+            ra = (int(line[75:77]) + int(line[77:79]) / 60.0 + float(line[79:83]) / 3600.0) * 15.0
+            dec = int(line[84:86]) + int(line[86:88]) / 60.0 + int(line[88:90]) / 3600.0
+            if line[83] == '-':
+                dec = -dec
+            bv = float(line[109:114]) if line[109:114].strip() else np.nan
+            rows.append((int(line[0:4]), line[4:14].strip().encode('ascii'), ra, dec,
+                         float(line[102:107]), bv))
+    return np.array(rows, dtype=STAR_DTYPE)
+
+
+def unit_vectors(ra_deg, dec_deg):
+    ra, dec = np.radians(ra_deg), np.radians(dec_deg)
+    return np.stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1)
+
+
+def _angular_separation(ra1, dec1, ra2, dec2):
+    """Degrees between points given in degrees (haversine, stable for small angles)"""
+    ra1, dec1, ra2, dec2 = map(np.radians, (ra1, dec1, ra2, dec2))
+    h = np.sin((dec2 - dec1) / 2) ** 2 + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0))))
+
+
+def _sky_bands():
+    """Declination bands of the index: their count, cells per band and first cell of each"""
+    bands = int(round(180.0 / CELL_DEG))
+    band_mid = -90.0 + (np.arange(bands) + 0.5) * CELL_DEG
+    cells_in_band = np.maximum(1, np.round(360.0 * np.cos(np.radians(band_mid)) / CELL_DEG)).astype(int)
+    band_offset = np.concatenate([[0], np.cumsum(cells_in_band)])
+    return bands, cells_in_band, band_offset
+
+
+def star_cells(stars):
+    """Index cell of each star"""
+    bands, cells_in_band, band_offset = _sky_bands()
+    band = np.clip(((stars['dec'] + 90.0) / CELL_DEG).astype(int), 0, bands - 1)
+    ra_cell = np.minimum((stars['ra'] % 360.0 / 360.0 * cells_in_band[band]).astype(int), cells_in_band[band] - 1)
+    return band_offset[band] + ra_cell
+
+
+def sort_by_cell(stars):
+    """Stars in the order StarCatalog keeps them: by sky cell, then magnitude"""
+    return stars[np.lexsort((stars['mag'], star_cells(stars)))]
+
+
+class StarCatalog:
+    """Stars ordered by sky cell, then magnitude, with an index for cap queries
+
+    The sky is cut into declination bands CELL_DEG high, each split into
+    roughly square cells. For every cell we keep the start of its stars and
+    a cumulative count by magnitude step, so a query only gathers the stars
+    of cells that can overlap the requested cap, and within those only the
+    ones bright enough. Exact distance checks run on that subset alone.
+
+    Stars already in that order (a catalog file written by main) are used
+    in place, so a memory-mapped file stays on disk; others are sorted into
+    a copy.
+    """
+
+    def __init__(self, stars):
+        bands, cells_in_band, band_offset = _sky_bands()
+        band_low = -90.0 + np.arange(bands) * CELL_DEG
+        n_cells = int(band_offset[-1])
+        cell = star_cells(stars)
+        mag = stars['mag']
+        in_order = np.all((cell[1:] > cell[:-1]) | ((cell[1:] == cell[:-1]) & (mag[1:] >= mag[:-1])))
+        if not in_order:
+            order = np.lexsort((mag, cell))
+            stars, cell = stars[order], cell[order]
+        self.stars = stars
+        self.names = self.stars['name'].astype('U16').astype(object)
+        self.vectors = unit_vectors(self.stars['ra'].astype(float), self.stars['dec'].astype(float))
+        self.cell_start = np.searchsorted(cell, np.arange(n_cells + 1))
+
+        # Cumulative count of stars per cell at or below each magnitude step
+        steps = np.arange(MAG_MIN, MAG_MAX + MAG_STEP / 2, MAG_STEP)
+        step_of_star = np.clip(np.ceil((self.stars['mag'] - MAG_MIN) / MAG_STEP - 1e-6).astype(int), 0, len(steps) - 1)
+        counts = np.zeros((n_cells, len(steps)), dtype=np.int32)
+        np.add.at(counts, (cell, step_of_star), 1)
+        self.mag_counts = np.cumsum(counts, axis=1)
+
+        # Cell centres and the radius of a cap that surely contains each cell
+        cell_band = np.repeat(np.arange(bands), cells_in_band)
+        index_in_band = np.arange(n_cells) - band_offset[cell_band]
+        width = 360.0 / cells_in_band[cell_band]
+        ra0, ra1 = index_in_band * width, (index_in_band + 1) * width
+        dec0, dec1 = band_low[cell_band], band_low[cell_band] + CELL_DEG
+        self.cell_ra, self.cell_dec = (ra0 + ra1) / 2, (dec0 + dec1) / 2
+        corners = [_angular_separation(self.cell_ra, self.cell_dec, r, d)
+                   for r in (ra0, ra1, self.cell_ra) for d in (dec0, dec1)]
+        self.cell_radius = np.max(corners, axis=0)
+        self.cell_vectors = unit_vectors(self.cell_ra, self.cell_dec)
+
+    def __len__(self):
+        return len(self.stars)
+
+    def cap(self, ra, dec, radius, mag_limit=None):
+        """Indexes of stars within radius degrees of (ra, dec) and no fainter than mag_limit"""
+        center = unit_vectors(ra, dec)
+        cell_distance = np.degrees(np.arccos(np.clip(self.cell_vectors @ center, -1.0, 1.0)))
+        cells = np.flatnonzero(cell_distance <= radius + self.cell_radius)
+        starts = self.cell_start[cells]
+        if mag_limit is None:
+            ends = self.cell_start[cells + 1]
+        else:
+            step = int(math.ceil((mag_limit - MAG_MIN) / MAG_STEP - 1e-6))
+            if step < 0:
+                return np.empty(0, dtype=np.intp)
+            ends = starts + self.mag_counts[cells, min(step, self.mag_counts.shape[1] - 1)]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.intp)
+        # Concatenate the ranges [start, end) of every candidate cell
+        candidates = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        keep = self.vectors[candidates] @ center >= math.cos(math.radians(min(radius, 180.0)))
+        if mag_limit is not None:
+            keep &= self.stars['mag'][candidates] <= mag_limit
+        return candidates[keep]
+
+    def visible(self, jd_ut, lat, lon, mag_limit=DEFAULT_MAG_LIMIT, center_alt=90.0, center_az=0.0, fov=None):
+        """Stars above the horizon (and inside the field of view, if given) with their positions
+
+        fov is the full angular diameter in degrees around (center_alt, center_az).
+        Returns a dict of column arrays.
+        """
+        lst = ephemeris.sidereal_time(jd_ut) + lon
+        # Star positions are J2000; the sky is precessed to date, so the query
+        # centre is taken back to J2000 with the inverse rotation
+        ra_c, dec_c = _horizontal_to_equatorial(center_alt, center_az, lat, lst)
+        ra_c, dec_c = _precess_to_j2000(ra_c, dec_c, jd_ut)
+        radius = 90.0 if fov is None else fov / 2.0
+        idx = self.cap(ra_c, dec_c, radius, mag_limit)
+        stars = self.stars[idx]
+        vec = ephemeris.precess_from_j2000(self.vectors[idx].T, jd_ut)
+        ra = np.degrees(np.arctan2(vec[1], vec[0])) % 360.0
+        dec = np.degrees(np.arcsin(np.clip(vec[2], -1.0, 1.0)))
+        alt, az = ephemeris.horizontal(ra / 15.0, dec, jd_ut, lat, lon)
+        up = alt >= 0.0
+        return {
+            'name': self.names[idx[up]].tolist(),
+            'ra': ra[up] / 15.0, 'dec': dec[up], 'mag': stars['mag'][up].astype(float),
+            'bv': stars['bv'][up].astype(float), 'alt': alt[up], 'az': az[up],
+        }
+
+
+def _horizontal_to_equatorial(alt, az, lat, lst):
+    """(RA, Dec) in degrees of date for a direction (alt, az) seen from latitude lat at local sidereal time lst"""
+    alt, az, phi = math.radians(alt), math.radians(az), math.radians(lat)
+    sin_dec = math.sin(alt) * math.sin(phi) + math.cos(alt) * math.cos(phi) * math.cos(az)
+    dec = math.asin(max(-1.0, min(1.0, sin_dec)))
+    hour_angle = math.atan2(-math.sin(az) * math.cos(alt),
+                            math.sin(alt) * math.cos(phi) - math.cos(alt) * math.sin(phi) * math.cos(az))
+    return (lst - math.degrees(hour_angle)) % 360.0, math.degrees(dec)
+
+
+def _precess_to_j2000(ra, dec, jd_ut):
+    # The precession matrix is a rotation, so its transpose undoes it
+    x, y, z = unit_vectors(ra, dec)
+    basis = ephemeris.precess_from_j2000(np.eye(3), jd_ut)
+    back = basis.T @ np.array([x, y, z])
+    return math.degrees(math.atan2(back[1], back[0])) % 360.0, math.degrees(math.asin(max(-1.0, min(1.0, back[2]))))
+
+
+def load_catalog(path=CATALOG_PATH):
+    """Memory-mapped catalog file if there is one, else the built-in bright stars"""
+    if os.path.exists(path):
+        return StarCatalog(np.load(path, mmap_mode='r'))
+    return StarCatalog(builtin_catalog())
+
+
+def star_columns(stars, decimals=2):
+    """Column arrays from StarCatalog.visible as JSON-ready lists"""
+    return {key: (values if key == 'name' else
+                  [None if math.isnan(v) else v for v in np.round(values, decimals).tolist()])
+            for key, values in stars.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the BSC5 catalog file to " + CATALOG_PATH)
+    parser.add_argument('bsc5', help="path to the BSC5 'catalog' file (VizieR V/50)")
+    parser.add_argument('--output', default=CATALOG_PATH)
+    args = parser.parse_args()
+    # Written in index order, so StarCatalog can use the memory-mapped file as it is
+    stars = sort_by_cell(read_bsc5(args.bsc5))
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    np.save(args.output, stars)
+    print(f"Wrote {len(stars)} stars to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,530 @@
+"""Small Naive Bayes classifier telling astronomy questions from everything else
+
+The keyword scan in topic_filter.py rejects queries with only off-topic
+keywords. This model decides the rest: queries with both astronomy and
+off-topic keywords ("how does the weather work on Mars?"), queries with
+neither ("how long is a light-year?"), and substring matches on astronomy
+keywords that are nothing of the kind ("is it sunny in Madrid?"). It is a
+binarized multinomial Naive Bayes over stemmed words and word bigrams,
+trained at import on the labelled examples bundled below (a few
+milliseconds), so there is no model file to build or keep in sync. It reads
+the words topic_filter.tokenize already split the query into.
+
+Precision, recall and latency on a held-out set are measured by
+benchmarks/bench_topic_classifier.py; add misclassified queries here.
+"""
+import math
+
+from answer_cache import WORD_RE, stem
+
+# Log-odds a query needs to count as astronomy: 0 is the plain Naive Bayes
+# decision, and raising it rejects more borderline queries
+THRESHOLD = 0.0
+# Add-alpha smoothing of the per-class feature counts
+ALPHA = 0.2
+# Words whose stems are remembered before starting over
+MAX_STEMMED_WORDS = 50000
+
+ASTRONOMY_EXAMPLES = (
+    "How far away is the Andromeda galaxy?",
+    "What is a light-year?",
+    "How long is a light-year in kilometres?",
+    "Why is Mars red?",
+    "What would the weather be like on Mars?",
+    "Is there weather on Jupiter?",
+    "How do storms form on Jupiter?",
+    "What food do astronauts eat on the ISS?",
+    "How do astronauts cook in orbit?",
+    "How do astronauts stay healthy in microgravity?",
+    "What happens to the human body in zero gravity?",
+    "What are the health effects of radiation on a trip to Mars?",
+    "How much money does a rocket launch cost?",
+    "How much did the James Webb telescope cost?",
+    "Which movie got the physics of black holes right?",
+    "Is the film Interstellar accurate about wormholes?",
+    "What music did the Voyager golden record carry?",
+    "Can you hear sound in a vacuum?",
+    "Where can I watch the Perseids this year?",
+    "When is the next total solar eclipse?",
+    "When can I see the ISS pass overhead?",
+    "What is the Oort cloud?",
+    "How hot is the surface of Venus?",
+    "How cold does it get on the far side of the Moon?",
+    "What are Saturn's rings made of?",
+    "How many moons does Jupiter have?",
+    "What is dark matter?",
+    "What is dark energy?",
+    "How did the universe begin?",
+    "How old is the universe?",
+    "What is a neutron star?",
+    "What is a white dwarf?",
+    "What is a red giant?",
+    "How do stars form?",
+    "What happens when a star dies?",
+    "What is the closest star to us?",
+    "What is Proxima Centauri b?",
+    "Could there be life on Europa?",
+    "Is there water on Enceladus?",
+    "What is the Kuiper belt?",
+    "What are the Van Allen belts?",
+    "Why does the Moon have phases?",
+    "What causes the tides?",
+    "Why do we only see one side of the Moon?",
+    "What is a blue moon?",
+    "What is a supermoon?",
+    "What is a blood moon?",
+    "How do I find the North Star?",
+    "How do I find Polaris?",
+    "What can I see with binoculars tonight?",
+    "What is the best beginner telescope for viewing planets?",
+    "What magnification do I need to see Saturn's rings?",
+    "How do I photograph the Milky Way?",
+    "What is light pollution and how does it affect stargazing?",
+    "Where is the darkest sky near me for observing?",
+    "What is the Bortle scale?",
+    "What does apparent magnitude mean?",
+    "What is right ascension and declination?",
+    "What is the zodiacal light?",
+    "What is the ecliptic?",
+    "What is a sidereal day?",
+    "Why is a year 365 days long?",
+    "Why do we have leap years?",
+    "Why are there seasons on Earth?",
+    "What is an astronomical unit?",
+    "How fast does the ISS travel?",
+    "How long does it take light from the Sun to reach us?",
+    "How long would it take to travel to Alpha Centauri?",
+    "What is the Drake equation?",
+    "What is the Fermi paradox?",
+    "What did the Kepler mission discover?",
+    "What is the Artemis program?",
+    "When will humans return to the Moon?",
+    "What does the Perseverance rover do?",
+    "What is the Chandrayaan mission?",
+    "What has the Parker Solar Probe found?",
+    "How does a gravitational slingshot work?",
+    "What is escape velocity?",
+    "What is a Lagrange point?",
+    "What is a geostationary orbit?",
+    "How many satellites are orbiting Earth?",
+    "What is space debris?",
+    "What are gravitational waves?",
+    "What did LIGO detect?",
+    "What is the cosmic microwave background?",
+    "What is Hawking radiation?",
+    "What is an event horizon?",
+    "What is spaghettification?",
+    "What is a magnetar?",
+    "What is a gamma ray burst?",
+    "What are fast radio bursts?",
+    "What is a brown dwarf?",
+    "What is a binary star system?",
+    "What is a variable star?",
+    "How do astronomers measure distances to galaxies?",
+    "What is a Cepheid variable?",
+    "What is the Hubble constant?",
+    "Why is the universe expanding?",
+    "What is inflation in cosmology?",
+    "What is the multiverse theory?",
+    "What is the largest known star?",
+    "How big is the Sun compared to Earth?",
+    "How long will the Sun last?",
+    "What are sunspots?",
+    "What is a solar flare?",
+    "What causes the northern lights?",
+    "Can I see the aurora from Scotland?",
+    "What is a coronal mass ejection?",
+    "What is the heliosphere?",
+    "Has Voyager 1 left the solar system?",
+    "What is Olympus Mons?",
+    "Why is Pluto not a planet anymore?",
+    "What is a dwarf planet?",
+    "What is Ceres?",
+    "How was the Moon formed?",
+    "Did an impact form the Moon?",
+    "What is a meteorite made of?",
+    "What is the difference between a meteor and a meteorite?",
+    "What is Halley's comet?",
+    "When will Halley's comet return?",
+    "What is a shooting star?",
+    "What is the Andromeda collision?",
+    "What is the Milky Way's supermassive black hole called?",
+    "What is Sagittarius A*?",
+    "How many stars are in our galaxy?",
+    "How many galaxies are there?",
+    "What is a spiral galaxy?",
+    "What is a quasar?",
+    "What is redshift?",
+    "What is a spectroscope used for in astronomy?",
+    "How do radio telescopes work?",
+    "What is an interferometer?",
+    "What is the Event Horizon Telescope?",
+    "What is the Square Kilometre Array?",
+    "How cold is space?",
+    "What is the temperature of the Sun's core?",
+    "Is Venus hotter than Mercury?",
+    "Does it rain diamonds on Neptune?",
+    "What are the clouds of Venus made of?",
+    "Why is Uranus tilted?",
+    "How long is a day on Mercury?",
+    "Could we terraform Mars?",
+    "How would a colony on Mars get oxygen?",
+    "How do rockets work in the vacuum of space?",
+    "What fuel does a rocket use?",
+    "How does the ISS get its power?",
+    "What time is moonrise tonight?",
+    "Which planets are visible this evening?",
+    "What is an occultation?",
+    "What is a transit of Venus?",
+    "What is the Great Red Spot?",
+    "What is Titan's atmosphere like?",
+    "What is an exomoon?",
+    "How are exoplanets detected?",
+    "What is the habitable zone?",
+    "What is the Big Crunch?",
+    "What is the heat death of the universe?",
+    "What is a pulsar?",
+    "Explain the Doppler effect for starlight",
+    "What is parallax?",
+    "How do we know the age of a star?",
+    "What is nuclear fusion in stars?",
+    "What is stellar nucleosynthesis?",
+    "Tell me about the Crab Nebula",
+    "Tell me about Orion",
+    "Tell me about the Pleiades",
+    "Tell me about Betelgeuse",
+    "Is Betelgeuse going to explode?",
+    "What star sign constellation is in the sky in August?",
+    "Which constellations can I see from the southern hemisphere?",
+    "What is the zodiac in astronomy?",
+    "When do the Leonids peak?",
+    "How do I find the Orion Nebula in a telescope?",
+    "What is the best eyepiece for viewing the Moon?",
+    "What mount should I buy for a telescope?",
+    "How do I collimate a reflector?",
+    "What is a refractor?",
+    "How do I see Jupiter's moons through binoculars?",
+    "Where is Cassiopeia in the sky?",
+    "How do I find Andromeda in the night sky?",
+    "How does a space probe get its power?",
+    "How do satellites stay in orbit?",
+    "How do spacecraft land on Mars?",
+    "What propulsion do deep space probes use?",
+    "What is a solar sail?",
+    "Is Mercury ever visible at sunset?",
+    "What is the storm season like on Mars?",
+    "Are there clouds on Mars?",
+    "Does it snow on Mars?",
+    "Where is Saturn in the sky tonight?",
+    "When is Mars at opposition?",
+    "Can I see Uranus with the naked eye?",
+    "How do I spot Venus in the morning?",
+    "When is Mercury best seen?",
+    "What does Jupiter look like through a small telescope?",
+    "Which way should I face to see the Moon rise?",
+    "How big is Titan?",
+    "Does Io have an atmosphere?",
+)
+
+OFF_TOPIC_EXAMPLES = (
+    "What's the weather tomorrow?",
+    "Will it be sunny this weekend?",
+    "Is it going to rain in London today?",
+    "What should I wear for a sunny day at the beach?",
+    "How do I get rid of a sunburn?",
+    "What is the best sunscreen?",
+    "Recommend a good sun hat",
+    "What time does the sun set in the park restaurant?",
+    "Who won the football match last night?",
+    "Who is the best basketball player of all time?",
+    "What's the score of the cricket game?",
+    "Who is the star player of Real Madrid?",
+    "Which movie stars are in the new Marvel film?",
+    "Who is the biggest pop star right now?",
+    "Recommend a good rock band",
+    "What are the lyrics of Starman by David Bowie?",
+    "Who sang Rocket Man?",
+    "What is Star Wars about?",
+    "When does the next Star Trek series come out?",
+    "Who plays the lead in Guardians of the Galaxy?",
+    "Is the Samsung Galaxy better than the iPhone?",
+    "How do I reset my Galaxy phone?",
+    "What is the Starbucks menu?",
+    "How do I earn stars on Starbucks rewards?",
+    "How many stars does this hotel have?",
+    "Give me a five star recipe for lasagne",
+    "How do I bake a cake?",
+    "What's a good recipe for dinner?",
+    "How do I cook rice?",
+    "What's a healthy breakfast?",
+    "Is coffee bad for you?",
+    "How many calories are in an apple?",
+    "Suggest a vegetarian meal plan",
+    "What is a Mars bar made of?",
+    "Where can I buy a Milky Way chocolate bar?",
+    "What is the stock price of Tesla?",
+    "Should I invest in bitcoin?",
+    "How does the stock market work?",
+    "How do I save money for retirement?",
+    "What is a good credit score?",
+    "How do I do my taxes?",
+    "How do I start a business?",
+    "How do I write a resume?",
+    "How do I prepare for a job interview?",
+    "How do I ask for a raise?",
+    "How do I get over a breakup?",
+    "Give me dating advice",
+    "How do I plan a wedding?",
+    "What's a good birthday gift for my mum?",
+    "What should I buy for Christmas?",
+    "Where is the nearest shopping mall?",
+    "What are the symptoms of the flu?",
+    "How do I treat a headache?",
+    "Should I see a doctor about back pain?",
+    "What is diabetes?",
+    "How do I lose weight?",
+    "What exercises build muscle?",
+    "How do I sleep better?",
+    "How do I meditate?",
+    "How do I learn Spanish?",
+    "Translate hello into French",
+    "What is the capital of Australia?",
+    "Who was the first president of the United States?",
+    "When did World War II end?",
+    "Who wrote Hamlet?",
+    "Summarise the plot of Pride and Prejudice",
+    "Write a poem about love",
+    "Tell me a joke",
+    "Write me an essay about climate policy",
+    "Who will win the next election?",
+    "What do you think of the prime minister?",
+    "Explain the Electoral College",
+    "How do I fix a leaking tap?",
+    "How do I change a car tyre?",
+    "What's the best electric car?",
+    "How do I train my dog?",
+    "Why does my cat scratch the sofa?",
+    "How often should I water a cactus?",
+    "How do I grow tomatoes?",
+    "What's the best laptop for gaming?",
+    "How do I install Python?",
+    "Fix this JavaScript error",
+    "How do I reverse a linked list?",
+    "What is machine learning?",
+    "How do I set up a home WiFi network?",
+    "What's the best streaming service?",
+    "Recommend a TV series to binge",
+    "Who is Taylor Swift dating?",
+    "What is Kim Kardashian's net worth?",
+    "How old is Tom Cruise?",
+    "What's my horoscope for today?",
+    "What does my star sign say about love?",
+    "Is Scorpio compatible with Leo?",
+    "What is my moon sign personality?",
+    "Will Mercury retrograde ruin my relationship?",
+    "What do tarot cards mean?",
+    "What is the meaning of my dream?",
+    "Is the earth flat?",
+    "How do I clean my oven?",
+    "What is the best mattress?",
+    "How do I remove a stain from a shirt?",
+    "How do I knit a scarf?",
+    "What are the rules of chess?",
+    "How do I get better at Fortnite?",
+    "What is the best game on the Nintendo Switch?",
+    "Who won the Oscar for best actor?",
+    "Who won the Booker Prize this year?",
+    "When is the Super Bowl?",
+    "What's the cheapest flight to Paris?",
+    "Find me a hotel in Rome",
+    "What should I see in New York?",
+    "How do I renew my passport?",
+    "How do I get a mortgage?",
+    "Is renting better than buying a house?",
+    "What is inflation doing to house prices?",
+    "How do I sue my landlord?",
+    "Do I need a lawyer for a divorce?",
+    "What are my rights as a tenant?",
+    "How do I file a lawsuit?",
+    "What is the minimum wage?",
+    "How do vaccines work?",
+    "What is the best diet for heart health?",
+    "What's the best moisturiser for dry skin?",
+    "What should I name my baby?",
+    "How do I make friends as an adult?",
+    "What's the best way to study for exams?",
+    "Solve 2x + 3 = 7",
+    "What is the derivative of x squared?",
+    "What is photosynthesis?",
+    "How do earthquakes happen?",
+    "Why is the ocean salty?",
+    "What is the tallest mountain on Earth?",
+    "What is the population of India?",
+    "Which country has the most lakes?",
+    "How do airplanes fly?",
+    "What is the fastest train in the world?",
+    "Why do leaves change colour in autumn?",
+    "How do bees make honey?",
+    "Are dolphins mammals?",
+    "What is the largest animal?",
+    "What language is spoken in Brazil?",
+    "What time is it in Tokyo?",
+    "Convert 10 miles to kilometres",
+    "How do I make sourdough starter?",
+    "Rate this song",
+    "Who is the lead singer of Coldplay?",
+    "What is the best Netflix movie this month?",
+    "What is the Moon Knight series about?",
+    "Where can I buy a moon lamp for my bedroom?",
+    "What was the Space Jam soundtrack?",
+    "Where is the Space Needle?",
+    "How do I free up disk space on my laptop?",
+    "How do I make space in a small apartment?",
+    "What is the Rocket League ranking system?",
+    "Give me a rocket salad recipe",
+    "What is the Galaxy S24 camera like?",
+    "How do I get to the station from the airport?",
+    "When is the next launch of the new iPhone?",
+    "What causes thunder?",
+    "What causes acne?",
+    "What causes inflation?",
+    "Why is the sea blue?",
+    "Why do cats purr?",
+    "Why do onions make you cry?",
+    "Why is my internet slow?",
+    "How tall is Big Ben?",
+    "How big is the Amazon rainforest?",
+    "How old is the Great Wall of China?",
+    "How long is the River Nile?",
+    "How far is London from Manchester?",
+    "How hot does an oven get?",
+    "How cold is Antarctica in winter?",
+    "How do magnets work?",
+    "How does electricity work?",
+    "How does a fridge keep food cold?",
+    "How do hurricanes form?",
+    "What is a tornado?",
+    "When was the printing press invented?",
+    "Who invented the telephone?",
+    "Who discovered penicillin?",
+    "What is the longest river in Europe?",
+    "What is the biggest city in Canada?",
+    "Tell me a fun fact",
+    "Tell me about the French Revolution",
+    "Tell me about Shakespeare",
+    "What is a noun?",
+    "What is an API?",
+    "What does HTML stand for?",
+    "What's the difference between a crocodile and an alligator?",
+    "What is the speed of a cheetah?",
+    "What should I do this weekend?",
+    "Where can I watch the football tonight?",
+    "What time does the shop open tomorrow?",
+    "Will it snow this evening?",
+    "Is it windy outside?",
+    "What's the forecast for the weekend?",
+    "What sign am I if my birthday is in June?",
+    "Are Geminis good partners?",
+    "What does my rising sign mean?",
+    "Is Venus in retrograde bad for dating?",
+    "Who is Bruno Mars?",
+    "What songs has Bruno Mars released?",
+    "What on earth is a mortgage?",
+    "Why on earth is my phone so slow?",
+    "Is Titan a good brand of watch?",
+    "What happened to the Titan submarine?",
+    "Where is the Mars chocolate factory?",
+    "Is a Snickers bar healthier than a Mars bar?",
+    "Where can I buy Galaxy chocolate?",
+    "What does Venus in my birth chart mean?",
+    "Is Mercury retrograde a bad time to sign a contract?",
+    "Does the full moon affect my mood and love life?",
+    "What is the Saturn car company?",
+    "Is Jupiter in Florida a good place to live?",
+    "Who is the Marvel villain Thanos?",
+    "Is the Earth hollow like conspiracy theorists say?",
+    "What is a hedge fund?",
+    "What is a sonnet?",
+    "What is a virus?",
+    "What is a carburettor?",
+    "What is a Python list comprehension?",
+    "What is a haiku?",
+    "What is a mortgage broker?",
+    "What is a good name for a cat?",
+    "What causes migraines?",
+    "What causes dandruff?",
+    "What causes traffic jams?",
+    "Why is the sky grey in winter in England?",
+    "Why is the Dead Sea so salty?",
+    "Why is my code throwing an exception?",
+    "Why do dogs wag their tails?",
+    "How do I fix a flat tyre?",
+    "How do I write a cover letter?",
+    "How does a car engine work?",
+    "How do fish breathe?",
+    "Which songs mention the moon and stars?",
+    "Who sang Fly Me to the Moon?",
+    "What is the best theme park ride?",
+    "What are the opening hours of the museum tonight?",
+    "Will it thunder this afternoon?",
+    "What sunscreen protects against UV from the sun?",
+)
+
+
+_stems = {}
+
+
+def _stem(word):
+    if len(_stems) >= MAX_STEMMED_WORDS:
+        _stems.clear()
+    stemmed = _stems[word] = stem(word)
+    return stemmed
+
+
+def features(words):
+    """Stemmed words and word bigrams of a text's lowercased words, each counted once"""
+    stems = [_stems.get(word) or _stem(word) for word in words]
+    return set(stems).union(f'{a} {b}' for a, b in zip(stems, stems[1:]))
+
+
+class NaiveBayes:
+    """Two-class binarized multinomial Naive Bayes with add-alpha smoothing
+
+    Training reduces each feature to one weight, the log ratio of its class
+    likelihoods, so scoring a query is a dict lookup per feature. Features
+    never seen in training carry no evidence and are skipped.
+    """
+
+    def __init__(self, positive, negative, alpha=ALPHA):
+        positive_counts = self._count(positive)
+        negative_counts = self._count(negative)
+        vocabulary = positive_counts.keys() | negative_counts.keys()
+        positive_total = sum(positive_counts.values()) + alpha * len(vocabulary)
+        negative_total = sum(negative_counts.values()) + alpha * len(vocabulary)
+        self.prior = math.log(len(positive) / len(negative))
+        self.weights = {
+            feature: math.log((positive_counts.get(feature, 0) + alpha) / positive_total)
+            - math.log((negative_counts.get(feature, 0) + alpha) / negative_total)
+            for feature in vocabulary
+        }
+
+    @staticmethod
+    def _count(texts):
+        counts = {}
+        for text in texts:
+            for feature in features(WORD_RE.findall(text.lower())):
+                counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def log_odds(self, words):
+        """Log-odds that a text, given as its lowercased words, belongs to the positive class"""
+        weights = self.weights
+        return self.prior + sum(weights.get(feature, 0.0) for feature in features(words))
+
+
+MODEL = NaiveBayes(ASTRONOMY_EXAMPLES, OFF_TOPIC_EXAMPLES)
+
+
+def is_astronomy(words, threshold=THRESHOLD):
+    """Classify a query, given as its lowercased words, as astronomy (True) or off topic"""
+    return MODEL.log_odds(words) > threshold
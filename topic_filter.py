@@ -0,0 +1,298 @@
+import re
+
+import topic_classifier
+from answer_cache import WORD_RE
+
+# Keyword lists used to keep the chatbot on astronomy topics. Matching is plain
+# substring matching on the lowercased text ('star' also matches 'stargazing');
+# queries are matched on their words, as if joined by single spaces.
+ASTRONOMY_KEYWORDS = (
+    'planet', 'moon', 'star', 'sun', 'galaxy', 'asteroid', 'comet', 'meteor',
+    'constellation', 'nebula', 'black hole', 'supernova', 'pulsar', 'quasar',
+    'solar system', 'exoplanet', 'satellite', 'orbit', 'celestial',
+    'nasa', 'esa', 'spacex', 'space mission', 'astronaut', 'spacecraft', 'telescope',
+    'hubble', 'james webb', 'voyager', 'rover', 'rocket', 'launch', 'station',
+    'space', 'astronomy', 'universe', 'cosmos', 'cosmic', 'astronomical',
+    'light year', 'parsec', 'gravity', 'big bang', 'eclipse',
+    'mercury', 'venus', 'earth', 'mars', 'jupiter', 'saturn', 'uranus',
+    'neptune', 'pluto', 'meteor shower', 'northern lights', 'aurora',
+    'solstice', 'equinox', 'transit', 'conjunction', 'redshift'
+)
+
+NON_ASTRONOMY_TOPICS = (
+    'weather', 'sports', 'politics', 'music', 'movie', 'film',
+    'celebrity', 'actor', 'actress', 'singer', 'artist',
+    'recipe', 'food', 'cook', 'restaurant', 'diet',
+    'stock', 'market', 'finance', 'money', 'investment',
+    'dating', 'relationship', 'breakup', 'marriage',
+    'medical', 'disease', 'symptom', 'health', 'doctor',
+    'attorney', 'lawyer', 'legal', 'lawsuit',
+    'birthday', 'gift', 'present', 'shopping'
+)
+
+SPACE_PATTERNS = (
+    'why is the sky', 'what is in space', 'how far', 'light from',
+    'how old is the', 'what causes', 'why do stars', 'when can i see',
+    'how to observe', 'stargazing', 'night sky'
+)
+
+RESPONSE_KEYWORDS = (
+    'planet', 'moon', 'star', 'sun', 'galaxy', 'asteroid', 'comet',
+    'constellation', 'nebula', 'black hole', 'supernova',
+    'solar system', 'exoplanet', 'orbit', 'celestial',
+    'nasa', 'telescope', 'space', 'astronomy', 'universe', 'cosmos',
+    'astronomical', 'light year', 'gravity', 'earth', 'mars', 'jupiter'
+)
+
+# Log-odds against astronomy the classifier needs to overrule a query that
+# matched astronomy keywords only
+KEYWORD_OVERRULE_MARGIN = 2.0
+# Further log-odds it needs to overrule a query naming one of NAMED_BODIES:
+# "How do I spot Mercury at dusk?" has little else to go on, while "What is a
+# Mars bar made of?" is still turned away
+NAMED_BODY_MARGIN = 1.5
+
+# Words remembered by KeywordMatcher.find_words before it starts over
+MAX_REMEMBERED_WORDS = 50000
+
+# Planets, moons and other named objects, matched as whole words
+NAMED_BODIES = (
+    'sun', 'moon', 'mercury', 'venus', 'earth', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune',
+    'pluto', 'ceres', 'eris', 'makemake', 'haumea', 'io', 'europa', 'ganymede', 'callisto', 'titan',
+    'enceladus', 'triton', 'phobos', 'deimos', 'charon', 'milky way', 'andromeda', 'orion', 'sirius',
+    'betelgeuse', 'polaris', 'vega', 'rigel', 'proxima centauri', 'alpha centauri', 'pleiades',
+    'big dipper', 'ursa major', 'cassiopeia', 'magellanic clouds', 'kuiper belt', 'oort cloud',
+    'halley', 'hubble', 'james webb', 'voyager', 'iss',
+)
+
+ASTRONOMY_REDIRECT_MARKER = "I can only answer questions about astronomy and space topics"
+
+def _trie_pattern(words):
+    """Regex alternation factored into a trie, so each position branches on one character"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Optional children are greedy, so the longest keyword at a position wins
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Finds the keywords of every category in a single pass over the text
+
+    Matching keeps the substring semantics of ``keyword in text``. The compiled
+    pattern consumes the longest keyword at each match and captures the text
+    that follows it, so overlapping keywords are recovered from tables built
+    once here: every keyword contained in the match is implied by it, and a
+    keyword that starts inside the match but runs past its end is found by
+    checking the rest of that keyword against the captured text.
+    """
+
+    def __init__(self, categories):
+        keyword_categories = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                keyword_categories.setdefault(keyword, set()).add(category)
+        keywords = tuple(keyword_categories)
+        self.categories = tuple(categories)
+        longest = max(len(k) for k in keywords)
+        pattern = re.compile('(' + _trie_pattern(keywords) + ')(?=(.{0,%d}))' % longest, re.DOTALL)
+        self._findall = pattern.findall
+        self._finditer = pattern.finditer
+
+        # keyword -> (keywords it contains, their categories)
+        implied = {}
+        for outer in keywords:
+            contained = frozenset(k for k in keywords if k in outer)
+            implied[outer] = (contained, frozenset(c for k in contained for c in keyword_categories[k]))
+        # keyword -> (implied keywords, implied categories, straddling candidates), where the
+        # candidates map the first character after a match to (rest of keyword, implied...)
+        # for each keyword whose start overlaps the end of this one
+        self._expansions = {}
+        for outer in keywords:
+            by_next_char = {}
+            for i in range(1, len(outer)):
+                for k in keywords:
+                    if len(k) > len(outer) - i and k.startswith(outer[i:]):
+                        rest = k[len(outer) - i:]
+                        by_next_char.setdefault(rest[0], []).append((rest,) + implied[k])
+            straddling = {ch: tuple(candidates) for ch, candidates in by_next_char.items()}
+            self._expansions[outer] = implied[outer] + (straddling,)
+
+        # For find_words: keywords of several words as (words, implied categories),
+        # and word -> (categories of the keywords inside it, phrases it can start,
+        # phrases it can end), filled in as words are seen
+        self._phrases = tuple((keyword.split(' '), implied[keyword][1]) for keyword in keywords if ' ' in keyword)
+        self._first_words = tuple({phrase[0] for phrase, _ in self._phrases})
+        self._last_words = tuple({phrase[-1] for phrase, _ in self._phrases})
+        self._words = {}
+
+    def find(self, text):
+        """Return (keywords, categories) found in text; text must be lowercased"""
+        keywords = set()
+        categories = set()
+        expansions = self._expansions
+        for match, following in self._findall(text):
+            implied_keywords, implied_categories, straddling = expansions[match]
+            keywords |= implied_keywords
+            categories |= implied_categories
+            candidates = straddling.get(following[:1])
+            if candidates:
+                for rest, implied_keywords, implied_categories in candidates:
+                    if following.startswith(rest):
+                        keywords |= implied_keywords
+                        categories |= implied_categories
+        return keywords, categories
+
+    def find_words(self, words):
+        """Return the categories found in the lowercased words of a text joined by single spaces
+
+        Each distinct word is matched once and remembered, so a query is
+        mostly dict lookups. A keyword of several words matches where its
+        first word ends a word, its middle words are the next words and its
+        last word starts the one after them.
+        """
+        remembered = self._words
+        seen = [remembered.get(word) or self._remember(word) for word in words]
+        categories = set().union(*[word_categories for word_categories, _, _ in seen])
+        for i, (_, starts, _) in enumerate(seen):
+            for phrase in starts:
+                phrase_words, phrase_categories = self._phrases[phrase]
+                last = i + len(phrase_words) - 1
+                if (last < len(words) and phrase in seen[last][2]
+                        and words[i + 1:last] == phrase_words[1:-1]):
+                    categories |= phrase_categories
+        return categories
+
+    def _remember(self, word):
+        if len(self._words) >= MAX_REMEMBERED_WORDS:
+            self._words.clear()
+        starts = ends = ()
+        if word.endswith(self._first_words):
+            starts = tuple(i for i, (phrase, _) in enumerate(self._phrases) if word.endswith(phrase[0]))
+        if word.startswith(self._last_words):
+            ends = frozenset(i for i, (phrase, _) in enumerate(self._phrases) if word.startswith(phrase[-1]))
+        found = self._words[word] = (frozenset(self.find(word)[1]), starts, ends)
+        return found
+
+    def count_distinct(self, text, stop_at=None):
+        """Count distinct keywords in text, stopping the scan once stop_at is reached"""
+        seen = set()
+        expansions = self._expansions
+        for match in self._finditer(text):
+            following = match.group(2)
+            implied_keywords, _, straddling = expansions[match.group(1)]
+            seen |= implied_keywords
+            for rest, implied_keywords, _ in straddling.get(following[:1], ()):
+                if following.startswith(rest):
+                    seen |= implied_keywords
+            if stop_at is not None and len(seen) >= stop_at:
+                break
+        return len(seen)
+
+
+QUERY_MATCHER = KeywordMatcher({
+    'off_topic': NON_ASTRONOMY_TOPICS,
+    'astronomy': ASTRONOMY_KEYWORDS,
+    'space_pattern': SPACE_PATTERNS,
+})
+RESPONSE_MATCHER = KeywordMatcher({'astronomy': RESPONSE_KEYWORDS})
+NAMED_BODY_WORDS = frozenset(name for name in NAMED_BODIES if ' ' not in name)
+NAMED_BODY_PAIRS = frozenset(tuple(name.split(' ')) for name in NAMED_BODIES if ' ' in name)
+
+
+def tokenize(message):
+    """The lowercased words of a query, the form every query check works on"""
+    return WORD_RE.findall(message.lower())
+
+
+def query_categories(words):
+    """Categories of query keywords in a query's words"""
+    return QUERY_MATCHER.find_words(words)
+
+
+def names_body(words):
+    """Whether a query's words name one of NAMED_BODIES"""
+    return not NAMED_BODY_WORDS.isdisjoint(words) or not NAMED_BODY_PAIRS.isdisjoint(zip(words, words[1:]))
+
+
+def screen_query(message):
+    """Decide whether a chat query is on topic before anything is sent to Gemini
+
+    Returns ``(on_topic, stage)``. The message is lowercased and split into
+    words once, and both stages work on those words. A query with only
+    off-topic keywords is rejected by the keyword stage alone (stage
+    'keywords'); every other query goes through the local classifier (stage
+    'classifier'), which decides queries matching both keyword lists or
+    neither. A match on astronomy keywords alone, or a named body, only
+    lowers the log-odds the classifier needs to accept the query, so it can
+    still turn away "sunny" weather or a Mars bar when it is confident.
+    """
+    words = tokenize(message)
+    categories = query_categories(words)
+    astronomy = 'astronomy' in categories or 'space_pattern' in categories
+    off_topic = 'off_topic' in categories
+    if off_topic and not astronomy:
+        return False, 'keywords'
+    threshold = -KEYWORD_OVERRULE_MARGIN if astronomy and not off_topic else topic_classifier.THRESHOLD
+    if names_body(words):
+        threshold -= NAMED_BODY_MARGIN
+    return topic_classifier.is_astronomy(words, threshold), 'classifier'
+
+
+def is_astronomy_related_response(response):
+    """Check if AI response is astronomy-related"""
+    # If it's the standard redirect, it's valid
+    if ASTRONOMY_REDIRECT_MARKER in response:
+        return True
+
+    # If the response contains at least 2 astronomy terms, consider it valid
+    return RESPONSE_MATCHER.count_distinct(response.lower(), stop_at=2) >= 2
+
+
+class StreamingRelevanceCheck:
+    """Incremental is_astronomy_related_response for a reply that arrives in chunks
+
+    Chunks are held back until the text received so far passes the check; from
+    then on they are released as they arrive. If the reply ends without passing,
+    ``passed`` stays False and nothing has been released.
+
+    Each chunk is scanned once, together with the end of the text before it so
+    keywords (and the redirect marker) split across chunks are still found.
+    """
+
+    # Characters kept from earlier chunks: enough for all but the last character
+    # of the longest thing searched for
+    OVERLAP = max(len(ASTRONOMY_REDIRECT_MARKER), *map(len, RESPONSE_KEYWORDS)) - 1
+
+    def __init__(self):
+        self.passed = False
+        self._held = []
+        self._keywords = set()
+        self._tail = ''
+
+    def feed(self, chunk):
+        """Return the text that may be sent now (possibly empty)"""
+        if self.passed:
+            return chunk
+        self._held.append(chunk)
+        text = self._tail + chunk
+        if ASTRONOMY_REDIRECT_MARKER not in text:
+            self._keywords |= RESPONSE_MATCHER.find(text.lower())[0]
+            if len(self._keywords) < 2:
+                self._tail = text[-self.OVERLAP:]
+                return ''
+        self.passed = True
+        text = ''.join(self._held)
+        self._held = []
+        return text
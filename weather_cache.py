@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from cache import TTLCache
+
+DEFAULT_TTL = 600
+# Geohash length of a cell: 5 characters is about 4.9 x 4.9 km
+DEFAULT_PRECISION = 5
+# How long the last good reading of a cell may stand in for a failing upstream
+DEFAULT_STALE_SECONDS = 3 * 3600
+# Seconds before retrying the upstream while a stale reading is served
+RETRY_SECONDS = 60
+MAX_CELLS = 10000
+TOP_CELLS_REPORTED = 10
+
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lat, lon, precision=DEFAULT_PRECISION):
+    """Geohash of a point, precision characters long"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        target, point = (lon_range, lon) if even else (lat_range, lat)
+        mid = (target[0] + target[1]) / 2
+        value <<= 1
+        if point >= mid:
+            value |= 1
+            target[0] = mid
+        else:
+            target[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def geohash_center(cell):
+    """(lat, lon) at the centre of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if value >> shift & 1:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def parse_coordinates(lat, lon):
+    """Floats from query-string coordinates; raises ValueError when malformed or out of range"""
+    lat, lon = float(lat), float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+    return lat, lon
+
+
+class WeatherCache:
+    """Weather readings per geohash cell, so nearby users share one upstream call
+
+    ``fetch(lat, lon)`` returns a JSON-ready dict for the cell centre (current
+    conditions, a scored forecast, ...) or raises. Readings are cached for ttl seconds and concurrent misses for a
+    cell share one fetch. When a fetch fails, the cell's last good reading
+    (if younger than stale_seconds) is served with ``"stale": true`` and the
+    upstream is retried after RETRY_SECONDS; without one the error is raised.
+    """
+
+    def __init__(self, fetch, ttl=DEFAULT_TTL, precision=DEFAULT_PRECISION,
+                 stale_seconds=DEFAULT_STALE_SECONDS, max_cells=MAX_CELLS, clock=time.time):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.precision = precision
+        self.stale_seconds = stale_seconds
+        self.max_cells = max_cells
+        self.clock = clock
+        self._cache = TTLCache(ttl=ttl, clock=clock)
+        # cell -> {'requests', 'upstream_calls', 'stale_fallbacks', 'errors', 'last_good'}, least recently used first
+        self._cells = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, lat, lon):
+        """Serialized reading for the cell containing (lat, lon)"""
+        cell = geohash(lat, lon, self.precision)
+        with self._lock:
+            self._cell(cell)['requests'] += 1
+        body, _ = self._cache.get(cell, lambda: self._load(cell), ttl=self._entry_ttl)
+        return body
+
+    def report(self):
+        with self._lock:
+            cells = [(cell, {k: v for k, v in state.items() if k != 'last_good'})
+                     for cell, state in self._cells.items()]
+        totals = {key: sum(state[key] for _, state in cells)
+                  for key in ('requests', 'upstream_calls', 'stale_fallbacks', 'errors')}
+        top = sorted(cells, key=lambda item: item[1]['requests'], reverse=True)[:TOP_CELLS_REPORTED]
+        return dict(
+            totals,
+            ttl=self.ttl,
+            precision=self.precision,
+            cells=len(cells),
+            calls_saved=totals['requests'] - totals['upstream_calls'],
+            hit_rate=_hit_rate(totals),
+            top_cells=[dict(state, cell=cell, hit_rate=_hit_rate(state)) for cell, state in top],
+            cache=dict(self._cache.stats),
+        )
+
+    def _cell(self, cell):
+        # Caller holds the lock
+        state = self._cells.get(cell)
+        if state is None:
+            state = self._cells[cell] = {'requests': 0, 'upstream_calls': 0, 'stale_fallbacks': 0,
+                                         'errors': 0, 'last_good': None}
+            while len(self._cells) > self.max_cells:
+                evicted, _ = self._cells.popitem(last=False)
+                self._cache.invalidate(evicted)
+        else:
+            self._cells.move_to_end(cell)
+        return state
+
+    def _entry_ttl(self, value):
+        _, fresh = value
+        return self.ttl if fresh else RETRY_SECONDS
+
+    def _load(self, cell):
+        lat, lon = geohash_center(cell)
+        with self._lock:
+            self._cell(cell)['upstream_calls'] += 1
+        try:
+            conditions = self.fetch(round(lat, 4), round(lon, 4))
+        except Exception:
+            with self._lock:
+                state = self._cell(cell)
+                state['errors'] += 1
+                last_good = state['last_good']
+                if last_good is None or self.clock() - last_good[1] > self.stale_seconds:
+                    raise
+                state['stale_fallbacks'] += 1
+            return json.dumps(dict(last_good[0], stale=True), sort_keys=True).encode('utf-8'), False
+        with self._lock:
+            self._cell(cell)['last_good'] = (conditions, self.clock())
+        return json.dumps(conditions, sort_keys=True).encode('utf-8'), True
+
+
+def _hit_rate(counts):
+    if not counts['requests']:
+        return None
+    return round(1 - counts['upstream_calls'] / counts['requests'], 4)
@@ -0,0 +1,147 @@
+import json
+
+try:
+    import numpy as np
+except ImportError:  # batch lookups fall back to plain Python
+    np = None
+
+# (sign, start (month, day), end (month, day), element, traits, description, emoji)
+ZODIAC_SIGNS = (
+    ("Aries", (3, 21), (4, 19), "Fire", "Independent, assertive, energetic",
+     "Aries is the first sign of the zodiac, symbolizing new beginnings. People born under this sign are often characterized by their boldness and pioneering spirit.",
+     "♈"),
+    ("Taurus", (4, 20), (5, 20), "Earth", "Patient, reliable, practical",
+     "Taurus is known for stability and persistence. Those born under this sign value security and comfort, and are often very reliable.",
+     "♉"),
+    ("Gemini", (5, 21), (6, 20), "Air", "Adaptable, communicative, curious",
+     "Gemini is represented by the twins, symbolizing duality. People with this sign are often versatile, inquisitive, and excellent communicators.",
+     "♊"),
+    ("Cancer", (6, 21), (7, 22), "Water", "Intuitive, emotional, protective",
+     "Cancer is deeply connected to home and family. Those born under this sign are often nurturing, empathetic, and protective of loved ones.",
+     "♋"),
+    ("Leo", (7, 23), (8, 22), "Fire", "Confident, generous, loyal",
+     "Leo is represented by the lion, symbolizing courage and leadership. People with this sign often have a natural flair for drama and creativity.",
+     "♌"),
+    ("Virgo", (8, 23), (9, 22), "Earth", "Analytical, precise, helpful",
+     "Virgo is associated with meticulousness and service. Those born under this sign are often detail-oriented, practical, and devoted to self-improvement.",
+     "♍"),
+    ("Libra", (9, 23), (10, 22), "Air", "Balanced, diplomatic, social",
+     "Libra is symbolized by the scales, representing balance and harmony. People with this sign often have a strong sense of justice and value relationships.",
+     "♎"),
+    ("Scorpio", (10, 23), (11, 21), "Water", "Passionate, resourceful, brave",
+     "Scorpio is associated with intensity and transformation. Those born under this sign are often determined, passionate, and perceptive.",
+     "♏"),
+    ("Sagittarius", (11, 22), (12, 21), "Fire", "Optimistic, adventurous, independent",
+     "Sagittarius is represented by the archer, symbolizing aspiration and exploration. People with this sign often love travel, learning, and philosophical discussions.",
+     "♐"),
+    ("Capricorn", (12, 22), (1, 19), "Earth", "Disciplined, responsible, self-controlled",
+     "Capricorn is associated with ambition and discipline. Those born under this sign are often hardworking, patient, and practical.",
+     "♑"),
+    ("Aquarius", (1, 20), (2, 18), "Air", "Progressive, original, independent",
+     "Aquarius is known for innovation and humanitarianism. People with this sign are often forward-thinking, unconventional, and value intellectual stimulation.",
+     "♒"),
+    ("Pisces", (2, 19), (3, 20), "Water", "Compassionate, artistic, intuitive",
+     "Pisces is symbolized by the fish, representing connection to the spiritual realm. Those born under this sign are often creative, empathetic, and dreamy.",
+     "♓"),
+)
+
+# Days per month in a leap year, so February 29 has a slot
+DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+MONTH_OFFSETS = tuple(sum(DAYS_IN_MONTH[:m]) for m in range(12))
+DAYS_IN_YEAR = sum(DAYS_IN_MONTH)  # 366
+
+# Signs per batch request
+MAX_BATCH = 10000
+
+
+def day_of_year(month, day):
+    """0-based day of a leap year, or None if (month, day) is not a calendar date"""
+    if not (1 <= month <= 12 and 1 <= day <= DAYS_IN_MONTH[month - 1]):
+        return None
+    return MONTH_OFFSETS[month - 1] + day - 1
+
+
+def _build_day_table():
+    table = [None] * DAYS_IN_YEAR
+    for index, (_, start, end, *_rest) in enumerate(ZODIAC_SIGNS):
+        first = day_of_year(*start)
+        last = day_of_year(*end)
+        # Capricorn wraps around the new year
+        days = range(first, last + 1) if first <= last else list(range(first, DAYS_IN_YEAR)) + list(range(last + 1))
+        for d in days:
+            table[d] = index
+    assert None not in table
+    return tuple(table)
+
+
+# Day of year -> index into ZODIAC_SIGNS
+DAY_TABLE = _build_day_table()
+
+# Response bodies per sign, built once; same content /api/zodiac always returned
+SIGN_PAYLOADS = tuple(
+    json.dumps({"sign": sign, "element": element, "traits": traits,
+                "description": description, "emoji": emoji}, sort_keys=True).encode('utf-8')
+    for sign, _, _, element, traits, description, emoji in ZODIAC_SIGNS)
+# Batch results as JSON fragments; the extra last entry stands for an invalid date
+_SIGN_NAMES_JSON = tuple(json.dumps(s[0]).encode('utf-8') for s in ZODIAC_SIGNS) + (b'null',)
+INVALID = len(ZODIAC_SIGNS)
+
+if np is not None:
+    _DAY_TABLE_NP = np.array(DAY_TABLE, dtype=np.int8)
+    _MONTH_OFFSETS_NP = np.array((0,) + MONTH_OFFSETS, dtype=np.int16)
+    _DAYS_IN_MONTH_NP = np.array((0,) + DAYS_IN_MONTH, dtype=np.int16)
+
+
+def parse_month_day(birth_date):
+    """(month, day) from a YYYY-MM-DD string; raises ValueError or IndexError if malformed"""
+    parts = birth_date.split('-')
+    return int(parts[1]), int(parts[2])
+
+
+def sign_index(month, day):
+    """Index into ZODIAC_SIGNS for a birthday, or None if it is not a calendar date"""
+    d = day_of_year(month, day)
+    return DAY_TABLE[d] if d is not None else None
+
+
+def batch_sign_indexes(birth_dates):
+    """Sign index for each YYYY-MM-DD string, INVALID where it can't be parsed"""
+    if np is None:
+        return [_sign_index_or_invalid(value) for value in birth_dates]
+
+    count = len(birth_dates)
+    # Fixed-width bytes, one wider than a date so longer strings aren't silently truncated
+    try:
+        raw = np.array(birth_dates, dtype='S11')
+    except (UnicodeEncodeError, TypeError, ValueError):
+        return [_sign_index_or_invalid(value) for value in birth_dates]
+    chars = raw.view(np.uint8).reshape(count, 11).astype(np.int16)
+    digits = chars[:, [0, 1, 2, 3, 5, 6, 8, 9]] - ord('0')
+    well_formed = (((digits >= 0) & (digits <= 9)).all(axis=1)
+                   & (chars[:, 4] == ord('-')) & (chars[:, 7] == ord('-')) & (chars[:, 10] == 0))
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    month_ok = np.where(well_formed & (month >= 1) & (month <= 12), month, 0)
+    valid = (month_ok > 0) & (day >= 1) & (day <= _DAYS_IN_MONTH_NP[month_ok])
+    doy = np.where(valid, _MONTH_OFFSETS_NP[month_ok] + day - 1, 0)
+    result = np.where(valid, _DAY_TABLE_NP[doy], INVALID)
+
+    # Entries the fixed-width parse rejected may still be valid for the
+    # single-date parser (e.g. "2000-3-5")
+    result = result.tolist()
+    for i in np.flatnonzero(~valid).tolist():
+        result[i] = _sign_index_or_invalid(birth_dates[i])
+    return result
+
+
+def _sign_index_or_invalid(value):
+    try:
+        index = sign_index(*parse_month_day(value))
+    except (AttributeError, ValueError, IndexError, TypeError):
+        return INVALID
+    return INVALID if index is None else index
+
+
+def batch_signs_json(birth_dates):
+    """JSON array of sign names (null for invalid dates) for a list of birth dates"""
+    return b'[' + b','.join(map(_SIGN_NAMES_JSON.__getitem__, batch_sign_indexes(birth_dates))) + b']'